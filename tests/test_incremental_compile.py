@@ -0,0 +1,115 @@
+import struct
+import sys
+from pathlib import Path
+
+# Ensure import works
+sys.path.append(str(Path(__file__).resolve().parent.parent))
+
+from z64lib.audiobank import Audiobank, AudiobankIndexEntry, InstrumentBank, InternPool
+from z64lib.audiobank.structs import *
+from z64lib.core.audio import EnvelopePoint
+from z64lib.types import *
+
+
+# =========== #
+#   HELPERS   #
+# =========== #
+
+def make_envelope(points: list[tuple[int, int]]) -> Envelope:
+    return Envelope(array[EnvelopePoint]([EnvelopePoint.from_bytes(struct.pack('>2h', *point)) for point in points]))
+
+
+def make_sample(sample_addr: int, looped: bool) -> Sample:
+    sample = Sample.from_bytes(struct.pack('>4I', 0x90, sample_addr, 0, 0))
+    sample.book = VadpcmBook(VadpcmBookHeader.from_bytes(struct.pack('>2i', 2, 2)), array[s16](list(range(32))))
+    if looped:
+        sample.loop = VadpcmLoop(VadpcmLoopHeader.from_bytes(struct.pack('>4I', 16, 144, 0xFFFFFFFF, 160)), array[s16]([1] * 16))
+    else:
+        sample.loop = VadpcmLoop(VadpcmLoopHeader.from_bytes(struct.pack('>4I', 0, 160, 0, 0)))
+    return sample
+
+
+def make_tuned_sample(sample: Sample | None, tuning: float = 1.0) -> TunedSample:
+    tuned_sample = TunedSample.from_bytes(struct.pack('>If', 0, tuning))
+    tuned_sample.sample = sample
+    return tuned_sample
+
+
+def make_bank(num_instruments: int) -> InstrumentBank:
+    """ Builds a bank whose instruments, drums and effects share two samples and one envelope. """
+    envelope = make_envelope([(1, 32700), (1, 32700), (-1, 0)])
+    samples = [make_sample(0x000, looped=True), make_sample(0x100, looped=False)]
+
+    bank = InstrumentBank()
+    for i in range(num_instruments):
+        instrument = Instrument.from_bytes(bytes(0x20))
+        instrument.envelope = envelope
+        instrument.decay_index = i
+        instrument.high_key_region = 127
+        instrument.low_region_sample = make_tuned_sample(None, 0.0)
+        instrument.prim_region_sample = make_tuned_sample(samples[i % 2])
+        instrument.high_region_sample = make_tuned_sample(None, 0.0)
+        bank.instruments.append(instrument)
+
+    drum = Drum.from_bytes(bytes(0x10))
+    drum.envelope = envelope
+    drum.tuned_sample = make_tuned_sample(samples[1])
+    effect = SoundEffect.from_bytes(bytes(0x08))
+    effect.tuned_sample = make_tuned_sample(samples[0])
+    bank.drums = [drum, None]
+    bank.effects = [None, effect]
+
+    bank.index_entry = AudiobankIndexEntry.from_bytes(struct.pack('>IIbbBBBBh', 0, 0, 2, 2, 1, 255, num_instruments, 2, 2))
+    return bank
+
+
+def load_interned(*banks: InstrumentBank) -> list[InstrumentBank]:
+    """ Compiles the banks, then loads them back sharing a single intern pool. """
+    pool = InternPool()
+    return [InstrumentBank.from_bytes(*bank.to_bytes(), intern_pool=pool) for bank in banks]
+
+
+# =========== #
+#    TESTS    #
+# =========== #
+
+def test_incremental_compile_after_other_bank_compiles():
+    """ A shared object placed by another bank's compile must not move it in a retained layout. """
+    a, b = load_interned(make_bank(4), make_bank(12))
+    assert a.instruments[0].prim_region_sample.sample is b.instruments[0].prim_region_sample.sample
+
+    a.to_bytes(incremental=True)
+    b.to_bytes()
+    a.instruments[0].decay_index = 77
+    _, incremental = a.to_bytes(incremental=True)
+    _, full = a.to_bytes()
+
+    assert bytes(incremental) == bytes(full)
+    reloaded = InstrumentBank.from_bytes(a.index_entry, incremental)
+    assert reloaded.instruments[0].decay_index == 77
+    assert reloaded.digest() == a.digest()
+
+
+def test_incremental_compile_interned_audiobank():
+    """ Banks of an interned audiobank keep their own layouts while sharing samples, books, loops and envelopes. """
+    source = Audiobank()
+    source.banks = [make_bank(4), None, make_bank(12), make_bank(7)]
+    audiobank = Audiobank.from_bytes(*source.to_bytes(), intern=True)
+    a, _, b, c = audiobank.banks
+
+    shared = a.instruments[0].prim_region_sample.sample
+    assert shared is b.instruments[0].prim_region_sample.sample is c.instruments[0].prim_region_sample.sample
+
+    a.to_bytes(incremental=True)
+    b.to_bytes(incremental=True)
+    c.to_bytes()
+    shared.sample_addr = 0x400
+    a.instruments[1].decay_index = 99
+
+    incremental = [bytes(bank.to_bytes(incremental=True)[1]) for bank in (b, a)]
+    assert incremental == [bytes(bank.to_bytes()[1]) for bank in (b, a)]
+
+
+if __name__ == '__main__':
+    test_incremental_compile_after_other_bank_compiles()
+    test_incremental_compile_interned_audiobank()
@@ -5,13 +5,24 @@ z64lib.audio.audiobank
 
 # Order matters, import non-dependents first, then dependents
 from ._audiobank_index_entry import AudiobankIndexEntry
+from ._lazy_sequence import LazySequence
+from ._bank_validator import BankIssue, BankValidator, validate_bank
+from ._intern_pool import InternPool
 from ._instrument_bank import InstrumentBank
+from ._sample_usage_index import SampleUser, SampleUsageIndex
 from ._audiobank_index import AudiobankIndex
 from ._audiobank import Audiobank
 
 __all__ = [
     'AudiobankIndexEntry',
+    'LazySequence',
+    'BankIssue',
+    'BankValidator',
+    'validate_bank',
+    'InternPool',
     'InstrumentBank',
+    'SampleUser',
+    'SampleUsageIndex',
     'AudiobankIndex',
     'Audiobank',
 ]
\ No newline at end of file
@@ -1,15 +1,122 @@
-from z64lib.audiobank import AudiobankIndex
+import gc
+import mmap
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
+from pathlib import Path
+from z64lib.audiobank import AudiobankIndex, AudiobankIndexEntry
 from z64lib.audiobank import InstrumentBank
+from z64lib.audiobank import InternPool
+from z64lib.audiobank import LazySequence
+from z64lib.audiobank import SampleUsageIndex
+from z64lib.core.alignment import align_to
+from z64lib.core.enums import AllocationStrategy
+
+
+def _load_bank(entry: AudiobankIndexEntry | None, audiobank_data: bytes | bytearray | memoryview, lazy: bool = False,
+               intern_pool: InternPool | None = None) -> InstrumentBank | None:
+    """ Instantiates the instrument bank of a single index entry from the full `Audiobank` file data. """
+    if entry is None:
+        return None
+
+    bank_start = entry.rom_addr
+    bank_end = bank_start + entry.bank_size
+    bank_data = audiobank_data[bank_start:bank_end]
+    if lazy:
+        # Lazy banks retain their data, so it is copied out of the file's buffer
+        bank_data = bytes(bank_data)
+    return InstrumentBank.from_bytes(entry, bank_data, lazy=lazy, intern_pool=intern_pool)
+
+
+#region Worker Processes
+_worker_handle: shared_memory.SharedMemory | mmap.mmap | None = None
+_worker_data: memoryview | None = None
+
+
+def _attach_worker(shm_name: str | None, file_path: str | None):
+    """ Attaches a worker process to the `Audiobank` file data, by shared memory block name or by file path. """
+    global _worker_handle, _worker_data
+    if shm_name is not None:
+        _worker_handle = shared_memory.SharedMemory(name=shm_name)
+        _worker_data = _worker_handle.buf
+    else:
+        with open(file_path, 'rb') as f:
+            _worker_handle = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        _worker_data = memoryview(_worker_handle)
+
+
+def _load_bank_slice(job: tuple[bytes, int, int]) -> InstrumentBank:
+    """ Instantiates the instrument bank of an `(index entry, offset, size)` slice of the attached data. """
+    entry_bytes, offset, size = job
+    return InstrumentBank.from_bytes(entry_bytes, _worker_data[offset:offset + size])
+
+
+def _load_banks_in_processes(entries: list[AudiobankIndexEntry | None], max_workers: int | None,
+                             shm_name: str | None = None, file_path: str | None = None) -> list[InstrumentBank | None]:
+    """
+    Instantiates every instrument bank in worker processes attached to the `Audiobank` file
+    data, see `_attach_worker`. Banks are returned in index order, each with its own index
+    entry object.
+    """
+    jobs = [(entry.to_bytes(), entry.rom_addr, entry.bank_size) for entry in entries if entry is not None]
+    chunksize = max(1, len(jobs) // (4 * (max_workers or 1)))
+
+    # Unpickled banks are large acyclic graphs, collecting while they arrive only adds overhead
+    gc_enabled = gc.isenabled()
+    gc.disable()
+    try:
+        with ProcessPoolExecutor(max_workers=max_workers, initializer=_attach_worker, initargs=(shm_name, file_path)) as pool:
+            loaded = pool.map(_load_bank_slice, jobs, chunksize=chunksize)
+            banks = []
+            for entry in entries:
+                bank = None if entry is None else next(loaded)
+                if bank is not None:
+                    bank.index_entry = entry
+                banks.append(bank)
+    finally:
+        if gc_enabled:
+            gc.enable()
+    return banks
+
+
+def _intern_bank(bank: InstrumentBank | None, intern_pool: InternPool):
+    """ Interns every instrument, drum, and effect of a bank instantiated without a pool. """
+    if bank is None:
+        return
+    for entries in (bank.instruments, bank.drums, bank.effects):
+        for obj in entries:
+            intern_pool.intern(obj, bank.index_entry)
+#endregion
 
 
 class Audiobank:
     """ Represents the 'Audiobank' file in a Zelda64 ROM. """
     def __init__(self):
         self.index: AudiobankIndex = None
-        self.banks: list[InstrumentBank | None] = []
+        self.banks: list[InstrumentBank | None] | LazySequence = []
+        self.intern_pool: InternPool | None = None
+        self.sample_index: SampleUsageIndex | None = None
+        self._mmap: mmap.mmap | None = None
+
+    @classmethod
+    def _from_index(cls, audiobank_index: bytes | bytearray | AudiobankIndex, intern: bool) -> 'Audiobank':
+        """ Returns an audiobank object with no banks, see `from_bytes` for parameters. """
+        obj = cls()
+
+        # Set the 'Audiobank' file's index table located in the 'code' file.
+        if isinstance(audiobank_index, AudiobankIndex):
+            obj.index = audiobank_index
+        elif isinstance(audiobank_index, bytes | bytearray):
+            obj.index = AudiobankIndex.from_bytes(audiobank_index)
+        else:
+            raise TypeError(f"audiobank_index must be bytes or AudiobankIndex, not {type(audiobank_index).__name__}")
+
+        if intern:
+            obj.intern_pool = InternPool()
+        return obj
 
     @classmethod
-    def from_bytes(cls, audiobank_index: bytes | bytearray | AudiobankIndex, audiobank_data: bytes | bytearray) -> 'Audiobank':
+    def from_bytes(cls, audiobank_index: bytes | bytearray | AudiobankIndex, audiobank_data: bytes | bytearray | memoryview,
+                   lazy: bool = False, intern: bool = False, max_workers: int | None = 1) -> 'Audiobank':
         """
         Instantiats an audiobank object using binary data.
 
@@ -17,8 +124,21 @@ class Audiobank:
         ----------
         audiobank_index: bytes | bytearray | AudiobankIndex
             `Audiobank` file index data taken from the ROM's `code` file.
-        audiobank_data: bytes | bytearray
+        audiobank_data: bytes | bytearray | memoryview
             Binary `Audiobank` file data.
+        lazy: bool
+            Retain the `Audiobank` file data and only instantiate each instrument bank, and
+            each of its instruments, drums, and effects, the first time it is accessed. The
+            data is not copied, each bank's data is copied when the bank is first accessed,
+            so the data must not be modified or released before then.
+        intern: bool
+            Share identical samples, books, loops, and envelopes between every instrument,
+            drum, and effect of every bank, see `InternPool`.
+        max_workers: int | None
+            Number of processes banks are instantiated in, `None` uses every CPU and 1 loads
+            in this process. The data is copied once into a shared memory block, which every
+            worker attaches to and instantiates `(offset, size)` slices of. Ignored when
+            loading lazily.
 
         Returns
         ----------
@@ -30,28 +150,169 @@ class Audiobank:
         TypeError
             Invalid `audiobank_index` type.
         """
-        obj = cls()
+        obj = cls._from_index(audiobank_index, intern)
 
-        # Set the 'Audiobank' file's index table located in the 'code' file.
-        if isinstance(audiobank_index, AudiobankIndex):
-            obj.index = audiobank_index
-        elif isinstance(audiobank_index, bytes | bytearray):
-            obj.index = AudiobankIndex.from_bytes(audiobank_index)
-        else:
-            raise TypeError(f"audiobank_index must be bytes or AudiobankIndex, not {type(audiobank_index).__name__}")
+        if lazy:
+            obj.banks = LazySequence(
+                audiobank_data,
+                [None if entry is None else i for i, entry in enumerate(obj.index.entries)],
+                lambda data, i: _load_bank(obj.index.entries[i], data, lazy=True, intern_pool=obj.intern_pool),
+            )
+            return obj
 
-        # Store entries as InstrumentBank objects
-        for entry in obj.index.entries:
-            if entry is None:
-                obj.banks.append(None)
-                continue
+        entries = obj.index.entries
+        if max_workers != 1 and sum(entry is not None for entry in entries) > 1:
+            shm = shared_memory.SharedMemory(create=True, size=len(audiobank_data))
+            try:
+                shm.buf[:len(audiobank_data)] = audiobank_data
+                obj.banks = _load_banks_in_processes(entries, max_workers, shm_name=shm.name)
+            finally:
+                shm.close()
+                shm.unlink()
+            obj._intern_banks()
+            return obj
+
+        # Store entries as InstrumentBank objects, banks are sliced from a single view so the data is never copied
+        view = memoryview(audiobank_data)
+        try:
+            obj.banks = [_load_bank(entry, view, intern_pool=obj.intern_pool) for entry in obj.index.entries]
+        finally:
+            view.release()
 
-            bank_start = entry.rom_addr
-            bank_end = bank_start + entry.bank_size
-            bank_data = audiobank_data[bank_start:bank_end]
+        return obj
 
-            bank = InstrumentBank.from_bytes(entry, bank_data)
+    @classmethod
+    def from_file(cls, audiobank_index: bytes | bytearray | AudiobankIndex, file_path: str | Path,
+                  lazy: bool = False, intern: bool = False, max_workers: int | None = 1) -> 'Audiobank':
+        """
+        Instantiates an audiobank object from an `Audiobank` file.
 
-            obj.banks.append(bank)
+        The file is memory mapped, so only the pages of each bank are read. When loading
+        lazily, the file stays mapped until `close()` is called, or until the audiobank is
+        used as a context manager and the context exits.
 
+        Parameters
+        ----------
+        audiobank_index: bytes | bytearray | AudiobankIndex
+            `Audiobank` file index data taken from the ROM's `code` file.
+        file_path: str | Path
+            Path to the binary `Audiobank` file.
+        lazy: bool
+            Only instantiate each instrument bank and its entries the first time it is accessed.
+        intern: bool
+            Share identical samples, books, loops, and envelopes between every bank.
+        max_workers: int | None
+            Number of processes banks are instantiated in, `None` uses every CPU and 1 loads
+            in this process. Every worker maps the file itself and instantiates `(offset, size)`
+            slices of it, so the data is never copied. Ignored when loading lazily.
+
+        Returns
+        ----------
+        Audiobank
+            Returns a fully instantiated `Audiobank` object.
+        """
+        if max_workers != 1 and not lazy:
+            obj = cls._from_index(audiobank_index, intern)
+            obj.banks = _load_banks_in_processes(obj.index.entries, max_workers, file_path=str(file_path))
+            obj._intern_banks()
+            return obj
+
+        with open(file_path, 'rb') as f:
+            data = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        if not lazy:
+            with data:
+                return cls.from_bytes(audiobank_index, data, intern=intern)
+
+        obj = cls.from_bytes(audiobank_index, data, lazy=True, intern=intern)
+        obj._mmap = data
         return obj
+
+    def _intern_banks(self):
+        """ Interns every bank instantiated in worker processes, which cannot share this process' pool. """
+        if self.intern_pool is not None:
+            for bank in self.banks:
+                _intern_bank(bank, self.intern_pool)
+
+    def close(self):
+        """ Unmaps the file a lazy audiobank was instantiated from, banks not accessed yet can no longer be instantiated. """
+        if self._mmap is not None:
+            self._mmap.close()
+            self._mmap = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def build_sample_index(self) -> SampleUsageIndex:
+        """
+        Builds the index of every `Audiotable` sample used by the audiobank's instrument banks.
+
+        The index is kept in `sample_index`. After editing a bank, update the index with
+        `SampleUsageIndex.add_entry()` or `SampleUsageIndex.add_bank()` instead of rebuilding it.
+
+        Returns
+        ----------
+        SampleUsageIndex
+            The index of every sample used by every bank.
+        """
+        self.sample_index = SampleUsageIndex.from_banks(self.banks)
+        return self.sample_index
+
+    def to_bytes(self, alignment: int = 0x10, dedupe_banks: bool = True, structural_dedupe: bool = False,
+                 strategy: AllocationStrategy | str = AllocationStrategy.BUMP) -> tuple[bytes, bytes]:
+        """
+        Compiles every instrument bank, then places them in a single `Audiobank` file and
+        regenerates the index.
+
+        The `rom_addr`, `bank_size`, `num_instruments`, `num_drums`, and `num_effects` of every
+        bank's index entry are updated to match the output.
+
+        Parameters
+        ----------
+        alignment: int
+            Alignment of each bank's address in the `Audiobank` file.
+        dedupe_banks: bool
+            Place byte-identical banks once, their index entries share a `rom_addr`.
+        structural_dedupe: bool
+            Deduplicate objects within each bank by structural hash instead of by their
+            serialized bytes.
+        strategy: AllocationStrategy | str
+            Strategy used to place objects within each bank.
+
+        Returns
+        ----------
+        tuple[bytes, bytes]
+            The `Audiobank` index table and the `Audiobank` file data.
+        """
+        # Compiling assigns addresses to objects, which banks loaded with `intern` share
+        banks = list(self.banks)
+        compiled = [None if bank is None else bank.to_bytes(structural_dedupe=structural_dedupe, strategy=strategy)[1] for bank in banks]
+
+        data = bytearray()
+        placed: dict[bytes, int] = {}
+        for bank, bank_bytes in zip(banks, compiled):
+            if bank is None:
+                continue
+
+            bank_bytes = bytes(bank_bytes)
+            address = placed.get(bank_bytes) if dedupe_banks else None
+            if address is None:
+                address = align_to(len(data), alignment)
+                data.extend(bytes(address - len(data)))
+                data.extend(bank_bytes)
+                placed[bank_bytes] = address
+
+            entry = bank.index_entry
+            entry.rom_addr = address
+            entry.bank_size = len(bank_bytes)
+            entry.num_instruments = len(bank.instruments)
+            entry.num_drums = len(bank.drums)
+            entry.num_effects = len(bank.effects)
+
+        if self.index is None:
+            self.index = AudiobankIndex()
+        self.index.entries = [None if bank is None else bank.index_entry for bank in banks]
+
+        return (self.index.to_bytes(), bytes(data))
@@ -1,13 +1,31 @@
-import struct
 from z64lib.audiobank import AudiobankIndexEntry
+from z64lib.core.index_table import IndexTable
 
 
 class AudiobankIndex:
-    """ Represents an index of audiobank entries. """
+    """
+    Represents an index of audiobank entries.
+
+    The table is encoded and decoded as an `IndexTable[AudiobankIndexEntry]`, which unpacks
+    every row in a single pass. Entries are kept as `AudiobankIndexEntry` objects, because
+    each instrument bank holds its own entry.
+    """
+    TABLE: type = IndexTable[AudiobankIndexEntry]
+
     def __init__(self):
         self.num_entries: int = 0
+        self.header: bytes = b'\x00' * 0x0E
         self.entries: list[AudiobankIndexEntry | None] = []
 
+    @classmethod
+    def from_table(cls, table: IndexTable) -> 'AudiobankIndex':
+        """ Instantiates an `AudiobankIndex` object from a decoded index table, null entries are `None`. """
+        obj = cls()
+        obj.num_entries = len(table)
+        obj.header = table.header
+        obj.entries = list(table)
+        return obj
+
     @classmethod
     def from_bytes(cls, audiobank_index: bytes | bytearray) -> 'AudiobankIndex':
         """
@@ -23,26 +41,25 @@ class AudiobankIndex:
         AudiobankIndex
             Returns a fully instantiated `AudiobankIndex` object.
         """
-        obj = cls()
-
-        # Extract the number of entries from the table's first 2 bytes
-        obj.num_entries = struct.unpack('>H', audiobank_index[0:2])[0]
+        # Null entries are `None`, the first bank may be located at address 0
+        return cls.from_table(cls.TABLE.from_bytes(audiobank_index))
 
-        # Split the entries from the full table
-        entries = audiobank_index[0x10:]
+    def to_table(self) -> IndexTable:
+        """ Returns the index as an `IndexTable[AudiobankIndexEntry]`, null entries are written as zeroes. """
+        table = self.TABLE()
+        table.header = self.header
+        for entry in self.entries:
+            table.append(entry)
+        return table
 
-        # Store entries as AudiobankIndexEntry objects
-        for i in range(0, obj.num_entries):
-            start = i * 0x10
-            end = start + 0x10
-            entry_data = entries[start:end]
-
-            entry = AudiobankIndexEntry.from_bytes(entry_data)
-
-            # Treat null entries as None
-            if entry.rom_addr == 0:
-                obj.entries.append(None)
-            else:
-                obj.entries.append(entry)
+    def to_bytes(self) -> bytes:
+        """
+        Compiles an `AudiobankIndex` object from memory to binary.
 
-        return obj
\ No newline at end of file
+        Returns
+        ----------
+        bytes
+            The index table, null entries are written as zeroes.
+        """
+        self.num_entries = len(self.entries)
+        return self.to_table().to_bytes()
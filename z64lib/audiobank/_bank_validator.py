@@ -0,0 +1,232 @@
+import struct
+from dataclasses import dataclass
+from z64lib.audiobank import AudiobankIndexEntry
+from z64lib.core.audio import ENVELOPE_POINT_SIZE, MAX_ENVELOPE_POINTS, decode_envelope
+from z64lib.core.enums import AudioSampleCodec, VadpcmLoopCount
+
+
+@dataclass(frozen=True)
+class BankIssue:
+    """
+    A problem found while validating an instrument bank.
+
+    Attributes
+    ----------
+    offset: int
+        Offset of the offending data in the bank.
+    path: str
+        Location of the offending data, e.g. `instruments[3].envelope`.
+    message: str
+        Description of the problem.
+    """
+    offset: int
+    path: str
+    message: str
+
+    def __str__(self):
+        return f"{self.path} @ {self.offset:#06x}: {self.message}"
+
+
+class BankValidator:
+    """
+    Validates binary instrument bank data before it is decoded.
+
+    The bank is checked in a single pass. Every instrument, drum, and effect pointer, every
+    envelope terminator, and every sample, book, and loop header is checked against the bank
+    bounds and the alignment the audio driver requires. Data shared by several referrers is
+    only checked once. Every problem is collected instead of stopping at the first one.
+
+    Attributes
+    ----------
+    bank_data: bytes | bytearray | memoryview
+        The bank data being validated.
+    index_entry: AudiobankIndexEntry
+        The bank's index entry, which holds the number of instruments, drums, and effects.
+    issues: list[BankIssue]
+        Every problem found so far.
+    """
+    INSTRUMENT_SIZE: int = 0x20
+    DRUM_SIZE: int = 0x10
+    EFFECT_SIZE: int = 0x08
+    SAMPLE_SIZE: int = 0x10
+    BOOK_HEADER_SIZE: int = 0x08
+    LOOP_HEADER_SIZE: int = 0x10
+    LOOP_PREDICTORS_SIZE: int = 0x20
+    ENVELOPE_POINT_SIZE: int = ENVELOPE_POINT_SIZE
+
+    WORD_ALIGNMENT: int = 0x04
+    HALFWORD_ALIGNMENT: int = 0x02
+    DMA_ALIGNMENT: int = 0x08
+
+    MAX_ENVELOPE_POINTS: int = MAX_ENVELOPE_POINTS
+    MAX_BOOK_ORDER: int = 8
+    MAX_BOOK_PREDICTORS: int = 16
+
+    _WORD = struct.Struct('>I')
+    _BOOK_HEADER = struct.Struct('>2i')
+    _LOOP_HEADER = struct.Struct('>4I')
+
+    def __init__(self, index_entry: AudiobankIndexEntry, bank_data: bytes | bytearray | memoryview):
+        self.index_entry: AudiobankIndexEntry = index_entry
+        self.bank_data = bank_data
+        self.issues: list[BankIssue] = []
+        self._size: int = len(bank_data)
+        self._visited: set[tuple[str, int]] = set()
+
+    def validate(self) -> list[BankIssue]:
+        """
+        Checks the whole bank.
+
+        Returns
+        ----------
+        list[BankIssue]
+            Every problem found, empty if the bank is valid.
+        """
+        entry = self.index_entry
+        if self._size < 0x08:
+            self._issue(0, 'header', f"Bank is {self._size:#x} bytes, smaller than its 0x08 byte header")
+            return self.issues
+
+        drum_list, effect_list = struct.unpack_from('>2I', self.bank_data, 0)
+
+        # Instruments
+        if self._check_range(0x08, 4 * entry.num_instruments, 'instruments', 'Instrument list'):
+            for i in range(entry.num_instruments):
+                self._instrument(0x08 + 4 * i, self._word(0x08 + 4 * i), f'instruments[{i}]')
+
+        # Drums
+        if entry.num_drums and self._check_pointer(0x00, drum_list, 4 * entry.num_drums, self.WORD_ALIGNMENT, 'drums', 'Drum list'):
+            for i in range(entry.num_drums):
+                self._drum(drum_list + 4 * i, self._word(drum_list + 4 * i), f'drums[{i}]')
+
+        # Effects, stored inline in the effect list
+        if entry.num_effects > 0 and self._check_pointer(0x04, effect_list, self.EFFECT_SIZE * entry.num_effects, self.WORD_ALIGNMENT, 'effects', 'Effect list'):
+            for i in range(entry.num_effects):
+                addr = effect_list + self.EFFECT_SIZE * i
+                self._sample(addr, self._word(addr), f'effects[{i}].tuned_sample.sample', nullable=True)
+
+        return self.issues
+
+    #region Checks
+    def _issue(self, offset: int, path: str, message: str):
+        self.issues.append(BankIssue(offset, path, message))
+
+    def _word(self, offset: int) -> int:
+        return self._WORD.unpack_from(self.bank_data, offset)[0]
+
+    def _check_range(self, offset: int, size: int, path: str, name: str) -> bool:
+        if offset + size > self._size:
+            self._issue(offset, path, f"{name} ({size:#x} bytes) extends past the end of the bank ({self._size:#x} bytes)")
+            return False
+        return True
+
+    def _check_pointer(self, site: int, target: int, size: int, alignment: int, path: str, name: str) -> bool:
+        """ Checks a non-null pointer's target against the bank bounds and the required alignment. """
+        if target == 0:
+            self._issue(site, path, f"{name} pointer is null")
+            return False
+        if target % alignment:
+            self._issue(site, path, f"{name} pointer {target:#x} is not {alignment:#x}-byte aligned")
+            return False
+        return self._check_range(target, size, path, name)
+
+    def _first_visit(self, kind: str, offset: int) -> bool:
+        key = (kind, offset)
+        if key in self._visited:
+            return False
+        self._visited.add(key)
+        return True
+
+    def _instrument(self, site: int, addr: int, path: str):
+        if addr == 0 or not self._check_pointer(site, addr, self.INSTRUMENT_SIZE, self.WORD_ALIGNMENT, path, 'Instrument'):
+            return
+        if not self._first_visit('instrument', addr):
+            return
+
+        self._envelope(addr + 0x04, self._word(addr + 0x04), f'{path}.envelope')
+        for region, offset in (('low_region_sample', 0x08), ('prim_region_sample', 0x10), ('high_region_sample', 0x18)):
+            self._sample(addr + offset, self._word(addr + offset), f'{path}.{region}.sample', nullable=region != 'prim_region_sample')
+
+    def _drum(self, site: int, addr: int, path: str):
+        if addr == 0 or not self._check_pointer(site, addr, self.DRUM_SIZE, self.WORD_ALIGNMENT, path, 'Drum'):
+            return
+        if not self._first_visit('drum', addr):
+            return
+
+        self._sample(addr + 0x04, self._word(addr + 0x04), f'{path}.tuned_sample.sample', nullable=False)
+        self._envelope(addr + 0x0C, self._word(addr + 0x0C), f'{path}.envelope')
+
+    def _envelope(self, site: int, addr: int, path: str):
+        if not self._check_pointer(site, addr, self.ENVELOPE_POINT_SIZE, self.HALFWORD_ALIGNMENT, path, 'Envelope'):
+            return
+        if not self._first_visit('envelope', addr):
+            return
+
+        # Points are read until an opcode is found, as the audio driver does
+        try:
+            decode_envelope(self.bank_data, addr, self.MAX_ENVELOPE_POINTS)
+        except ValueError as e:
+            self._issue(addr, path, str(e))
+
+    def _sample(self, site: int, addr: int, path: str, nullable: bool):
+        if addr == 0:
+            if not nullable:
+                self._issue(site, path, "Sample pointer is null")
+            return
+        if not self._check_pointer(site, addr, self.SAMPLE_SIZE, self.WORD_ALIGNMENT, path, 'Sample'):
+            return
+        if not self._first_visit('sample', addr):
+            return
+
+        codec = (self._word(addr) >> 28) & 0b111
+        if codec not in AudioSampleCodec._value2member_map_:
+            self._issue(addr, path, f"Invalid sample codec {codec}")
+
+        self._loop(addr + 0x08, self._word(addr + 0x08), f'{path}.loop')
+        self._book(addr + 0x0C, self._word(addr + 0x0C), f'{path}.book')
+
+    def _book(self, site: int, addr: int, path: str):
+        if not self._check_pointer(site, addr, self.BOOK_HEADER_SIZE, self.DMA_ALIGNMENT, path, 'Book'):
+            return
+        if not self._first_visit('book', addr):
+            return
+
+        order, num_predictors = self._BOOK_HEADER.unpack_from(self.bank_data, addr)
+        if not 0 < order <= self.MAX_BOOK_ORDER or not 0 < num_predictors <= self.MAX_BOOK_PREDICTORS:
+            self._issue(addr, path, f"Invalid book header: order {order}, {num_predictors} predictors")
+            return
+        self._check_range(addr, self.BOOK_HEADER_SIZE + 16 * order * num_predictors, path, 'Book')
+
+    def _loop(self, site: int, addr: int, path: str):
+        if not self._check_pointer(site, addr, self.LOOP_HEADER_SIZE, self.DMA_ALIGNMENT, path, 'Loop'):
+            return
+        if not self._first_visit('loop', addr):
+            return
+
+        loop_start, loop_end, loop_count, _num_samples = self._LOOP_HEADER.unpack_from(self.bank_data, addr)
+        if loop_start > loop_end:
+            self._issue(addr, path, f"Loop start {loop_start} is after loop end {loop_end}")
+
+        # Predictor states only follow the header of looping samples
+        if loop_start != 0 and loop_count != VadpcmLoopCount.NO_LOOP:
+            self._check_range(addr, self.LOOP_HEADER_SIZE + self.LOOP_PREDICTORS_SIZE, path, 'Loop')
+    #endregion
+
+
+def validate_bank(index_entry: AudiobankIndexEntry, bank_data: bytes | bytearray | memoryview) -> list[BankIssue]:
+    """
+    Validates binary instrument bank data before it is decoded, see `BankValidator`.
+
+    Parameters
+    ----------
+    index_entry: AudiobankIndexEntry
+        The bank's index entry.
+    bank_data: bytes | bytearray | memoryview
+        Binary instrument bank data.
+
+    Returns
+    ----------
+    list[BankIssue]
+        Every problem found, empty if the bank is valid.
+    """
+    return BankValidator(index_entry, bank_data).validate()
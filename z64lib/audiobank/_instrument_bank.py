@@ -1,11 +1,20 @@
 from pathlib import Path
+import hashlib
 import struct
+import threading
+from concurrent.futures import ThreadPoolExecutor
 from dataclasses import dataclass
 from z64lib.audiobank import AudiobankIndexEntry
+from z64lib.audiobank import validate_bank
+from z64lib.audiobank import InternPool
+from z64lib.audiobank import LazySequence
 from z64lib.audiobank.structs import Drum
 from z64lib.audiobank.structs import Instrument
 from z64lib.audiobank.structs import SoundEffect
-from z64lib.core.allocation import MemoryAllocator
+from z64lib.core.allocation import MemoryAllocator, RelocationTable, pointer_sites
+from z64lib.core.enums import AllocationStrategy
+from z64lib.core.exceptions import BankValidationError
+from z64lib.core.helpers import open_binary
 
 
 @dataclass
@@ -21,21 +30,33 @@ class InstrumentBank:
     ----------
     index_entry: AudiobankIndexEntry
         The instrument bank's corresponding entry from the `code` file's audiobank index.
-    instruments: list[Instrument | None]
+    instruments: list[Instrument | None] | LazySequence
         The instruments contained in the instrument bank.
-    drums: list[Drum | None]
+    drums: list[Drum | None] | LazySequence
         The drums contained in the instrument bank.
-    effects: list[SoundEffect | None]
+    effects: list[SoundEffect | None] | LazySequence
         The sound effects contained in the instrument bank.
+    relocations: RelocationTable | None
+        Every pointer written by the last call to `to_bytes()`, which can be used to
+        relocate the compiled bank to a new base address.
     """
     def __init__(self):
         self.index_entry: AudiobankIndexEntry = None
         self.instruments: list[Instrument | None] = []
         self.drums: list[Drum | None] = []
         self.effects: list[SoundEffect | None] = []
+        self.relocations: RelocationTable | None = None
+
+        # State retained by incremental compilation
+        self._allocator: MemoryAllocator | None = None
+        self._image: bytearray | None = None
+        self._compiled_objects: list | None = None
+        self._compiled_slots: tuple | None = None
+        self._compiled_stamps: dict[int, object] = {}
 
     @classmethod
-    def from_bytes(cls, index_entry: bytes | bytearray | AudiobankIndexEntry, bank_data: bytes | bytearray) -> 'InstrumentBank':
+    def from_bytes(cls, index_entry: bytes | bytearray | AudiobankIndexEntry, bank_data: bytes | bytearray,
+                   lazy: bool = False, intern_pool: InternPool | None = None, validate: bool = False) -> 'InstrumentBank':
         """
         Instantiates an `InstrumentBank` object from binary data.
 
@@ -45,6 +66,14 @@ class InstrumentBank:
             `Audiobank` file index entry data taken from the ROM's `code` file.
         bank_data: bytes | bytearray
             Binary instrument bank data.
+        lazy: bool
+            Retain the bank data and only instantiate each instrument, drum, and effect the
+            first time it is accessed.
+        intern_pool: InternPool | None
+            Pool used to share identical samples, books, loops, and envelopes with other
+            instruments, drums, effects, and banks.
+        validate: bool
+            Validate the whole bank with `validate_bank()` before decoding anything.
 
         Returns
         ----------
@@ -55,6 +84,8 @@ class InstrumentBank:
         ----------
         TypeError
             Invalid `index_entry` type.
+        BankValidationError
+            The bank failed validation, every problem found is reported.
         """
         obj = cls()
 
@@ -65,6 +96,11 @@ class InstrumentBank:
         else:
             raise TypeError(f"index_entry must be bytes or AudiobankIndexEntry, not {type(index_entry).__name__}")
 
+        if validate:
+            issues = validate_bank(obj.index_entry, bank_data)
+            if issues:
+                raise BankValidationError(issues)
+
         # Extract the offsets for the drum list and effect list
         drum_list_addr, effect_list_addr = struct.unpack('>2I', bank_data[:0x08])
 
@@ -74,55 +110,157 @@ class InstrumentBank:
         # 8 bytes long instead of 4 bytes, because that is the size of the TunedSample struct.
 
         # Drums
+        drum_offsets = []
         for i in range(0, obj.index_entry.num_drums):
             addr = drum_list_addr + (i * 4)
             drum_addr = struct.unpack_from('>I', bank_data, addr)[0]
-            if drum_addr != 0:
-                obj.drums.append(Drum.from_bytes(bank_data, drum_addr))
-            else:
-                obj.drums.append(None) # Preserve null
+            drum_offsets.append(drum_addr or None) # Preserve null
 
         # Effects
+        effect_offsets = []
         for i in range(0, obj.index_entry.num_effects):
             addr = effect_list_addr + (8 * i)
             effect = bank_data[addr:addr + 0x08]
-            if effect != (b'\x00' * 8):
-                obj.effects.append(SoundEffect.from_bytes(bank_data, addr))
-            else:
-                obj.effects.append(None) # Preserve null
+            effect_offsets.append(addr if effect != (b'\x00' * 8) else None) # Preserve null
 
         # Instruments
+        instrument_offsets = []
         for i in range(0, obj.index_entry.num_instruments):
             addr = 0x08 + (i * 4)
             instrument_addr = struct.unpack_from('>I', bank_data, addr)[0]
-            if instrument_addr != 0:
-                obj.instruments.append(Instrument.from_bytes(bank_data, instrument_addr))
-            else:
-                obj.instruments.append(None) # Preserve null
+            instrument_offsets.append(instrument_addr or None) # Preserve null
+
+        def decoder(struct_type):
+            if intern_pool is None:
+                return struct_type.from_bytes
+            return lambda data, addr: intern_pool.intern(struct_type.from_bytes(data, addr), obj.index_entry)
+
+        if lazy:
+            # Entries are decoded on first access, so the bank data must outlive the caller's buffer
+            bank_data = bytes(bank_data)
+            obj.drums = LazySequence(bank_data, drum_offsets, decoder(Drum))
+            obj.effects = LazySequence(bank_data, effect_offsets, decoder(SoundEffect))
+            obj.instruments = LazySequence(bank_data, instrument_offsets, decoder(Instrument))
+        else:
+            obj.drums = [decoder(Drum)(bank_data, addr) if addr else None for addr in drum_offsets]
+            obj.effects = [decoder(SoundEffect)(bank_data, addr) if addr else None for addr in effect_offsets]
+            obj.instruments = [decoder(Instrument)(bank_data, addr) if addr else None for addr in instrument_offsets]
 
         return obj
 
+    def write_to(self, bank_file, meta_file=None, truncate_index_entry: bool = False, structural_dedupe: bool = False,
+                 strategy: AllocationStrategy | str = AllocationStrategy.BUMP) -> int:
+        """
+        Compiles an `InstrumentBank` object and streams the bank to a file as it is laid out,
+        without building the full bank in memory.
+
+        Parameters
+        ----------
+        bank_file: str | Path | BinaryIO
+            Path or binary file object the bank is written to.
+        meta_file: str | Path | BinaryIO | None
+            Path or binary file object the index entry is written to, if any.
+        truncate_index_entry: bool
+            Output the truncated 0x08 byte index entry used by randomizers.
+        structural_dedupe: bool
+            Deduplicate objects by structural hash instead of by their serialized bytes.
+        strategy: AllocationStrategy | str
+            Strategy used to place objects.
+
+        Returns
+        ----------
+        int
+            The size of the bank in bytes.
+        """
+        allocator = MemoryAllocator(structural_dedupe=structural_dedupe, strategy=strategy)
+        self._assign_addresses(allocator)
+        self.relocations = allocator.relocations
+
+        with open_binary(bank_file) as f:
+            size = allocator.write_to(f)
+
+        if meta_file is not None:
+            index_bytes = self.index_entry.to_bytes()
+            with open_binary(meta_file) as f:
+                f.write(index_bytes[-8:] if truncate_index_entry else index_bytes)
+
+        return size
+
     def write_bytes(self, file_name: str, file_path: str | Path, output_metadata: bool = True, truncate_metadata: bool = False, output_bank: bool = True):
         """
         Compiles an `InstrumentBank` object from memory to binary, then writes the output to a file.
         """
-        from pathlib import Path
-
         out_path = Path(file_path)
-        bankmeta_bytes, bank_bytes = self.to_bytes(truncate_index_entry=truncate_metadata)
 
-        if output_metadata:
-            (out_path / f'{file_name}.bankmeta').write_bytes(bankmeta_bytes)
         if output_bank:
-            (out_path / f'{file_name}.zbank').write_bytes(bank_bytes)
+            meta_file = out_path / f'{file_name}.bankmeta' if output_metadata else None
+            self.write_to(out_path / f'{file_name}.zbank', meta_file, truncate_index_entry=truncate_metadata)
+        elif output_metadata:
+            index_bytes = self.index_entry.to_bytes()
+            (out_path / f'{file_name}.bankmeta').write_bytes(index_bytes[-8:] if truncate_metadata else index_bytes)
+
+    @classmethod
+    def write_batch(cls, banks: dict[str, 'InstrumentBank'], file_path: str | Path, truncate_metadata: bool = False,
+                    max_workers: int = 4, max_pending: int = 16):
+        """
+        Compiles many `InstrumentBank` objects, then writes each bank's `.zbank` and `.bankmeta`
+        files using a bounded thread pool for the file I/O.
+
+        Banks are compiled one at a time in the calling thread, because banks may share objects
+        whose addresses are assigned while compiling. Only the writes run in the pool.
+
+        Parameters
+        ----------
+        banks: dict[str, InstrumentBank]
+            The banks to write, by file name.
+        file_path: str | Path
+            Directory the files are written to.
+        truncate_metadata: bool
+            Output the truncated 0x08 byte index entries used by randomizers.
+        max_workers: int
+            Number of worker threads writing files.
+        max_pending: int
+            Maximum number of compiled banks waiting to be written, which bounds memory use.
+        """
+        out_path = Path(file_path)
+        pending = threading.BoundedSemaphore(max_pending)
+
+        def write(name: str, index_bytes: bytes, bank_bytes: bytearray):
+            try:
+                (out_path / f'{name}.bankmeta').write_bytes(index_bytes)
+                (out_path / f'{name}.zbank').write_bytes(bank_bytes)
+            finally:
+                pending.release()
+
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            futures = []
+            for name, bank in banks.items():
+                index_bytes, bank_bytes = bank.to_bytes(truncate_index_entry=truncate_metadata)
+                pending.acquire()
+                futures.append(executor.submit(write, name, index_bytes, bank_bytes))
+
+            for future in futures:
+                future.result()
 
     def _all_objects(self):
-        """"""
+        """
+        Returns every object that must be placed in the bank.
+
+        Pointer targets are listed before the objects that point to them, so each object's
+        pointers already resolve to their final addresses when it is reserved and its bytes
+        can be safely compared for deduplication.
+        """
         inst_objs = []
         drum_objs = []
-        sample_objs = [] # Samples with books and loops
+        sample_objs = [] # Books and loops, followed by their samples
         env_objs = []
 
+        def add_sample(sample):
+            for child in (sample.book, sample.loop):
+                if child is not None:
+                    sample_objs.append(child)
+            sample_objs.append(sample)
+
         for instrument in self.instruments:
             if instrument:
                 inst_objs.append(instrument)
@@ -132,10 +270,7 @@ class InstrumentBank:
                 for attr in ['low_region_sample', 'prim_region_sample', 'high_region_sample']:
                     tuned_sample = getattr(instrument, attr, None)
                     if tuned_sample and tuned_sample.sample:
-                        sample = tuned_sample.sample
-                        sample_objs.append(sample)
-                        sample_objs.append(sample.book)
-                        sample_objs.append(sample.loop)
+                        add_sample(tuned_sample.sample)
 
         for drum in self.drums:
             if drum and drum.tuned_sample:
@@ -145,72 +280,67 @@ class InstrumentBank:
                     env_objs.append(envelope)
                 sample = getattr(drum.tuned_sample, 'sample', None)
                 if sample:
-                    sample_objs.append(sample)
-                    sample_objs.append(sample.book)
-                    sample_objs.append(sample.loop)
+                    add_sample(sample)
 
 
         for effect in self.effects:
             if effect and effect.tuned_sample:
                 sample = getattr(effect.tuned_sample, 'sample', None)
                 if sample:
-                    sample_objs.append(sample)
-                    sample_objs.append(sample.book)
-                    sample_objs.append(sample.loop)
+                    add_sample(sample)
 
+        # Shared objects are listed once, at their first referrer
         all_objects = sample_objs + env_objs + inst_objs + drum_objs
-        return all_objects
+        return list({id(obj): obj for obj in all_objects}.values())
 
     def _assign_addresses(self, allocator: MemoryAllocator):
         """
         Reserve memory for all instruments, drums, effects, and substructures.
         Lists are reserved after the first 0x08 bytes (header).
         """
-        allocator.reserve_at(0x00, 8, data=b'\x00'*8)
+        # The header and lists are placeholders that are written later, never deduplicate them
+        allocator.reserve_at(0x00, 8, data=b'\x00'*8, deduplicate=False)
 
         inst_list_bytes = b'\x00' * 4 * len(self.instruments)
-        allocator.reserve_at(0x08, len(inst_list_bytes), data=inst_list_bytes)
+        allocator.reserve_at(0x08, len(inst_list_bytes), data=inst_list_bytes, deduplicate=False)
         self._instrument_list = BankPointer(0x08)
 
-        # Align to 0x80, then assign instrument, drum, sample, loop, book, and envelope addresses
-        allocator.address = allocator.align_to(allocator.address, 0x10)
-        for obj in self._all_objects():
-            if hasattr(obj, 'size'):
-                allocator.reserve_mem(obj, obj.size(), aligned=True)
-            else:
-                allocator.reserve_mem(obj, 0x10, aligned=True)
+        if allocator.strategy is AllocationStrategy.BUMP:
+            # Align to 0x80, then assign instrument, drum, sample, loop, book, and envelope addresses
+            allocator.align(0x10)
+            for obj in self._all_objects():
+                if hasattr(obj, 'size'):
+                    allocator.reserve_mem(obj, obj.size(), aligned=True)
+                else:
+                    allocator.reserve_mem(obj, 0x10, aligned=True)
+        else:
+            # Books and loop predictor states are loaded by RSP DMA, which requires 8-byte alignment
+            allocator.reserve_packed(self._all_objects(), alignment=0x08)
 
         if self.drums:
             drum_list_bytes = b'\x00' * 4 * len(self.drums)
-            drum_list_addr = allocator.align_to(allocator.address, 0x10)
-            allocator.reserve_at(drum_list_addr, len(drum_list_bytes), data=drum_list_bytes)
+            drum_list_addr = allocator.malloc(len(drum_list_bytes), data=drum_list_bytes, deduplicate=False)
             self._drum_list = BankPointer(drum_list_addr)
         else:
             self._drum_list = BankPointer(0)
 
         if self.effects:
             effect_list_bytes = b'\x00' * 8 * len(self.effects)
-            effect_list_addr = allocator.align_to(allocator.address, 0x10)
-            allocator.reserve_at(effect_list_addr, len(effect_list_bytes), data=effect_list_bytes)
+            effect_list_addr = allocator.malloc(len(effect_list_bytes), data=effect_list_bytes, deduplicate=False)
             self._effect_list = BankPointer(effect_list_addr)
         else:
             self._effect_list = BankPointer(0)
 
-        inst_list_bytes = b''.join(
-            struct.pack('>I', getattr(inst, 'allocated_address', 0)) if inst else b'\x00\x00\x00\x00'
-            for inst in self.instruments
-        )
-        allocator.write(self._instrument_list.address, inst_list_bytes)
+        # Record every list and header pointer, they are resolved when the bank is assembled
+        for i, inst in enumerate(self.instruments):
+            if inst:
+                allocator.add_relocation(self._instrument_list.address + (i * 4), inst)
 
-        # Properly write the drum list
-        if self.drums:
-            drum_list_bytes = b''.join(
-                struct.pack('>I', getattr(d, 'allocated_address', 0)) if d else b'\x00\x00\x00\x00'
-                for d in self.drums
-            )
-            allocator.write(self._drum_list.address, drum_list_bytes)
+        for i, drum in enumerate(self.drums):
+            if drum:
+                allocator.add_relocation(self._drum_list.address + (i * 4), drum)
 
-        # Properly write the effect list
+        # Effects are stored inline, so write them and record the pointers they contain
         if self.effects:
             effect_list_bytes = b''.join(
                 effect.to_bytes() if effect else b'\x00' * 8
@@ -218,15 +348,215 @@ class InstrumentBank:
             )
             allocator.write(self._effect_list.address, effect_list_bytes)
 
-        header_bytes = struct.pack('>2I', self._drum_list.address, self._effect_list.address)
-        allocator.write(0x00, header_bytes)
+            for i, effect in enumerate(self.effects):
+                if effect:
+                    allocator.record_pointers(effect, self._effect_list.address + (i * 8))
 
-    def to_bytes(self, truncate_index_entry: bool = False) -> tuple[bytes, bytes]:
-        """"""
-        allocator = MemoryAllocator()
-        self._assign_addresses(allocator)
+        if self._drum_list.address:
+            allocator.add_relocation(0x00, self._drum_list.address)
+        if self._effect_list.address:
+            allocator.add_relocation(0x04, self._effect_list.address)
+
+    def _slots(self, strategy: AllocationStrategy, structural_dedupe: bool) -> tuple:
+        return (list(self.instruments), list(self.drums), list(self.effects), strategy, structural_dedupe)
+
+    @staticmethod
+    def _same_objects(a: list, b: list) -> bool:
+        return len(a) == len(b) and all(x is y for x, y in zip(a, b))
+
+    @classmethod
+    def _local_stamp(cls, obj):
+        """
+        Returns a value that changes whenever an object, or any object stored inline in it, is
+        modified. Pointer targets are excluded, they are compiled as objects of their own.
+        """
+        if getattr(obj, 'is_array', False):
+            return obj._stamp()
+        if getattr(obj, 'is_struct', False):
+            return (obj._version, tuple(cls._local_stamp(attr) for attr in obj._inline_members()))
+        return obj._version
+
+    def _retain(self, allocator: MemoryAllocator, bank_bytes: bytearray, objects: list, slots: tuple):
+        """
+        Keeps the allocator and output of a compile, and the stamp of every compiled object.
+
+        Objects may be shared with other banks, e.g. when interned, so modifications are found
+        by comparing stamps against this bank's last compile rather than by the objects' dirty
+        flags, which every bank sharing them would clear. Likewise, blocks are found through the
+        retained allocator's addresses rather than the objects' `allocated_address`, which every
+        bank compiling them overwrites.
+        """
+        self._allocator = allocator
+        self._image = bytearray(bank_bytes)
+        self._compiled_objects = objects
+        self._compiled_slots = slots
+        self._compiled_stamps = {
+            id(obj): self._local_stamp(obj)
+            for obj in [*objects, *(effect for effect in self.effects if effect)]
+        }
+
+    def _modified(self, obj) -> bool:
+        """ Returns whether an object was modified since this bank's last incremental compile. """
+        return self._compiled_stamps.get(id(obj)) != self._local_stamp(obj)
+
+    def _recompile(self, slots: tuple) -> bytearray | None:
+        """
+        Recompiles only the objects modified since the last compile.
+
+        Objects of the same size are repacked in place. Objects that changed size, or that
+        shared their block with a duplicate, are moved to a new block and the pointers to
+        them are patched. Blocks that are no longer used are left as holes, so the output
+        can be larger than a full compile.
+
+        Returns
+        ----------
+        bytearray | None
+            The instrument bank data, or `None` if the bank's structure changed and it must
+            be fully compiled.
+        """
+        allocator = self._allocator
+        if allocator is None:
+            return None
+
+        prev_slots = self._compiled_slots
+        if any(not self._same_objects(a, b) for a, b in zip(slots[:3], prev_slots[:3])) or slots[3:] != prev_slots[3:]:
+            return None
+
+        objects = self._all_objects()
+        if not self._same_objects(objects, self._compiled_objects):
+            return None
+
+        # Other compiles may have placed shared objects since, e.g. interned samples
+        allocator.restore_addresses()
+
+        alignment = 0x10 if allocator.strategy is AllocationStrategy.BUMP else 0x08
+        blocks = {blk.address: blk for blk in allocator.blocks}
+
+        # Objects sharing a block they do not own, found by content deduplication
+        aliases: dict[int, list] = {}
+        unique = list({id(obj): obj for obj in objects}.values())
+        for obj in unique:
+            if allocator.block_of(obj) is None:
+                aliases.setdefault(allocator.address_of(obj), []).append(obj)
+
+        moved = set()
+        changed = []
+        released = []
+
+        # Pointer targets come first, so moves propagate to the objects pointing to them
+        for obj in unique:
+            blk = allocator.block_of(obj)
+            size = obj.size() if hasattr(obj, 'size') else 0x10
+            current = blk or blocks[allocator.address_of(obj)]
+
+            retargeted = any(id(target) in moved for _, target, _ in pointer_sites(obj))
+            if not (self._modified(obj) or retargeted or size != current.size):
+                continue
+
+            if blk is None:
+                # Duplicates stop sharing their block once they are modified
+                aliases[current.address] = [o for o in aliases[current.address] if o is not obj]
+            elif aliases.get(blk.address):
+                # Hand the block over to a duplicate, its contents are still valid for it
+                heir = aliases[blk.address].pop(0)
+                allocator.dedupe_registry.remove(blk)
+                allocator.relocations.discard_range(blk.address, blk.address + blk.size)
+                blk.obj = heir
+                allocator.dedupe_registry.add(blk)
+                allocator.record_pointers(heir, blk.address)
+            elif size == blk.size:
+                allocator.dedupe_registry.discard(blk)
+                allocator.relocations.discard_range(blk.address, blk.address + blk.size)
+                allocator.record_pointers(obj, blk.address)
+                blk.invalidate()
+                changed.append(blk)
+                continue
+            else:
+                allocator.release(blk)
+                released.append(blk)
+
+            changed.append(allocator.move(obj, size, alignment))
+            moved.add(id(obj))
+
+        # Effects are stored inline in the effect list
+        effects_changed = any(
+            effect and (self._modified(effect) or id(getattr(effect.tuned_sample, 'sample', None)) in moved)
+            for effect in self.effects
+        )
+        if effects_changed:
+            list_addr = self._effect_list.address
+            allocator.relocations.discard_range(list_addr, list_addr + 8 * len(self.effects))
+            allocator.write(list_addr, b''.join(
+                effect.to_bytes() if effect else b'\x00' * 8
+                for effect in self.effects
+            ))
+            for i, effect in enumerate(self.effects):
+                if effect:
+                    allocator.record_pointers(effect, list_addr + (i * 8))
+            changed.append(blocks[list_addr])
+
+        image = self._image
+        for blk in released:
+            end = min(blk.address + blk.size, len(image))
+            image[blk.address:end] = bytes(max(0, end - blk.address))
+
+        extent = allocator.extent()
+        if len(image) < extent:
+            image.extend(bytes(extent - len(image)))
+        else:
+            del image[extent:]
+
+        view = memoryview(image)
+        for blk in changed:
+            view[blk.address:blk.address + blk.size] = bytes(blk.size)
+            blk.pack_into(view, blk.address)
+        allocator.relocations.resolve(view)
+        view.release()
+
+        self._retain(allocator, image, objects, slots)
+        return bytearray(image)
+
+    def to_bytes(self, truncate_index_entry: bool = False, structural_dedupe: bool = False,
+                 strategy: AllocationStrategy | str = AllocationStrategy.BUMP,
+                 incremental: bool = False) -> tuple[bytes, bytearray]:
+        """
+        Compiles an `InstrumentBank` object from memory to binary.
+
+        Parameters
+        ----------
+        truncate_index_entry: bool
+            Output the truncated 0x08 byte index entry used by randomizers.
+        structural_dedupe: bool
+            Deduplicate objects by structural hash instead of by their serialized bytes.
+        strategy: AllocationStrategy | str
+            Strategy used to place objects. `BUMP` reproduces the original layout, while
+            `FIRST_FIT` and `BEST_FIT` pack objects by size class into alignment holes.
+        incremental: bool
+            Keep the layout of the previous incremental compile and only rewrite the objects
+            modified since. The bank is fully compiled the first time, or whenever instruments,
+            drums, effects or the objects they point to are replaced.
+
+        Returns
+        ----------
+        tuple[bytes, bytearray]
+            The index entry and the instrument bank data.
+        """
+        strategy = AllocationStrategy(strategy)
+        slots = self._slots(strategy, structural_dedupe)
+
+        bank_bytes = self._recompile(slots) if incremental else None
+        if bank_bytes is None:
+            allocator = MemoryAllocator(structural_dedupe=structural_dedupe, strategy=strategy)
+            self._assign_addresses(allocator)
+            bank_bytes = allocator.assemble(auto_patch_pointer=True)
 
-        bank_bytes = allocator.assemble(auto_patch_pointer=True)
+            if incremental:
+                self._retain(allocator, bank_bytes, self._all_objects(), slots)
+            else:
+                self._allocator = self._image = self._compiled_objects = self._compiled_slots = None
+                self._compiled_stamps = {}
+
+        self.relocations = self._allocator.relocations if incremental else allocator.relocations
 
         index_bytes = self.index_entry.to_bytes()
         if truncate_index_entry:
@@ -234,6 +564,66 @@ class InstrumentBank:
 
         return (index_bytes, bank_bytes)
 
+    #region Hashing
+    SLOT_KINDS: tuple[str, ...] = ('instruments', 'drums', 'effects')
+
+    @staticmethod
+    def _slot_digest(items, i: int) -> bytes | None:
+        if i >= len(items):
+            return None
+        item = items[i]
+        return b'' if item is None else item.digest()
+
+    def slot_digests(self) -> dict[str, list[bytes | None]]:
+        """ Returns the Merkle digest of every instrument, drum, and effect slot, null slots are `None`. """
+        return {
+            kind: [None if item is None else item.digest() for item in getattr(self, kind)]
+            for kind in self.SLOT_KINDS
+        }
+
+    def digest(self) -> bytes:
+        """
+        Returns a Merkle digest of the bank's contents, combined from the digest of every slot.
+
+        The index entry is not included, so banks placed at different addresses can be compared.
+        """
+        h = hashlib.blake2b(digest_size=16)
+        for kind, digests in self.slot_digests().items():
+            h.update(kind.encode())
+            h.update(len(digests).to_bytes(4, 'big'))
+            for d in digests:
+                h.update(b'\x00' * 16 if d is None else d)
+        return h.digest()
+
+    def diff(self, other: 'InstrumentBank') -> dict[str, list[int]]:
+        """
+        Compares two banks slot by slot.
+
+        Slots holding the same object are skipped, and every other slot is compared by its
+        cached digest, so only modified subtrees are hashed again.
+
+        Parameters
+        ----------
+        other: InstrumentBank
+            The bank to compare against, e.g. the vanilla bank.
+
+        Returns
+        ----------
+        dict[str, list[int]]
+            Indices of the `instruments`, `drums`, and `effects` slots that differ, including
+            slots that only exist in one of the banks.
+        """
+        changes = {}
+        for kind in self.SLOT_KINDS:
+            a, b = getattr(self, kind), getattr(other, kind)
+            changes[kind] = [
+                i for i in range(max(len(a), len(b)))
+                if not (i < len(a) and i < len(b) and a[i] is b[i])
+                and self._slot_digest(a, i) != self._slot_digest(b, i)
+            ]
+        return changes
+    #endregion
+
     def __repr__(self):
         lines = [f"{type(self).__name__}("]
 
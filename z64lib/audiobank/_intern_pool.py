@@ -0,0 +1,142 @@
+import threading
+from z64lib.audiobank import AudiobankIndexEntry
+from z64lib.audiobank.structs import Drum
+from z64lib.audiobank.structs import Envelope
+from z64lib.audiobank.structs import Instrument
+from z64lib.audiobank.structs import Sample
+from z64lib.audiobank.structs import SoundEffect
+from z64lib.audiobank.structs import TunedSample
+from z64lib.audiobank.structs import VadpcmBook
+from z64lib.audiobank.structs import VadpcmLoop
+from z64lib.core.enums import AudioStorageMedium
+
+
+class InternPool:
+    """
+    Shares identical samples, books, loops, and envelopes between instruments, drums, and
+    effects, within a bank and across banks.
+
+    Samples are keyed by the `Audiotable` sample bank they are read from, their address in
+    that sample bank, their codec, and their size. Samples with the same key but a different
+    book or loop are kept apart. Books, loops, and envelopes are keyed by their contents.
+
+    Interned objects are shared, so modifying one modifies it for every referrer. Compiles
+    keep the addresses they assign in their own `MemoryAllocator`, so banks sharing interned
+    objects can be compiled, and incrementally recompiled, in any order.
+
+    Attributes
+    ----------
+    samples: dict[tuple[int, int, int, int], list[Sample]]
+        Interned samples by sample bank id, sample address, codec, and size.
+    books: dict[bytes, VadpcmBook]
+        Interned books by contents.
+    loops: dict[bytes, VadpcmLoop]
+        Interned loops by contents.
+    envelopes: dict[bytes, Envelope]
+        Interned envelopes by contents.
+    hits: int
+        Number of objects replaced by an interned object.
+    """
+    def __init__(self):
+        self.samples: dict[tuple[int, int, int, int], list[Sample]] = {}
+        self.books: dict[bytes, VadpcmBook] = {}
+        self.loops: dict[bytes, VadpcmLoop] = {}
+        self.envelopes: dict[bytes, Envelope] = {}
+        self.hits: int = 0
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return sum(len(samples) for samples in self.samples.values()) + len(self.books) + len(self.loops) + len(self.envelopes)
+
+    @staticmethod
+    def sample_key(sample: Sample, index_entry: AudiobankIndexEntry) -> tuple[int, int, int, int]:
+        """ Returns the key of a sample, the sample bank is selected by the sample's medium as the audio driver does. """
+        flags = sample.flags
+        if flags.medium == AudioStorageMedium.UNK:
+            sample_bank_id = index_entry.sample_bank_id_2
+        else:
+            sample_bank_id = index_entry.sample_bank_id_1
+        return (sample_bank_id, int(sample.sample_addr), int(flags.codec), int(flags.size))
+
+    @staticmethod
+    def _flag_values(sample: Sample) -> tuple:
+        flags = sample.flags
+        return tuple(getattr(flags, name) for name, _width in flags.fields)
+
+    def _intern_content(self, table: dict, obj):
+        if obj is None:
+            return None
+        canonical = table.setdefault(obj.to_bytes(), obj)
+        if canonical is not obj:
+            self.hits += 1
+        return canonical
+
+    def intern_envelope(self, envelope: Envelope | None) -> Envelope | None:
+        """ Returns the interned envelope with the same contents. """
+        with self._lock:
+            return self._intern_content(self.envelopes, envelope)
+
+    def intern_sample(self, sample: Sample | None, index_entry: AudiobankIndexEntry) -> Sample | None:
+        """ Returns the interned sample with the same key, book, and loop. """
+        if sample is None:
+            return None
+
+        with self._lock:
+            book = self._intern_content(self.books, sample.book)
+            if book is not sample.book:
+                sample.book = book
+            loop = self._intern_content(self.loops, sample.loop)
+            if loop is not sample.loop:
+                sample.loop = loop
+
+            flags = self._flag_values(sample)
+            candidates = self.samples.setdefault(self.sample_key(sample, index_entry), [])
+            for candidate in candidates:
+                if candidate.book is sample.book and candidate.loop is sample.loop and self._flag_values(candidate) == flags:
+                    self.hits += 1
+                    return candidate
+
+            candidates.append(sample)
+            return sample
+
+    def _intern_tuned_sample(self, tuned_sample: TunedSample | None, index_entry: AudiobankIndexEntry):
+        if tuned_sample is not None and tuned_sample.sample is not None:
+            canonical = self.intern_sample(tuned_sample.sample, index_entry)
+            if canonical is not tuned_sample.sample:
+                tuned_sample.sample = canonical
+
+    def intern(self, obj: Instrument | Drum | SoundEffect | None, index_entry: AudiobankIndexEntry):
+        """
+        Replaces the samples, books, loops, and envelope referenced by an instrument, drum,
+        or effect with their interned objects.
+
+        Parameters
+        ----------
+        obj: Instrument | Drum | SoundEffect | None
+            The object to intern the references of.
+        index_entry: AudiobankIndexEntry
+            Index entry of the object's instrument bank, used to resolve sample banks.
+
+        Returns
+        ----------
+        Instrument | Drum | SoundEffect | None
+            The given object.
+        """
+        if obj is None:
+            return None
+
+        if isinstance(obj, Instrument):
+            tuned_samples = (obj.low_region_sample, obj.prim_region_sample, obj.high_region_sample)
+        else:
+            tuned_samples = (obj.tuned_sample,)
+
+        for tuned_sample in tuned_samples:
+            self._intern_tuned_sample(tuned_sample, index_entry)
+
+        envelope = getattr(obj, 'envelope', None)
+        if envelope is not None:
+            canonical = self.intern_envelope(envelope)
+            if canonical is not envelope:
+                obj.envelope = canonical
+
+        return obj
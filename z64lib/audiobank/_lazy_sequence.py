@@ -0,0 +1,88 @@
+from collections.abc import Callable, MutableSequence
+from typing import Any
+
+
+class LazySequence(MutableSequence):
+    """
+    A list whose entries are decoded from a retained buffer the first time they are accessed.
+
+    Entries without an offset are null and are returned as `None`. Once an entry is decoded,
+    or replaced, the same object is returned on every access.
+
+    Attributes
+    ----------
+    buffer: bytes
+        The buffer entries are decoded from.
+    decode: Callable[[bytes, int], Any]
+        Function that instantiates an entry from the buffer and the entry's offset.
+
+    Parameters
+    ----------
+    buffer: bytes
+        The buffer entries are decoded from.
+    offsets: list[int | None]
+        Offset of each entry in the buffer, or `None` for null entries.
+    decode: Callable[[bytes, int], Any]
+        Function that instantiates an entry from the buffer and the entry's offset.
+    """
+    _UNLOADED = object()
+
+    def __init__(self, buffer: bytes, offsets: list[int | None], decode: Callable[[bytes, int], Any]):
+        self.buffer: bytes = buffer
+        self.decode: Callable[[bytes, int], Any] = decode
+        self._offsets: list[int | None] = list(offsets)
+        self._items: list = [None if offset is None else self._UNLOADED for offset in self._offsets]
+
+    def _load(self, i: int):
+        item = self._items[i]
+        if item is self._UNLOADED:
+            item = self.decode(self.buffer, self._offsets[i])
+            self._items[i] = item
+        return item
+
+    def __getitem__(self, i):
+        if isinstance(i, slice):
+            return [self._load(j) for j in range(*i.indices(len(self._items)))]
+        if i < 0:
+            i += len(self._items)
+        if not 0 <= i < len(self._items):
+            raise IndexError('LazySequence index out of range')
+        return self._load(i)
+
+    def __setitem__(self, i, value):
+        if isinstance(i, slice):
+            values = list(value)
+            self._items[i] = values
+            self._offsets[i] = [None] * len(values)
+        else:
+            self._items[i] = value
+            self._offsets[i] = None
+
+    def __delitem__(self, i):
+        del self._items[i]
+        del self._offsets[i]
+
+    def __len__(self):
+        return len(self._items)
+
+    def insert(self, i: int, value):
+        """"""
+        self._items.insert(i, value)
+        self._offsets.insert(i, None)
+
+    def is_loaded(self, i: int) -> bool:
+        """ Returns whether the entry at the given index has been decoded. """
+        return self._items[i] is not self._UNLOADED
+
+    def load_all(self) -> list:
+        """ Decodes every entry, then returns the entries as a list. """
+        return [self._load(i) for i in range(len(self._items))]
+
+    def __eq__(self, other):
+        if isinstance(other, (list, LazySequence)):
+            return self.load_all() == list(other)
+        return NotImplemented
+
+    def __repr__(self):
+        loaded = sum(1 for item in self._items if item is not self._UNLOADED)
+        return f"{type(self).__name__}(len={len(self._items)}, loaded={loaded})"
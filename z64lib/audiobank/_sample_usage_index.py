@@ -0,0 +1,187 @@
+from dataclasses import dataclass
+from z64lib.audiobank import AudiobankIndexEntry
+from z64lib.audiobank import InternPool
+from z64lib.audiobank import InstrumentBank
+from z64lib.audiobank.structs import Drum
+from z64lib.audiobank.structs import Instrument
+from z64lib.audiobank.structs import SoundEffect
+
+
+@dataclass(frozen=True)
+class SampleUser:
+    """
+    An instrument bank entry that references an `Audiotable` sample.
+
+    Attributes
+    ----------
+    bank_id: int
+        Index of the instrument bank in the `Audiobank`.
+    kind: str
+        Name of the bank list the entry is in, `'instruments'`, `'drums'` or `'effects'`.
+    slot: int
+        Index of the entry in its bank list.
+    region: str
+        Name of the entry's `TunedSample` attribute referencing the sample.
+    """
+    bank_id: int
+    kind: str
+    slot: int
+    region: str
+
+
+class SampleUsageIndex:
+    """
+    An inverted index from `Audiotable` samples to the instrument bank entries that use them.
+
+    Samples are keyed by `(sample_bank_id, sample_addr)`. The index is built in a single
+    pass over every bank, then kept up to date one entry or one bank at a time.
+
+    Attributes
+    ----------
+    users: dict[tuple[int, int], set[SampleUser]]
+        Every entry referencing each sample.
+    samples: dict[tuple[int, str, int], set[tuple[int, int]]]
+        Every sample referenced by each `(bank_id, kind, slot)` entry.
+    entries: dict[int, set[tuple[str, int]]]
+        The `(kind, slot)` of every entry of each bank that references a sample.
+    """
+    KINDS: tuple[str, ...] = ('instruments', 'drums', 'effects')
+    INSTRUMENT_REGIONS: tuple[str, ...] = ('low_region_sample', 'prim_region_sample', 'high_region_sample')
+
+    def __init__(self):
+        self.users: dict[tuple[int, int], set[SampleUser]] = {}
+        self.samples: dict[tuple[int, str, int], set[tuple[int, int]]] = {}
+        self.entries: dict[int, set[tuple[str, int]]] = {}
+
+    @classmethod
+    def from_banks(cls, banks: list[InstrumentBank | None]) -> 'SampleUsageIndex':
+        """
+        Builds the index of every sample used by the given banks.
+
+        Parameters
+        ----------
+        banks: list[InstrumentBank | None]
+            Instrument banks in `Audiobank` order.
+
+        Returns
+        ----------
+        SampleUsageIndex
+            The index of every sample used by the banks.
+        """
+        obj = cls()
+        for bank_id, bank in enumerate(banks):
+            if bank is not None:
+                obj.add_bank(bank_id, bank)
+        return obj
+
+    #region Lookups
+    def __contains__(self, key: tuple[int, int]) -> bool:
+        return key in self.users
+
+    def __len__(self):
+        return len(self.users)
+
+    def users_of(self, sample_bank_id: int, sample_addr: int) -> set[SampleUser]:
+        """ Returns every entry referencing the given sample. """
+        return self.users.get((sample_bank_id, sample_addr), set())
+
+    def banks_using(self, sample_bank_id: int, sample_addr: int) -> set[int]:
+        """ Returns the id of every bank referencing the given sample. """
+        return {user.bank_id for user in self.users_of(sample_bank_id, sample_addr)}
+
+    def samples_of(self, bank_id: int, kind: str | None = None, slot: int | None = None) -> set[tuple[int, int]]:
+        """ Returns every sample referenced by a bank, one of its lists, or one of its entries. """
+        if kind is not None and slot is not None:
+            return set(self.samples.get((bank_id, kind, slot), ()))
+
+        keys = set()
+        for entry_kind, entry_slot in self.entries.get(bank_id, ()):
+            if kind in (None, entry_kind):
+                keys |= self.samples[(bank_id, entry_kind, entry_slot)]
+        return keys
+
+    def unused(self, sample_keys) -> set[tuple[int, int]]:
+        """ Returns the given samples that no entry references. """
+        return {key for key in sample_keys if key not in self.users}
+    #endregion
+
+    #region Maintenance
+    @classmethod
+    def _entry_samples(cls, kind: str, entry: Instrument | Drum | SoundEffect):
+        """ Yields the region and sample of every `TunedSample` in an entry. """
+        regions = cls.INSTRUMENT_REGIONS if kind == 'instruments' else ('tuned_sample',)
+        for region in regions:
+            tuned_sample = getattr(entry, region, None)
+            sample = getattr(tuned_sample, 'sample', None)
+            if sample is not None:
+                yield region, sample
+
+    def add_entry(self, bank_id: int, kind: str, slot: int, entry: Instrument | Drum | SoundEffect | None, index_entry: AudiobankIndexEntry):
+        """
+        Indexes the samples referenced by a single bank entry, replacing its previous samples.
+
+        Parameters
+        ----------
+        bank_id: int
+            Index of the instrument bank in the `Audiobank`.
+        kind: str
+            Name of the bank list the entry is in, `'instruments'`, `'drums'` or `'effects'`.
+        slot: int
+            Index of the entry in its bank list.
+        entry: Instrument | Drum | SoundEffect | None
+            The entry, or `None` to only remove its previous samples.
+        index_entry: AudiobankIndexEntry
+            Index entry of the instrument bank, used to resolve sample banks.
+
+        Raises
+        ----------
+        ValueError
+            Invalid `kind`.
+        """
+        if kind not in self.KINDS:
+            raise ValueError(f"kind must be one of {self.KINDS}, not {kind!r}")
+
+        self.remove_entry(bank_id, kind, slot)
+        if entry is None:
+            return
+
+        entry_keys = set()
+        for region, sample in self._entry_samples(kind, entry):
+            key = InternPool.sample_key(sample, index_entry)[:2]
+            self.users.setdefault(key, set()).add(SampleUser(bank_id, kind, slot, region))
+            entry_keys.add(key)
+
+        if entry_keys:
+            self.samples[(bank_id, kind, slot)] = entry_keys
+            self.entries.setdefault(bank_id, set()).add((kind, slot))
+
+    def remove_entry(self, bank_id: int, kind: str, slot: int):
+        """ Removes the samples referenced by a single bank entry from the index. """
+        entry_keys = self.samples.pop((bank_id, kind, slot), None)
+        if entry_keys is None:
+            return
+
+        bank_entries = self.entries[bank_id]
+        bank_entries.discard((kind, slot))
+        if not bank_entries:
+            del self.entries[bank_id]
+
+        for key in entry_keys:
+            users = self.users[key]
+            users -= {user for user in users if (user.bank_id, user.kind, user.slot) == (bank_id, kind, slot)}
+            if not users:
+                del self.users[key]
+
+    def add_bank(self, bank_id: int, bank: InstrumentBank):
+        """ Indexes every entry of a bank, replacing the bank's previous entries. """
+        self.remove_bank(bank_id)
+        for kind in self.KINDS:
+            for slot, entry in enumerate(getattr(bank, kind)):
+                if entry is not None:
+                    self.add_entry(bank_id, kind, slot, entry, bank.index_entry)
+
+    def remove_bank(self, bank_id: int):
+        """ Removes every entry of a bank from the index. """
+        for kind, slot in list(self.entries.get(bank_id, ())):
+            self.remove_entry(bank_id, kind, slot)
+    #endregion
@@ -1,5 +1,5 @@
 import hashlib
-from z64lib.core.audio import EnvelopePoint
+from z64lib.core.audio import EnvelopePoint, MAX_ENVELOPE_POINTS, decode_envelope
 from z64lib.types import *
 
 
@@ -27,20 +27,40 @@ class Envelope(DynaStruct):
         self.points = points
 
     @classmethod
-    def from_bytes(cls, buffer: bytes, offset: int = 0):
-        """"""
-        points = []
-        cur_offset = offset
+    def from_bytes(cls, buffer: bytes, offset: int = 0, max_points: int = MAX_ENVELOPE_POINTS):
+        """
+        Instantiates an envelope from binary data.
 
-        # Loop through the array and create EnvelopePoint objects for each point
-        # in the array until it hits an opcode. The game handles the array similarly.
-        while True:
-            point = EnvelopePoint.from_bytes(buffer, cur_offset)
-            points.append(point)
-            cur_offset += EnvelopePoint.size()
+        Points are read until an opcode is encountered, as the game does, but never past the
+        end of the buffer or `max_points` points (see `decode_envelope`).
+
+        Parameters
+        ----------
+        buffer: bytes
+            Binary data containing the envelope.
+        offset: int
+            Address of the envelope in the buffer.
+        max_points: int
+            Maximum number of points, including the terminating point.
+
+        Returns
+        ----------
+        Envelope
+            The decoded envelope.
 
-            if point.is_opcode:
-                break
+        Raises
+        ----------
+        ValueError
+            The envelope is not terminated.
+        """
+        values = decode_envelope(buffer, offset, max_points)
+
+        points = []
+        for i in range(0, len(values), 2):
+            point = EnvelopePoint.__new__(EnvelopePoint)
+            point._time_or_opcode = values[i]
+            point.amp_or_index = values[i + 1]
+            points.append(point)
 
         array_ = array[EnvelopePoint](points)
         return cls(array_)
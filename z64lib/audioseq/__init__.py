@@ -3,12 +3,14 @@ z64lib.audio.audioseq
 =====
 """
 
+from ._audioseq_index_entry import AudioseqIndexEntry
 from . import args
 from . import messages
 from . import sequence
 from .parser import AseqParser
 
 __all__ = [
+    'AudioseqIndexEntry',
     'args',
     'messages',
     'sequence',
@@ -1,6 +1,6 @@
-import struct
 from z64lib.audioseq.sequence import *
 from z64lib.audioseq.messages import *
+from z64lib.core.audio import decode_envelope
 from z64lib.core.enums import AseqVersion, AseqSection
 
 
@@ -86,13 +86,9 @@ class AseqParser:
         """"""
         addr = frag.addr
         if isinstance(frag, AseqEnvelope):
-            frag.data = []
-            while True:
-                delay, arg = struct.unpack_from('>2h', self.data, addr)
-                if delay < 0:
-                    break
-                frag.data.append((delay, arg)) # Change to something more concrete later
-                addr += 4
+            # Same bounded decoding as instrument bank envelopes, the terminating point is kept
+            values = decode_envelope(self.data, addr)
+            frag.data = list(zip(values[0::2], values[1::2])) # Change to something more concrete later
         if isinstance(frag, AseqFilter):
             ... # TODO: Add parsing
         if isinstance(frag, AseqArray):
@@ -5,7 +5,29 @@ z64lib.audio.audiotable
 
 # Order matters, import non-dependents first, then dependents
 from ._audiotable_index_entry import AudiotableIndexEntry
+from ._vadpcm_decoder import VadpcmDecoder, decode_vadpcm
+from ._vadpcm_encoder import VadpcmEncoder, encode_vadpcm
+from ._sample_codecs import SampleCodecs, decode_pcm, decode_sample
+from ._audiotable import Audiotable
+from ._pcm_cache import PcmCache
+from ._sample_trimmer import SampleTrim, TrimReport, trim_sample, trim_audiotable
+from ._sample_fingerprints import SampleFingerprinter, FingerprintIndex
 
 __all__ = [
     'AudiotableIndexEntry',
+    'VadpcmDecoder',
+    'decode_vadpcm',
+    'VadpcmEncoder',
+    'encode_vadpcm',
+    'SampleCodecs',
+    'decode_pcm',
+    'decode_sample',
+    'Audiotable',
+    'PcmCache',
+    'SampleTrim',
+    'TrimReport',
+    'trim_sample',
+    'trim_audiotable',
+    'SampleFingerprinter',
+    'FingerprintIndex',
 ]
\ No newline at end of file
@@ -0,0 +1,416 @@
+import bisect
+import hashlib
+import mmap
+from collections.abc import Iterable, Iterator
+from pathlib import Path
+from z64lib.audiobank import AudiobankIndexEntry
+from z64lib.audiobank import InstrumentBank
+from z64lib.audiobank import InternPool
+from z64lib.audiobank.structs import Instrument
+from z64lib.audiobank.structs import Sample
+from z64lib.audiotable import AudiotableIndexEntry
+from z64lib.audiotable import decode_sample
+from z64lib.core.alignment import align_to
+from z64lib.core.index_table import IndexTable
+
+
+class Audiotable:
+    """
+    Represents the 'Audiotable' file in a Zelda64 ROM, which holds the sample banks that
+    instrument bank samples are read from.
+
+    The file data is never copied: sample banks and samples are returned as memoryviews of
+    the data the audiotable was instantiated from, which may be a memory mapped file.
+
+    The audiotable also keeps a sorted index of the extent of every indexed sample in each
+    sample bank, which is used to find overlapping samples, unused ranges, and orphaned
+    sample data.
+
+    Attributes
+    ----------
+    index: IndexTable[AudiotableIndexEntry]
+        The `Audiotable` index table, one entry per sample bank.
+    data: memoryview
+        Binary `Audiotable` file data.
+    extents: dict[int, list[tuple[int, int]]]
+        Sorted `(start, end)` extents of the indexed samples, by sample bank id.
+    """
+    def __init__(self, index: IndexTable, data: bytes | bytearray | memoryview | mmap.mmap):
+        self.index: IndexTable = index
+        self.data: memoryview = memoryview(data)
+        self.extents: dict[int, list[tuple[int, int]]] = {}
+        self._extent_counts: dict[tuple[int, int, int], int] = {}
+        self._mmap: mmap.mmap | None = None
+        self._digest: bytes | None = None
+
+    @classmethod
+    def from_bytes(cls, audiotable_index: bytes | bytearray | IndexTable, audiotable_data: bytes | bytearray | memoryview) -> 'Audiotable':
+        """
+        Instantiates an audiotable object over binary data, without copying it.
+
+        Parameters
+        ----------
+        audiotable_index: bytes | bytearray | IndexTable
+            `Audiotable` file index data taken from the ROM's `code` file.
+        audiotable_data: bytes | bytearray | memoryview
+            Binary `Audiotable` file data.
+
+        Returns
+        ----------
+        Audiotable
+            The audiotable object.
+
+        Raises
+        ----------
+        TypeError
+            Invalid `audiotable_index` type.
+        """
+        if isinstance(audiotable_index, IndexTable):
+            index = audiotable_index
+        elif isinstance(audiotable_index, bytes | bytearray):
+            index = IndexTable[AudiotableIndexEntry].from_bytes(audiotable_index)
+        else:
+            raise TypeError(f"audiotable_index must be bytes or IndexTable, not {type(audiotable_index).__name__}")
+        return cls(index, audiotable_data)
+
+    @classmethod
+    def from_file(cls, audiotable_index: bytes | bytearray | IndexTable, file_path: str | Path) -> 'Audiotable':
+        """
+        Instantiates an audiotable object over a memory mapped `Audiotable` file.
+
+        The file stays mapped until `close()` is called, or until the audiotable is used as a
+        context manager and the context exits. Views returned by the audiotable must be
+        released before then.
+
+        Parameters
+        ----------
+        audiotable_index: bytes | bytearray | IndexTable
+            `Audiotable` file index data taken from the ROM's `code` file.
+        file_path: str | Path
+            Path to the binary `Audiotable` file.
+
+        Returns
+        ----------
+        Audiotable
+            The audiotable object.
+        """
+        with open(file_path, 'rb') as f:
+            data = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        obj = cls.from_bytes(audiotable_index, data)
+        obj._mmap = data
+        return obj
+
+    def close(self):
+        """ Releases the file data, and unmaps the file if the audiotable was instantiated from one. """
+        self.data.release()
+        if self._mmap is not None:
+            self._mmap.close()
+            self._mmap = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    #region Sample Banks
+    def __len__(self):
+        return len(self.index)
+
+    def digest(self) -> bytes:
+        """ Returns a 16-byte BLAKE2b digest of the file data, computed once, which identifies the audiotable across sessions. """
+        if self._digest is None:
+            self._digest = hashlib.blake2b(self.data, digest_size=16).digest()
+        return self._digest
+
+    def resolve_bank_id(self, sample_bank_id: int) -> int:
+        """
+        Returns the id of the sample bank holding the data of a sample bank. Entries with a
+        size of zero reuse the sample bank whose id is their address, as the audio driver does.
+
+        Raises
+        ----------
+        ValueError
+            The id is out of range, or the entries reference each other in a cycle.
+        """
+        seen = set()
+        while True:
+            if not 0 <= sample_bank_id < len(self.index):
+                raise ValueError(f"Sample bank {sample_bank_id} is out of range, the audiotable has {len(self.index)} sample banks")
+            if self.index.get(sample_bank_id, 'table_size') != 0:
+                return sample_bank_id
+            if sample_bank_id in seen:
+                raise ValueError(f"Sample bank {sample_bank_id} references itself")
+            seen.add(sample_bank_id)
+            sample_bank_id = self.index.get(sample_bank_id, 'rom_addr')
+
+    def sample_bank(self, sample_bank_id: int) -> memoryview:
+        """
+        Returns a view of a sample bank's data.
+
+        Raises
+        ----------
+        ValueError
+            The sample bank is out of range or out of the file's bounds.
+        """
+        sample_bank_id = self.resolve_bank_id(sample_bank_id)
+        start = self.index.get(sample_bank_id, 'rom_addr')
+        end = start + self.index.get(sample_bank_id, 'table_size')
+        if end > len(self.data):
+            raise ValueError(f"Sample bank {sample_bank_id} ({start:#x}-{end:#x}) is out of the audiotable's bounds ({len(self.data):#x} bytes)")
+        return self.data[start:end]
+    #endregion
+
+    #region Samples
+    def sample_bank_id(self, sample: Sample, index_entry: AudiobankIndexEntry) -> int:
+        """ Returns the id of the sample bank holding a sample's data, selected by the sample's medium. """
+        return self.resolve_bank_id(InternPool.sample_key(sample, index_entry)[0])
+
+    def sample_view(self, sample: Sample, index_entry: AudiobankIndexEntry) -> memoryview:
+        """
+        Returns a view of a sample's data.
+
+        Parameters
+        ----------
+        sample: Sample
+            The sample.
+        index_entry: AudiobankIndexEntry
+            Index entry of the sample's instrument bank, which selects its sample banks.
+
+        Returns
+        ----------
+        memoryview
+            The sample's data, without copying it.
+
+        Raises
+        ----------
+        ValueError
+            The sample is out of its sample bank's bounds.
+        """
+        bank = self.sample_bank(self.sample_bank_id(sample, index_entry))
+        start = int(sample.sample_addr)
+        end = start + sample.flags.size
+        if end > len(bank):
+            raise ValueError(f"Sample data {start:#x}-{end:#x} is out of its sample bank's bounds ({len(bank):#x} bytes)")
+        return bank[start:end]
+
+    def decode(self, sample: Sample, index_entry: AudiobankIndexEntry, from_loop_start: bool = False):
+        """ Decodes a sample to s16 PCM, see `decode_sample`. """
+        bank = self.sample_bank(self.sample_bank_id(sample, index_entry))
+        return decode_sample(sample, bank, from_loop_start)
+    #endregion
+
+    #region Extent Index
+    @staticmethod
+    def _bank_samples(bank: InstrumentBank) -> Iterator[Sample]:
+        """ Yields the sample of every tuned sample of a bank, samples shared by several entries are yielded once. """
+        seen = set()
+        for entries in (bank.instruments, bank.drums, bank.effects):
+            for entry in entries:
+                if entry is None:
+                    continue
+                if isinstance(entry, Instrument):
+                    tuned_samples = (entry.low_region_sample, entry.prim_region_sample, entry.high_region_sample)
+                else:
+                    tuned_samples = (entry.tuned_sample,)
+                for tuned_sample in tuned_samples:
+                    sample = getattr(tuned_sample, 'sample', None)
+                    if sample is not None and id(sample) not in seen:
+                        seen.add(id(sample))
+                        yield sample
+
+    def add_sample(self, sample: Sample, index_entry: AudiobankIndexEntry):
+        """ Adds a sample's extent to the extent index. Extents shared by several samples are indexed once. """
+        key = (self.sample_bank_id(sample, index_entry), int(sample.sample_addr), int(sample.sample_addr) + sample.flags.size)
+        count = self._extent_counts.get(key, 0)
+        if count == 0:
+            bisect.insort(self.extents.setdefault(key[0], []), key[1:])
+        self._extent_counts[key] = count + 1
+
+    def remove_sample(self, sample: Sample, index_entry: AudiobankIndexEntry):
+        """ Removes a sample's extent from the extent index, once no other indexed sample shares it. """
+        key = (self.sample_bank_id(sample, index_entry), int(sample.sample_addr), int(sample.sample_addr) + sample.flags.size)
+        count = self._extent_counts.get(key, 0)
+        if count > 1:
+            self._extent_counts[key] = count - 1
+        elif count == 1:
+            del self._extent_counts[key]
+            extents = self.extents[key[0]]
+            del extents[bisect.bisect_left(extents, key[1:])]
+
+    def add_bank(self, bank: InstrumentBank):
+        """ Adds the extent of every sample of an instrument bank to the extent index. """
+        for sample in self._bank_samples(bank):
+            self.add_sample(sample, bank.index_entry)
+
+    def build_extent_index(self, banks: Iterable[InstrumentBank | None]):
+        """ Rebuilds the extent index from every sample of the given instrument banks, e.g. `Audiobank.banks`. """
+        self.extents = {}
+        self._extent_counts = {}
+        for bank in banks:
+            if bank is not None:
+                self.add_bank(bank)
+
+    def overlaps(self, sample_bank_id: int) -> list[tuple[tuple[int, int], tuple[int, int]]]:
+        """ Returns every pair of distinct sample extents in a sample bank that share data. """
+        pairs = []
+        active: list[tuple[int, int]] = [] # Extents that may still overlap the next extent
+        for extent in self.extents.get(self.resolve_bank_id(sample_bank_id), []):
+            active = [other for other in active if other[1] > extent[0]]
+            pairs.extend((other, extent) for other in active)
+            active.append(extent)
+        return pairs
+
+    def gaps(self, sample_bank_id: int) -> list[tuple[int, int]]:
+        """ Returns every `(start, end)` range of a sample bank that no indexed sample uses. """
+        sample_bank_id = self.resolve_bank_id(sample_bank_id)
+        bank_size = self.index.get(sample_bank_id, 'table_size')
+
+        gaps = []
+        cursor = 0
+        for start, end in self.extents.get(sample_bank_id, []):
+            if start > cursor:
+                gaps.append((cursor, start))
+            cursor = max(cursor, end)
+        if cursor < bank_size:
+            gaps.append((cursor, bank_size))
+        return gaps
+
+    def orphans(self, sample_bank_id: int) -> list[tuple[int, int]]:
+        """
+        Returns every `(start, end)` range of a sample bank that no indexed sample uses and
+        that holds data, i.e. samples no instrument bank references. Unused ranges that only
+        hold padding are skipped.
+        """
+        bank = self.sample_bank(sample_bank_id)
+        return [(start, end) for start, end in self.gaps(sample_bank_id) if bank[start:end].tobytes().strip(b'\x00')]
+
+    def out_of_bounds(self) -> list[tuple[int, int, int]]:
+        """ Returns every indexed `(sample_bank_id, start, end)` extent that ends past its sample bank. """
+        return [
+            (sample_bank_id, start, end)
+            for sample_bank_id, extents in self.extents.items()
+            for start, end in extents
+            if end > self.index.get(sample_bank_id, 'table_size')
+        ]
+    #endregion
+
+    #region Encoding
+    def to_bytes(self, banks: Iterable[InstrumentBank | None], alignment: int = 0x10, dedupe_samples: bool = True) -> tuple[bytes, bytes]:
+        """
+        Repacks the sample data referenced by the given instrument banks into a new `Audiotable`
+        file and regenerates the index.
+
+        Every sample bank holding a referenced sample is rebuilt from its samples only, which
+        drops orphaned sample data. Samples whose data overlaps are placed as a single block,
+        so they keep sharing it, and blocks are placed in order of their original address.
+        Sample banks no sample references are copied unchanged, since an entry with a size of
+        zero is an alias of another sample bank, and aliases are kept as is.
+
+        The `sample_addr` of every sample is updated to match the output once every address
+        has been computed, and the output index holds the new `rom_addr` and `table_size` of
+        every sample bank. The audiotable itself is unchanged, instantiate a new one from the
+        output to read the repacked samples. `Audiobank.sample_index` is keyed by sample
+        address and must be rebuilt.
+
+        Parameters
+        ----------
+        banks: Iterable[InstrumentBank | None]
+            The instrument banks, e.g. `Audiobank.banks`.
+        alignment: int
+            Alignment of each sample block's address in its sample bank, and of each sample
+            bank's address and size in the `Audiotable` file.
+        dedupe_samples: bool
+            Place byte-identical sample blocks of a sample bank once, found by their digest,
+            and place sample banks that repack to identical data once, their index entries
+            share a `rom_addr`.
+
+        Returns
+        ----------
+        tuple[bytes, bytes]
+            The `Audiotable` index table and the `Audiotable` file data.
+
+        Raises
+        ----------
+        ValueError
+            A sample is out of its sample bank's bounds, or a sample is shared by instrument
+            banks that read it from different sample banks.
+        """
+        # Collect every sample with the sample bank holding its data
+        sources: dict[int, tuple[Sample, int]] = {}
+        extents: dict[int, set[tuple[int, int]]] = {}
+        for bank in banks:
+            if bank is None:
+                continue
+            for sample in self._bank_samples(bank):
+                self.sample_view(sample, bank.index_entry)
+                sample_bank_id = self.sample_bank_id(sample, bank.index_entry)
+                source = sources.setdefault(id(sample), (sample, sample_bank_id))
+                if source[1] != sample_bank_id:
+                    raise ValueError(f"Sample at {int(sample.sample_addr):#x} is read from both sample bank {source[1]} and {sample_bank_id}")
+                if sample.flags.size:
+                    extents.setdefault(sample_bank_id, set()).add((int(sample.sample_addr), int(sample.sample_addr) + sample.flags.size))
+
+        # Merge overlapping extents into blocks
+        blocks: dict[int, list[tuple[int, int]]] = {}
+        for sample_bank_id, bank_extents in extents.items():
+            merged = blocks[sample_bank_id] = []
+            for start, end in sorted(bank_extents):
+                if merged and start < merged[-1][1]:
+                    merged[-1] = (merged[-1][0], max(merged[-1][1], end))
+                else:
+                    merged.append((start, end))
+
+        index = type(self.index).from_bytes(self.index.to_bytes())
+        data = bytearray()
+        placed_banks: dict[bytes, int] = {}
+        relocations: dict[tuple[int, int], int] = {}
+        for sample_bank_id in range(len(index)):
+            if index.is_null(sample_bank_id) or index.get(sample_bank_id, 'table_size') == 0:
+                continue
+
+            bank_view = self.sample_bank(sample_bank_id)
+            if sample_bank_id in blocks:
+                bank_data = bytearray()
+                placed: dict[bytes, int] = {}
+                for start, end in blocks[sample_bank_id]:
+                    block = bank_view[start:end]
+                    digest = hashlib.blake2b(block, digest_size=16).digest()
+                    address = placed.get(digest) if dedupe_samples else None
+                    if address is None:
+                        address = align_to(len(bank_data), alignment)
+                        bank_data.extend(bytes(address - len(bank_data)))
+                        bank_data.extend(block)
+                        placed[digest] = address
+                    relocations[(sample_bank_id, start)] = address
+                bank_data.extend(bytes(align_to(len(bank_data), alignment) - len(bank_data)))
+                bank_data = bytes(bank_data)
+            else:
+                bank_data = bank_view.tobytes()
+
+            address = placed_banks.get(bank_data) if dedupe_samples else None
+            if address is None:
+                address = align_to(len(data), alignment)
+                data.extend(bytes(address - len(data)))
+                data.extend(bank_data)
+                placed_banks[bank_data] = address
+            index.set(sample_bank_id, 'rom_addr', address)
+            index.set(sample_bank_id, 'table_size', len(bank_data))
+
+        # Relocate samples into their block
+        block_starts = {sample_bank_id: [start for start, _ in bank_blocks] for sample_bank_id, bank_blocks in blocks.items()}
+        for sample, sample_bank_id in sources.values():
+            if not sample.flags.size:
+                sample.sample_addr = 0
+                continue
+            starts = block_starts[sample_bank_id]
+            start = starts[bisect.bisect_right(starts, int(sample.sample_addr)) - 1]
+            sample.sample_addr = relocations[(sample_bank_id, start)] + int(sample.sample_addr) - start
+
+        return (index.to_bytes(), bytes(data))
+    #endregion
+
+
+__all__ = [
+    'Audiotable',
+]
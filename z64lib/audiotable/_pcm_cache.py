@@ -0,0 +1,220 @@
+import hashlib
+import os
+import sys
+import threading
+from array import array
+from collections import OrderedDict
+from pathlib import Path
+from z64lib.audiobank import AudiobankIndexEntry
+from z64lib.audiobank.structs import Sample
+from z64lib.audiotable import Audiotable
+
+
+class PcmCache:
+    """
+    Caches decoded samples, so repeated renders and analyses of the same samples skip decoding.
+
+    Samples are keyed by the digest of their data and their codec, and the digest of their
+    book, plus the digest of their loop when decoding from the loop start, so samples with the
+    same contents share an entry whichever audiotable, sample bank, or address they are read
+    from. Decoded samples are kept in memory up to a byte budget, evicting the least
+    recently used samples first. When a cache directory is given, every decoded sample is also
+    written there as raw PCM, so samples evicted from memory, or decoded in a previous
+    session, are read back instead of decoded again. The cache directory is not size limited.
+
+    Attributes
+    ----------
+    max_bytes: int
+        Memory budget in bytes.
+    cache_dir: Path | None
+        Directory of the on-disk tier, or `None` to only cache in memory.
+    size: int
+        Bytes of PCM currently kept in memory.
+    hits: int
+        Lookups served from memory.
+    disk_hits: int
+        Lookups served from the on-disk tier.
+    misses: int
+        Lookups that decoded the sample.
+    evictions: int
+        Samples evicted from memory.
+    """
+    FILE_SUFFIX: str = '.pcm'
+
+    def __init__(self, max_bytes: int = 64 << 20, cache_dir: str | Path | None = None):
+        self.max_bytes: int = max_bytes
+        self.cache_dir: Path | None = None if cache_dir is None else Path(cache_dir)
+        self.size: int = 0
+        self.hits: int = 0
+        self.disk_hits: int = 0
+        self.misses: int = 0
+        self.evictions: int = 0
+        self._entries: OrderedDict[tuple, array] = OrderedDict()
+        self._lock = threading.Lock()
+
+        if self.cache_dir is not None:
+            self.cache_dir.mkdir(parents=True, exist_ok=True)
+
+    def __len__(self):
+        return len(self._entries)
+
+    def __contains__(self, key: tuple) -> bool:
+        return key in self._entries
+
+    @staticmethod
+    def key(audiotable: Audiotable, sample: Sample, index_entry: AudiobankIndexEntry, from_loop_start: bool = False) -> tuple:
+        """
+        Returns the cache key of a decoded sample.
+
+        Raises
+        ----------
+        ValueError
+            The sample is out of its sample bank's bounds.
+        """
+        data = hashlib.blake2b(audiotable.sample_view(sample, index_entry), digest_size=16).digest()
+        book = b'' if sample.book is None else sample.book.digest()
+        loop = sample.loop.digest() if from_loop_start and sample.loop is not None else b''
+        return (
+            data.hex(),
+            int(sample.flags.codec),
+            book.hex(),
+            loop.hex(),
+        )
+
+    def stats(self) -> dict[str, int]:
+        """ Returns the cache's counters and memory usage. """
+        return {
+            'hits': self.hits,
+            'disk_hits': self.disk_hits,
+            'misses': self.misses,
+            'evictions': self.evictions,
+            'entries': len(self._entries),
+            'size': self.size,
+        }
+
+    def decode(self, audiotable: Audiotable, sample: Sample, index_entry: AudiobankIndexEntry, from_loop_start: bool = False) -> array:
+        """
+        Returns a decoded sample from the cache, decoding and caching it on a miss, see
+        `Audiotable.decode`.
+
+        The returned array is shared by every lookup of the sample and must not be modified.
+
+        Parameters
+        ----------
+        audiotable: Audiotable
+            The audiotable the sample is stored in.
+        sample: Sample
+            The sample.
+        index_entry: AudiobankIndexEntry
+            Index entry of the sample's instrument bank, which selects its sample banks.
+        from_loop_start: bool
+            Decode from the start of the sample's loop.
+
+        Returns
+        ----------
+        array
+            The decoded samples, as an `'h'` array.
+        """
+        key = self.key(audiotable, sample, index_entry, from_loop_start)
+        pcm = self.lookup(key)
+        if pcm is None:
+            pcm = audiotable.decode(sample, index_entry, from_loop_start)
+            self.store(key, pcm)
+        return pcm
+
+    def lookup(self, key: tuple) -> array | None:
+        """ Returns a sample kept in memory or in the on-disk tier, or `None` if it is not cached. Samples are never decoded. """
+        pcm = self.get(key)
+        if pcm is not None:
+            return pcm
+
+        pcm = self._read_file(key)
+        if pcm is not None:
+            with self._lock:
+                self.disk_hits += 1
+            self.put(key, pcm)
+        return pcm
+
+    def store(self, key: tuple, pcm: array):
+        """ Caches a sample decoded after a `lookup()` miss, e.g. in a worker process, in memory and in the on-disk tier. """
+        with self._lock:
+            self.misses += 1
+        self._write_file(key, pcm)
+        self.put(key, pcm)
+
+    #region Memory Tier
+    def get(self, key: tuple) -> array | None:
+        """ Returns a sample kept in memory and marks it as the most recently used, or `None` if it is not. """
+        with self._lock:
+            pcm = self._entries.get(key)
+            if pcm is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+            return pcm
+
+    def put(self, key: tuple, pcm: array):
+        """ Keeps a sample in memory, evicting the least recently used samples to stay within the budget. """
+        nbytes = len(pcm) * pcm.itemsize
+        if nbytes > self.max_bytes:
+            return
+
+        with self._lock:
+            previous = self._entries.pop(key, None)
+            if previous is not None:
+                self.size -= len(previous) * previous.itemsize
+
+            while self._entries and self.size + nbytes > self.max_bytes:
+                _, evicted = self._entries.popitem(last=False)
+                self.size -= len(evicted) * evicted.itemsize
+                self.evictions += 1
+
+            self._entries[key] = pcm
+            self.size += nbytes
+
+    def clear(self):
+        """ Drops every sample kept in memory, the on-disk tier is kept. """
+        with self._lock:
+            self._entries.clear()
+            self.size = 0
+    #endregion
+
+    #region Disk Tier
+    def _path(self, key: tuple) -> Path:
+        name = hashlib.blake2b(repr(key).encode(), digest_size=16).hexdigest()
+        return self.cache_dir / f'{name}{self.FILE_SUFFIX}'
+
+    def _read_file(self, key: tuple) -> array | None:
+        """ Reads a sample from the on-disk tier, files are little-endian s16. """
+        if self.cache_dir is None:
+            return None
+        try:
+            data = self._path(key).read_bytes()
+        except FileNotFoundError:
+            return None
+
+        pcm = array('h')
+        pcm.frombytes(data)
+        if sys.byteorder == 'big':
+            pcm.byteswap()
+        return pcm
+
+    def _write_file(self, key: tuple, pcm: array):
+        if self.cache_dir is None:
+            return
+
+        data = pcm
+        if sys.byteorder == 'big':
+            data = array('h', pcm)
+            data.byteswap()
+
+        # Written to a temporary file first, so concurrent readers never see a partial file
+        path = self._path(key)
+        temp_path = path.with_name(f'{path.name}.{os.getpid()}.{threading.get_ident()}.tmp')
+        temp_path.write_bytes(data.tobytes())
+        os.replace(temp_path, path)
+    #endregion
+
+
+__all__ = [
+    'PcmCache',
+]
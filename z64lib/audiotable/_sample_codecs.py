@@ -0,0 +1,140 @@
+import sys
+from array import array
+from collections.abc import Callable
+from z64lib.audiobank.structs import Sample
+from z64lib.audiotable._vadpcm_decoder import _loop_start, _sample_view
+from z64lib.audiotable import decode_vadpcm
+from z64lib.core.enums import AudioSampleCodec
+
+
+class SampleCodecs:
+    """
+    Registry of the sample decoders of each `AudioSampleCodec`.
+
+    A decoder is called with a sample, the binary data of the sample bank it is stored in, and
+    whether to decode from the start of the sample's loop. It returns the sample's s16 PCM as
+    a native-endian `'h'` array, whatever the codec.
+    """
+    _decoders: dict[AudioSampleCodec, Callable[[Sample, bytes | bytearray | memoryview, bool], array]] = {}
+
+    @classmethod
+    def register(cls, codec: AudioSampleCodec, decoder: Callable[[Sample, bytes | bytearray | memoryview, bool], array]):
+        """ Registers the decoder of a codec, replacing its previous decoder. """
+        cls._decoders[AudioSampleCodec(codec)] = decoder
+
+    @classmethod
+    def is_supported(cls, codec: AudioSampleCodec) -> bool:
+        """ Returns whether a decoder is registered for a codec. """
+        return codec in cls._decoders
+
+    @classmethod
+    def get_decoder(cls, codec: AudioSampleCodec) -> Callable[[Sample, bytes | bytearray | memoryview, bool], array]:
+        """
+        Returns the decoder of a codec.
+
+        Raises
+        ----------
+        ValueError
+            No decoder is registered for the codec.
+        """
+        decoder = cls._decoders.get(codec)
+        if decoder is None:
+            raise ValueError(f"No decoder is registered for codec {AudioSampleCodec(codec).name}")
+        return decoder
+
+
+def _decode_pcm_data(data: bytes | bytearray | memoryview, codec: AudioSampleCodec) -> array:
+    """ Converts S8 or S16 sample data to a native-endian `'h'` array. """
+    if codec == AudioSampleCodec.S8:
+        # Widened to s16 by placing each sample in the upper byte, as the RSP does
+        buffer = bytearray(2 * len(data))
+        buffer[1 if sys.byteorder == 'little' else 0::2] = data
+        pcm = array('h')
+        pcm.frombytes(buffer)
+        return pcm
+
+    if codec in (AudioSampleCodec.S16, AudioSampleCodec.S16_INMEMORY):
+        pcm = array('h')
+        pcm.frombytes(data[:len(data) & ~1])
+        if sys.byteorder == 'little':
+            pcm.byteswap()
+        return pcm
+
+    raise ValueError(f"Sample codec is {AudioSampleCodec(codec).name}, not a PCM codec")
+
+
+def decode_pcm(sample: Sample, table_data: bytes | bytearray | memoryview, from_loop_start: bool = False) -> array:
+    """
+    Decodes an S8, S16, or S16_INMEMORY sample from its `Audiotable` sample bank.
+
+    S16 samples are converted from big-endian. S8 samples are widened to s16 as the RSP does,
+    by shifting them into the upper byte.
+
+    Parameters
+    ----------
+    sample: Sample
+        The sample, its `sample_addr` and `size` locate its data in the sample bank.
+    table_data: bytes | bytearray | memoryview
+        Binary data of the sample bank the sample is stored in.
+    from_loop_start: bool
+        Decode from the start of the sample's loop.
+
+    Returns
+    ----------
+    array
+        The decoded samples, as an `'h'` array.
+
+    Raises
+    ----------
+    ValueError
+        The sample is not a PCM sample, does not loop when `from_loop_start` is set, or its
+        data is out of the sample bank's bounds.
+    """
+    codec = sample.flags.codec
+    if codec not in (AudioSampleCodec.S8, AudioSampleCodec.S16, AudioSampleCodec.S16_INMEMORY):
+        raise ValueError(f"Sample codec is {AudioSampleCodec(codec).name}, not a PCM codec")
+
+    view = _sample_view(sample, table_data)
+    skip = _loop_start(sample) if from_loop_start else 0
+    width = 1 if codec == AudioSampleCodec.S8 else 2
+    return _decode_pcm_data(view[width * skip:], codec)
+
+
+def decode_sample(sample: Sample, table_data: bytes | bytearray | memoryview, from_loop_start: bool = False) -> array:
+    """
+    Decodes a sample of any registered codec from its `Audiotable` sample bank.
+
+    Parameters
+    ----------
+    sample: Sample
+        The sample, its `sample_addr` and `size` locate its data in the sample bank.
+    table_data: bytes | bytearray | memoryview
+        Binary data of the sample bank the sample is stored in.
+    from_loop_start: bool
+        Decode from the start of the sample's loop, as the audio driver does when the loop repeats.
+
+    Returns
+    ----------
+    array
+        The decoded s16 samples, as an `'h'` array.
+
+    Raises
+    ----------
+    ValueError
+        No decoder is registered for the sample's codec, or the sample cannot be decoded.
+    """
+    return SampleCodecs.get_decoder(sample.flags.codec)(sample, table_data, from_loop_start)
+
+
+SampleCodecs.register(AudioSampleCodec.ADPCM, decode_vadpcm)
+SampleCodecs.register(AudioSampleCodec.SMALL_ADPCM, decode_vadpcm)
+SampleCodecs.register(AudioSampleCodec.S8, decode_pcm)
+SampleCodecs.register(AudioSampleCodec.S16, decode_pcm)
+SampleCodecs.register(AudioSampleCodec.S16_INMEMORY, decode_pcm)
+
+
+__all__ = [
+    'SampleCodecs',
+    'decode_pcm',
+    'decode_sample',
+]
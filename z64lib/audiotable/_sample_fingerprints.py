@@ -0,0 +1,317 @@
+import hashlib
+from array import array
+from collections.abc import Hashable, Iterable, Sequence
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from z64lib.audiobank import AudiobankIndexEntry, InstrumentBank
+from z64lib.audiobank.structs import Sample
+from z64lib.audiotable._sample_trimmer import _book, _decode
+from z64lib.audiotable import Audiotable, PcmCache
+from z64lib.core.enums import AudioSampleCodec
+from z64lib.core.helpers import np, require_numpy
+
+
+class SampleFingerprinter:
+    """
+    Computes compact spectral fingerprints of decoded samples.
+
+    A fingerprint is the log energy of `bands` logarithmically spaced frequency bands, in
+    `frames` windows spread evenly over the sample, so samples of different lengths are
+    compared by their overall shape. Fingerprints are centered and normalized to unit
+    length: the dot product of two fingerprints is their cosine similarity, and is
+    independent of the samples' volume. Silent samples have a zero fingerprint.
+
+    Requires NumPy, installed with the 'audio' extra.
+
+    Attributes
+    ----------
+    bands: int
+        Number of frequency bands, fewer are used when the FFT is too small to split them.
+    frames: int
+        Number of windows spread over the sample.
+    fft_size: int
+        Size in samples of each window.
+    """
+    DYNAMIC_RANGE: float = 60.0
+    """ Range in dB of band energies below the loudest band of a sample. """
+
+    def __init__(self, bands: int = 16, frames: int = 16, fft_size: int = 256):
+        require_numpy('Fingerprinting')
+        if bands <= 0 or frames <= 0 or fft_size < 2 * bands:
+            raise ValueError(f"Invalid fingerprint shape: {bands} bands, {frames} frames, FFT size {fft_size}")
+
+        self.bands: int = bands
+        self.frames: int = frames
+        self.fft_size: int = fft_size
+        self._window = np.hanning(fft_size).astype(np.float32)
+        # Band edges in FFT bins, the DC bin is skipped
+        self._edges = np.unique(np.geomspace(1, fft_size // 2 + 1, bands + 1).astype(np.int64))
+
+    @property
+    def size(self) -> int:
+        """ Number of values in a fingerprint. """
+        return (len(self._edges) - 1) * self.frames
+
+    def digest(self, sample_data: bytes | bytearray | memoryview, sample: Sample) -> bytes:
+        """ Returns the content hash a sample's fingerprint is cached by: its data, codec, book, and the fingerprint shape. """
+        h = hashlib.blake2b(digest_size=16)
+        h.update(sample_data)
+        h.update(bytes((int(sample.flags.codec), self.bands, self.frames)) + self.fft_size.to_bytes(4, 'big'))
+        if sample.book is not None:
+            h.update(sample.book.digest())
+        return h.digest()
+
+    def fingerprint(self, pcm: Sequence[int]) -> 'np.ndarray':
+        """
+        Computes the fingerprint of decoded samples.
+
+        Parameters
+        ----------
+        pcm: Sequence[int]
+            s16 samples.
+
+        Returns
+        ----------
+        np.ndarray
+            The float32 fingerprint, of `size` values.
+        """
+        x = np.asarray(pcm, dtype=np.float32) / 32768
+        n = self.fft_size
+        if len(x) < n:
+            x = np.pad(x, (0, n - len(x)))
+
+        starts = np.linspace(0, len(x) - n, self.frames).astype(np.int64)
+        windows = x[starts[:, None] + np.arange(n)] * self._window
+        power = np.abs(np.fft.rfft(windows, axis=1)) ** 2
+        energy = np.add.reduceat(power, self._edges[:-1], axis=1)
+
+        # Bands more than `DYNAMIC_RANGE` below the loudest band are clamped, so noise floors do not dominate
+        features = np.log10(energy + 1e-10).ravel()
+        features = np.maximum(features, features.max() - self.DYNAMIC_RANGE / 10)
+        features -= features.mean()
+        norm = np.linalg.norm(features)
+        if norm < 1e-6:
+            return np.zeros(self.size, dtype=np.float32)
+        return (features / norm).astype(np.float32)
+
+
+#region Worker Processes
+_worker_fingerprinter: SampleFingerprinter | None = None
+
+
+def _attach_fingerprinter(fingerprinter: SampleFingerprinter):
+    """ Keeps the fingerprinter of a worker process, so it is sent once rather than with every job. """
+    global _worker_fingerprinter
+    _worker_fingerprinter = fingerprinter
+
+
+def _job(sample: Sample, view: memoryview, pcm: array | None, keep_pcm: bool) -> tuple:
+    """
+    Returns the arguments of `_fingerprint` for a sample, as plain values that can be sent to
+    a worker process. Samples already decoded, e.g. cached, are sent as PCM instead of data.
+    """
+    if pcm is not None:
+        return (None, None, None, pcm, False)
+    book = None
+    if sample.book is not None:
+        header = sample.book.header
+        book = (header.order, header.num_predictors, [int(c) for c in sample.book.predictors])
+    return (bytes(view), int(sample.flags.codec), book, None, keep_pcm)
+
+
+def _fingerprint(fingerprinter: SampleFingerprinter, data: bytes | None, codec: int | None, book: tuple | None,
+                 pcm: array | None, keep_pcm: bool) -> tuple['np.ndarray', array | None]:
+    """ Decodes a sample from the start unless already decoded, returns its float32 fingerprint and, if kept, its samples. """
+    if pcm is None:
+        pcm = _decode(data, AudioSampleCodec(codec), None if book is None else _book(*book))[0]
+    return fingerprinter.fingerprint(pcm), pcm if keep_pcm else None
+
+
+def _run_job(job: tuple, fingerprinter: SampleFingerprinter | None = None) -> tuple['np.ndarray', array | None] | None:
+    try:
+        return _fingerprint(fingerprinter or _worker_fingerprinter, *job)
+    except ValueError:
+        return None
+#endregion
+
+
+class FingerprintIndex:
+    """
+    A nearest neighbour index of sample fingerprints, e.g. of every sample of several games.
+
+    Fingerprints are stored as the rows of a single matrix, so a query is one matrix-vector
+    product over every indexed sample. Fingerprints are cached by the content hash of their
+    sample, see `SampleFingerprinter.digest()`, so identical samples, whether shared by
+    several banks or present in several audiotables, are fingerprinted once. The cache can be
+    saved and loaded to skip fingerprinting in later sessions.
+
+    Requires NumPy, installed with the 'audio' extra.
+
+    Attributes
+    ----------
+    fingerprinter: SampleFingerprinter
+        Computes the fingerprints of added samples.
+    labels: list[Hashable]
+        Label of each indexed fingerprint.
+    cache: dict[bytes, np.ndarray]
+        Fingerprints by sample content hash.
+    """
+    def __init__(self, fingerprinter: SampleFingerprinter | None = None):
+        self.fingerprinter: SampleFingerprinter = fingerprinter or SampleFingerprinter()
+        self.labels: list[Hashable] = []
+        self.cache: dict[bytes, 'np.ndarray'] = {}
+        self._rows: list['np.ndarray'] = []
+        self._matrix: 'np.ndarray | None' = None
+
+    def __len__(self):
+        return len(self.labels)
+
+    @property
+    def matrix(self) -> 'np.ndarray':
+        """ Every indexed fingerprint, one per row, stacked on first use after fingerprints are added. """
+        if self._matrix is None or len(self._matrix) != len(self._rows):
+            self._matrix = np.stack(self._rows) if self._rows else np.zeros((0, self.fingerprinter.size), dtype=np.float32)
+        return self._matrix
+
+    def add(self, label: Hashable, fingerprint: 'np.ndarray'):
+        """ Adds a fingerprint to the index. """
+        self.labels.append(label)
+        self._rows.append(np.asarray(fingerprint, dtype=np.float32))
+
+    def add_audiotable(self, audiotable: Audiotable, banks: Iterable[InstrumentBank | None], name: Hashable = None,
+                       max_workers: int | None = None, cache: PcmCache | None = None) -> int:
+        """
+        Fingerprints and adds every sample of the given instrument banks.
+
+        Samples are labelled `(name, sample_bank_id, sample_addr)`, and samples with the same
+        label are added once. Samples that are not cached yet are decoded and fingerprinted in
+        worker processes, which are sent each sample's data, codec, and book as plain values.
+        Samples that cannot be decoded are skipped.
+
+        Parameters
+        ----------
+        audiotable: Audiotable
+            The audiotable the banks' samples are stored in.
+        banks: Iterable[InstrumentBank | None]
+            The instrument banks, e.g. `Audiobank.banks`.
+        name: Hashable
+            Name of the audiotable in the labels, e.g. the game.
+        max_workers: int | None
+            Number of processes samples are fingerprinted in, `None` uses every CPU and 1
+            fingerprints in this process.
+        cache: PcmCache | None
+            Cache decoded samples are read through. Samples it misses are decoded in the
+            workers and stored in it.
+
+        Returns
+        ----------
+        int
+            Number of samples added.
+        """
+        jobs: dict[Hashable, tuple[bytes, Sample, AudiobankIndexEntry]] = {}
+        for bank in banks:
+            if bank is None:
+                continue
+            for sample in Audiotable._bank_samples(bank):
+                try:
+                    label = (name, audiotable.sample_bank_id(sample, bank.index_entry), int(sample.sample_addr))
+                    if label not in jobs:
+                        digest = self.fingerprinter.digest(audiotable.sample_view(sample, bank.index_entry), sample)
+                        jobs[label] = (digest, sample, bank.index_entry)
+                except ValueError:
+                    continue
+
+        pending: dict[bytes, tuple] = {}
+        cache_keys: dict[bytes, tuple] = {}
+        for digest, sample, index_entry in jobs.values():
+            if digest in self.cache or digest in pending:
+                continue
+            pcm = None
+            if cache is not None:
+                cache_keys[digest] = cache.key(audiotable, sample, index_entry)
+                pcm = cache.lookup(cache_keys[digest])
+            pending[digest] = _job(sample, audiotable.sample_view(sample, index_entry), pcm, cache is not None)
+
+        if max_workers == 1:
+            results = [_run_job(job, self.fingerprinter) for job in pending.values()]
+        else:
+            with ProcessPoolExecutor(max_workers=max_workers, initializer=_attach_fingerprinter, initargs=(self.fingerprinter,)) as pool:
+                results = list(pool.map(_run_job, pending.values(), chunksize=8))
+
+        for digest, result in zip(pending, results):
+            if result is None:
+                continue
+            fingerprint, pcm = result
+            self.cache[digest] = fingerprint
+            if pcm is not None:
+                cache.store(cache_keys[digest], pcm)
+
+        added = 0
+        for label, (digest, _, _) in jobs.items():
+            fingerprint = self.cache.get(digest)
+            if fingerprint is not None:
+                self.add(label, fingerprint)
+                added += 1
+        return added
+
+    def query(self, fingerprint: 'np.ndarray', k: int = 5, min_similarity: float = -1.0) -> list[tuple[Hashable, float]]:
+        """
+        Finds the indexed fingerprints most similar to a fingerprint.
+
+        Parameters
+        ----------
+        fingerprint: np.ndarray
+            The fingerprint to match.
+        k: int
+            Maximum number of matches.
+        min_similarity: float
+            Smallest cosine similarity of a match, in [-1, 1].
+
+        Returns
+        ----------
+        list[tuple[Hashable, float]]
+            `(label, similarity)` of each match, most similar first.
+        """
+        if not self.labels or k <= 0:
+            return []
+        similarities = self.matrix @ np.asarray(fingerprint, dtype=np.float32)
+        k = min(k, len(similarities))
+        best = np.argpartition(-similarities, k - 1)[:k]
+        best = best[np.argsort(-similarities[best], kind='stable')]
+        return [(self.labels[i], float(similarities[i])) for i in best if similarities[i] >= min_similarity]
+
+    def near_duplicates(self, threshold: float = 0.98, block_size: int = 1024) -> list[tuple[Hashable, Hashable, float]]:
+        """
+        Finds every pair of indexed fingerprints at least `threshold` similar, comparing
+        `block_size` rows at a time against the whole index.
+
+        Returns
+        ----------
+        list[tuple[Hashable, Hashable, float]]
+            `(label_a, label_b, similarity)` of each pair, `label_a` was added first.
+        """
+        matrix = self.matrix
+        pairs = []
+        for start in range(0, len(matrix), block_size):
+            similarities = matrix[start:start + block_size] @ matrix.T
+            rows, columns = np.nonzero(similarities >= threshold)
+            for row, column in zip(rows.tolist(), columns.tolist()):
+                if column > start + row:
+                    pairs.append((self.labels[start + row], self.labels[column], float(similarities[row, column])))
+        return pairs
+
+    def save_cache(self, file_path: str | Path):
+        """ Saves the fingerprint cache to a `.npz` file. """
+        np.savez(file_path, **{digest.hex(): fingerprint for digest, fingerprint in self.cache.items()})
+
+    def load_cache(self, file_path: str | Path):
+        """ Loads fingerprints saved with `save_cache()` into the cache. """
+        with np.load(file_path) as saved:
+            for name in saved.files:
+                self.cache[bytes.fromhex(name)] = saved[name]
+
+
+__all__ = [
+    'SampleFingerprinter',
+    'FingerprintIndex',
+]
@@ -0,0 +1,360 @@
+import math
+from collections.abc import Iterable, Sequence
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass, field
+from z64lib.audiobank import InstrumentBank
+from z64lib.audiobank.structs import Sample
+from z64lib.audiobank.structs import VadpcmBook, VadpcmBookHeader
+from z64lib.audiobank.structs import VadpcmLoop, VadpcmLoopHeader
+from z64lib.audiotable._sample_codecs import _decode_pcm_data
+from z64lib.audiotable._vadpcm_decoder import _sample_view
+from z64lib.audiotable import VadpcmDecoder, VadpcmEncoder, Audiotable
+from z64lib.core.enums import AudioSampleCodec, VadpcmLoopCount
+from z64lib.types import *
+
+
+@dataclass
+class SampleTrim:
+    """
+    Describes how a sample is trimmed.
+
+    Trimmed data is either a slice of the original data, starting `offset` bytes into it, or
+    re-encoded frames replacing the original data at its address.
+
+    Attributes
+    ----------
+    sample_addr: int
+        Address of the original data in its sample bank.
+    old_size: int
+        Size of the original data in bytes.
+    offset: int
+        Bytes the start of the data moves by.
+    size: int
+        Size of the trimmed data in bytes.
+    lead: int
+        Samples removed from the start.
+    tail: int
+        Samples removed from the end.
+    data: bytes | None
+        Re-encoded frames, or `None` when the trimmed data is a slice of the original data.
+    loop_start: int | None
+        Loop start of the trimmed sample, `None` if the sample has no loop.
+    loop_end: int | None
+        Loop end of the trimmed sample.
+    num_samples: int | None
+        Sample count of the trimmed sample's loop header.
+    predictors: list[int] | None
+        Predictor state of the trimmed sample's loop.
+    """
+    sample_addr: int
+    old_size: int
+    offset: int
+    size: int
+    lead: int
+    tail: int
+    data: bytes | None = None
+    loop_start: int | None = None
+    loop_end: int | None = None
+    num_samples: int | None = None
+    predictors: list[int] | None = None
+
+    @property
+    def saved(self) -> int:
+        """ Bytes saved by the trim. """
+        return self.old_size - self.size
+
+    def apply(self, samples: Iterable[Sample]):
+        """
+        Updates samples sharing the trimmed data. Their loop is replaced by a new loop shared
+        between them, since loops may also be shared with samples that are not trimmed.
+        """
+        loop = None
+        for sample in samples:
+            sample.sample_addr = self.sample_addr + self.offset
+            sample.flags.size = self.size
+            if sample.loop is None or self.loop_end is None:
+                continue
+            if loop is None:
+                header = VadpcmLoopHeader()
+                header.loop_start = self.loop_start
+                header.loop_end = self.loop_end
+                header.loop_count = sample.loop.header.loop_count
+                header.num_samples = self.num_samples
+                loop = VadpcmLoop(header, array[s16](self.predictors))
+            sample.loop = loop
+
+
+@dataclass
+class TrimReport:
+    """
+    Result of trimming the samples of an audiotable.
+
+    Attributes
+    ----------
+    trims: dict[int, list[SampleTrim]]
+        Trims applied, by sample bank id.
+    errors: list[tuple[int, int, str]]
+        `(sample_bank_id, sample_addr, message)` of samples that could not be trimmed.
+    """
+    trims: dict[int, list[SampleTrim]] = field(default_factory=dict)
+    errors: list[tuple[int, int, str]] = field(default_factory=list)
+
+    def saved(self) -> dict[int, int]:
+        """ Returns the bytes saved in each sample bank. """
+        return {bank_id: sum(trim.saved for trim in trims) for bank_id, trims in self.trims.items()}
+
+    @property
+    def total_saved(self) -> int:
+        """ Bytes saved across every sample bank. """
+        return sum(self.saved().values())
+
+
+#region Trimming
+def _book(order: int, num_predictors: int, coefficients: list[int]) -> VadpcmBook:
+    header = VadpcmBookHeader()
+    header.order = order
+    header.num_predictors = num_predictors
+    return VadpcmBook(header, array[s16](coefficients))
+
+
+def _decode(data: bytes, codec: AudioSampleCodec, book: VadpcmBook | None) -> tuple[Sequence[int], int, int, VadpcmDecoder | None]:
+    """ Decodes sample data, returns its samples, its samples and bytes per unit it can be sliced at, and its decoder. """
+    if codec in VadpcmDecoder.CODEC_BITS:
+        if book is None:
+            raise ValueError("ADPCM sample has no book")
+        decoder = VadpcmDecoder(book, VadpcmDecoder.CODEC_BITS[codec])
+        return decoder.decode(data), decoder.FRAME_SAMPLES, decoder.frame_size, decoder
+    if codec in (AudioSampleCodec.S8, AudioSampleCodec.S16, AudioSampleCodec.S16_INMEMORY):
+        return _decode_pcm_data(data, codec), 1, 1 if codec == AudioSampleCodec.S8 else 2, None
+    raise ValueError(f"Sample codec {codec.name} cannot be trimmed")
+
+
+def _trim(sample_addr: int, data: bytes, codec: int, book: tuple | None, loop: tuple | None, threshold: int, reencode: bool) -> SampleTrim | None:
+    """ Computes the trim of a sample's data. Defined at module level so it can run in a worker process. """
+    codec = AudioSampleCodec(codec)
+    book = None if book is None else _book(*book)
+    pcm, unit, unit_size, decoder = _decode(data, codec, book)
+    num_samples = len(pcm)
+
+    # Data past the end of the loop is never played by samples that loop forever or do not loop
+    loop_start = loop_end = 0
+    loop_count = VadpcmLoopCount.NO_LOOP
+    if loop is not None:
+        loop_start, loop_end, loop_count, loop_num_samples, predictors = loop
+    if loop_count in (VadpcmLoopCount.NO_LOOP, VadpcmLoopCount.INDEFINITE_LOOP) and loop_end:
+        end = min(loop_end, num_samples)
+    else:
+        end = num_samples
+
+    # Leading silence, never past the start of a loop
+    lead = next((i for i in range(end) if abs(pcm[i]) > threshold), end)
+    if loop_count != VadpcmLoopCount.NO_LOOP:
+        lead = min(lead, loop_start)
+
+    end_units = max(math.ceil(end / unit), 1)
+    lead_units = min(lead // unit, end_units - 1)
+
+    # Slicing frames keeps the decoded output when the state before the first kept frame is silent
+    if decoder is not None and lead_units and any(pcm[lead_units * unit - decoder.order:lead_units * unit]):
+        if reencode and decoder.bits == 4:
+            return _reencode(sample_addr, data, pcm[lead:end], VadpcmEncoder(book), lead, num_samples - end, loop)
+        lead_units = 0
+
+    shift = lead_units * unit
+    offset = lead_units * unit_size
+    size = (end_units - lead_units) * unit_size
+    if offset == 0 and size >= len(data):
+        return None
+
+    trim = SampleTrim(sample_addr, len(data), offset, size, shift, num_samples - end_units * unit)
+    if loop is not None:
+        trim.loop_start = max(loop_start - shift, 0)
+        trim.loop_end = max(loop_end - shift, 0)
+        trim.num_samples = max(min(loop_num_samples, end) - shift, 0) if loop_num_samples else 0
+        # Loops starting at the first sample have no predictor state, see `VadpcmLoop.from_bytes`
+        trim.predictors = list(predictors) if trim.loop_start else []
+    return trim
+
+
+def _reencode(sample_addr: int, data: bytes, pcm: Sequence[int], encoder: VadpcmEncoder, lead: int, tail: int, loop: tuple | None) -> SampleTrim | None:
+    """ Re-encodes trimmed samples with the sample's book, recomputing the loop's predictor state. """
+    frames = encoder.encode(pcm)
+    if len(frames) >= len(data):
+        return None
+
+    trim = SampleTrim(sample_addr, len(data), 0, len(frames), lead, tail, frames)
+    if loop is not None:
+        loop_start, loop_end, _, loop_num_samples, predictors = loop
+        trim.loop_start = max(loop_start - lead, 0)
+        trim.loop_end = max(loop_end - lead, 0)
+        trim.num_samples = len(pcm) if loop_num_samples else 0
+        # Loops starting at the first sample restart from silence and have no predictor state
+        trim.predictors = encoder.loop_state(frames, trim.loop_start) if predictors and trim.loop_start else []
+    return trim
+
+
+def _job(sample: Sample, view: memoryview, threshold: int, reencode: bool) -> tuple:
+    """ Returns the arguments of `_trim` for a sample, as plain values that can be sent to a worker process. """
+    book = None
+    if sample.book is not None:
+        header = sample.book.header
+        book = (header.order, header.num_predictors, [int(c) for c in sample.book.predictors])
+    loop = None
+    if sample.loop is not None:
+        header = sample.loop.header
+        loop = (header.loop_start, header.loop_end, int(header.loop_count), header.num_samples, [int(p) for p in sample.loop.predictors])
+    return (int(sample.sample_addr), bytes(view), int(sample.flags.codec), book, loop, threshold, reencode)
+
+
+def _run_job(job: tuple) -> SampleTrim | str | None:
+    try:
+        return _trim(*job)
+    except ValueError as e:
+        return str(e)
+#endregion
+
+
+def trim_sample(sample: Sample, table_data: bytes | bytearray | memoryview, threshold: int = 0, reencode: bool = True) -> SampleTrim | None:
+    """
+    Computes how a sample can be trimmed, without modifying it.
+
+    Data past the loop end of samples that loop forever or do not loop is never played and is
+    removed, as is silence before the first sample louder than `threshold`, up to the loop
+    start. Samples are trimmed by whole frames, which keeps their decoded output and their
+    loop's predictor state, as long as the frames removed from the start end in silence.
+    Otherwise, ADPCM samples are re-encoded with their book and their loop's predictor state
+    is recomputed from the re-encoded frames.
+
+    Parameters
+    ----------
+    sample: Sample
+        The sample, its `sample_addr` and `size` locate its data in the sample bank.
+    table_data: bytes | bytearray | memoryview
+        Binary data of the sample bank the sample is stored in.
+    threshold: int
+        Largest s16 magnitude treated as silence.
+    reencode: bool
+        Allow re-encoding. When not set, leading silence is only removed when it can be sliced.
+
+    Returns
+    ----------
+    SampleTrim | None
+        The trim, or `None` if nothing can be removed.
+
+    Raises
+    ----------
+    ValueError
+        The sample cannot be decoded or is out of its sample bank's bounds.
+    """
+    return _trim(*_job(sample, _sample_view(sample, table_data), threshold, reencode))
+
+
+def trim_audiotable(audiotable: Audiotable, banks: Iterable[InstrumentBank | None], threshold: int = 0,
+                    reencode: bool = True, max_workers: int | None = None) -> tuple[bytearray, TrimReport]:
+    """
+    Trims every sample of the given instrument banks, see `trim_sample`, and updates their
+    `sample_addr`, size, and loop.
+
+    Samples sharing the same data and parameters are trimmed once. Data shared with samples
+    that are trimmed differently, or overlapped by other samples, is only sliced, never
+    re-encoded, and the bytes freed around it are kept. Otherwise freed bytes are cleared, so
+    `Audiotable.orphans()` treats them as padding. The audiotable's extent index is rebuilt
+    from the banks first, and is stale afterwards.
+
+    Parameters
+    ----------
+    audiotable: Audiotable
+        The audiotable the banks' samples are stored in.
+    banks: Iterable[InstrumentBank | None]
+        The instrument banks, e.g. `Audiobank.banks`.
+    threshold: int
+        Largest s16 magnitude treated as silence.
+    reencode: bool
+        Allow re-encoding samples.
+    max_workers: int | None
+        Number of processes samples are trimmed in, `None` uses every CPU and 1 trims in
+        this process.
+
+    Returns
+    ----------
+    tuple[bytearray, TrimReport]
+        The new `Audiotable` file data, and the trims applied by sample bank.
+    """
+    banks = [bank for bank in banks if bank is not None]
+    audiotable.build_extent_index(banks)
+    report = TrimReport()
+
+    # Group samples by their data and parameters
+    groups: dict[tuple, list[Sample]] = {}
+    for bank in banks:
+        for sample in Audiotable._bank_samples(bank):
+            try:
+                bank_id = audiotable.sample_bank_id(sample, bank.index_entry)
+            except ValueError as e:
+                report.errors.append((-1, int(sample.sample_addr), str(e)))
+                continue
+            book = b'' if sample.book is None else sample.book.digest()
+            loop = b'' if sample.loop is None else sample.loop.digest()
+            key = (bank_id, int(sample.sample_addr), int(sample.flags.size), int(sample.flags.codec), book, loop)
+            members = groups.setdefault(key, [])
+            if all(other is not sample for other in members):
+                members.append(sample)
+
+    # Extents used by several groups or overlapped by other extents are never written to
+    extent_groups: dict[tuple[int, int, int], int] = {}
+    for bank_id, addr, size, *_ in groups:
+        extent_groups[(bank_id, addr, addr + size)] = extent_groups.get((bank_id, addr, addr + size), 0) + 1
+    shared = {extent for extent, count in extent_groups.items() if count > 1}
+    for bank_id in audiotable.extents:
+        for a, b in audiotable.overlaps(bank_id):
+            shared.add((bank_id, *a))
+            shared.add((bank_id, *b))
+
+    keys = []
+    jobs = []
+    for key in groups:
+        bank_id, addr, size = key[:3]
+        sample = groups[key][0]
+        try:
+            view = _sample_view(sample, audiotable.sample_bank(bank_id))
+        except ValueError as e:
+            report.errors.append((bank_id, addr, str(e)))
+            continue
+        keys.append(key)
+        jobs.append(_job(sample, view, threshold, reencode and (bank_id, addr, addr + size) not in shared))
+
+    if max_workers == 1:
+        results = [_run_job(job) for job in jobs]
+    else:
+        with ProcessPoolExecutor(max_workers=max_workers) as pool:
+            results = list(pool.map(_run_job, jobs, chunksize=8))
+
+    out = bytearray(audiotable.data)
+    for key, result in zip(keys, results):
+        bank_id, addr, size = key[:3]
+        if isinstance(result, str):
+            report.errors.append((bank_id, addr, result))
+            continue
+        if result is None:
+            continue
+
+        base = audiotable.index.get(bank_id, 'rom_addr') + addr
+        if result.data is not None:
+            out[base:base + len(result.data)] = result.data
+        if (bank_id, addr, addr + size) not in shared:
+            start = base + result.offset
+            out[base:start] = bytes(start - base)
+            out[start + result.size:base + size] = bytes(base + size - start - result.size)
+
+        result.apply(groups[key])
+        report.trims.setdefault(bank_id, []).append(result)
+
+    return out, report
+
+
+__all__ = [
+    'SampleTrim',
+    'TrimReport',
+    'trim_sample',
+    'trim_audiotable',
+]
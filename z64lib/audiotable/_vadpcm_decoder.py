@@ -0,0 +1,291 @@
+from array import array
+from z64lib.audiobank.structs import Sample
+from z64lib.audiobank.structs import VadpcmBook
+from z64lib.core.enums import AudioSampleCodec, VadpcmLoopCount
+from z64lib.core.helpers import np
+
+
+class VadpcmDecoder:
+    """
+    Decodes VADPCM frames to s16 PCM with the predictors of a `VadpcmBook`.
+
+    Every frame holds 16 samples: a header byte, whose upper nibble is the scale and lower
+    nibble is the predictor index, followed by 16 4-bit residuals, or 2-bit residuals for
+    `AudioSampleCodec.SMALL_ADPCM`. Frames are decoded 8
+    samples at a time, as the RSP does. Every output of a half frame is a fixed linear
+    combination of the previous `order` outputs and of the half frame's residuals, so each
+    predictor is expanded once into an 8x8 residual matrix and `order` rows of state
+    coefficients.
+
+    Decoding is batched: every frame is unpacked at once and the residual term of every half
+    frame is computed in bulk. Only the last `order` outputs of each half frame, which the
+    next half frame depends on, are computed sequentially. NumPy is used when it is
+    installed, otherwise an equivalent pure-Python path is used.
+
+    Attributes
+    ----------
+    order: int
+        Number of previous outputs each prediction depends on.
+    num_predictors: int
+        Number of predictors in the book.
+    bits: int
+        Size of a residual in bits.
+    frame_size: int
+        Size of a frame in bytes.
+    state_coefficients: list[list[list[int]]]
+        Coefficient of each previous output for each output of a half frame, by predictor.
+    residual_matrices: list[list[list[int]]]
+        Coefficient of each residual for each output of a half frame, by predictor.
+    """
+    FRAME_SAMPLES: int = 16
+    HALF_SAMPLES: int = 8
+    SHIFT: int = 11
+    CODEC_BITS: dict[AudioSampleCodec, int] = {
+        AudioSampleCodec.ADPCM: 4,
+        AudioSampleCodec.SMALL_ADPCM: 2,
+    }
+
+    def __init__(self, book: VadpcmBook, bits: int = 4):
+        order = book.header.order
+        num_predictors = book.header.num_predictors
+        coefficients = [int(c) for c in book.predictors]
+
+        if not 0 < order <= self.HALF_SAMPLES or num_predictors <= 0:
+            raise ValueError(f"Invalid book header: order {order}, {num_predictors} predictors")
+        if len(coefficients) < self.HALF_SAMPLES * order * num_predictors:
+            raise ValueError(f"Book holds {len(coefficients)} coefficients, expected {self.HALF_SAMPLES * order * num_predictors}")
+        if bits not in self.CODEC_BITS.values():
+            raise ValueError(f"bits must be one of {sorted(self.CODEC_BITS.values())}, not {bits}")
+
+        self.order: int = order
+        self.num_predictors: int = num_predictors
+        self.bits: int = bits
+        self.frame_size: int = 1 + self.FRAME_SAMPLES * bits // 8
+        self._max_scale: int = 16 - bits # Residuals are shifted into the upper bits of an s16
+        self._shifts: tuple[int, ...] = tuple(range(8 - bits, -1, -bits)) # Residuals are stored from the high bits
+        self._mask: int = (1 << bits) - 1
+        self._sign: int = 1 << (bits - 1)
+
+        n = self.HALF_SAMPLES
+        self.state_coefficients: list[list[list[int]]] = [
+            [coefficients[(p * order + k) * n:(p * order + k + 1) * n] for k in range(order)]
+            for p in range(num_predictors)
+        ]
+
+        # Residual j contributes to output i through the last state row, delayed by i - j
+        self.residual_matrices: list[list[list[int]]] = []
+        for rows in self.state_coefficients:
+            last = rows[-1]
+            self.residual_matrices.append([
+                [(1 << self.SHIFT) if j == i else last[i - j - 1] if j < i else 0 for j in range(n)]
+                for i in range(n)
+            ])
+
+        if np is not None:
+            self._np_residual = np.array(self.residual_matrices, dtype=np.int64)
+            self._np_state = np.array(self.state_coefficients, dtype=np.int64)
+
+    def decode(self, data: bytes | bytearray | memoryview, state: list[int] | None = None, num_frames: int | None = None) -> array:
+        """
+        Decodes consecutive VADPCM frames.
+
+        Parameters
+        ----------
+        data: bytes | bytearray | memoryview
+            Binary frame data, trailing bytes that do not form a whole frame are ignored.
+        state: list[int] | None
+            Outputs preceding the first frame, e.g. the predictor state of a `VadpcmLoop`.
+            Only the last `order` values are used. Defaults to silence.
+        num_frames: int | None
+            Number of frames to decode, defaults to every whole frame in `data`.
+
+        Returns
+        ----------
+        array
+            The decoded samples, as an `'h'` array.
+
+        Raises
+        ----------
+        ValueError
+            A frame references a predictor that is not in the book.
+        """
+        view = memoryview(data).cast('B')
+        available = len(view) // self.frame_size
+        num_frames = available if num_frames is None else min(num_frames, available)
+        state = [0] * self.order if state is None else [int(s) for s in state[-self.order:]]
+        if len(state) < self.order:
+            state = [0] * (self.order - len(state)) + state
+
+        view = view[:num_frames * self.frame_size]
+        pcm = self._decode_numpy(view, num_frames, state) if np is not None else self._decode_python(view, num_frames, state)
+
+        out = array('h')
+        out.frombytes(pcm)
+        return out
+
+    #region Decoding
+    def _check_predictors(self, max_predictor: int):
+        if max_predictor >= self.num_predictors:
+            raise ValueError(f"Frame uses predictor {max_predictor}, but the book only has {self.num_predictors}")
+
+    def _carry(self, tails: list[list[int]], predictors: list[int], state: list[int]) -> list[list[int]]:
+        """
+        Computes the state each half frame is decoded with, i.e. the last `order` outputs
+        of the previous half frame, from the residual term of those outputs.
+        """
+        order = self.order
+        n = self.HALF_SAMPLES
+        coefficients = [[row[n - order:] for row in rows] for rows in self.state_coefficients]
+        states = []
+
+        # Every book in the game is order 2
+        if order == 2:
+            shift = self.SHIFT
+            l1, l2 = state
+            for (r1, r2), p in zip(tails, predictors):
+                states.append((l1, l2))
+                (c1, d1), (c2, d2) = coefficients[p]
+                a = (r1 + c1 * l1 + c2 * l2) >> shift
+                b = (r2 + d1 * l1 + d2 * l2) >> shift
+                l1 = a if -0x8000 <= a <= 0x7FFF else (0x7FFF if a > 0 else -0x8000)
+                l2 = b if -0x8000 <= b <= 0x7FFF else (0x7FFF if b > 0 else -0x8000)
+            return states
+
+        for tail, p in zip(tails, predictors):
+            states.append(state)
+            rows = coefficients[p]
+            state = [
+                min(max((tail[i] + sum(rows[k][i] * state[k] for k in range(order))) >> self.SHIFT, -0x8000), 0x7FFF)
+                for i in range(order)
+            ]
+        return states
+
+    def _decode_numpy(self, view: memoryview, num_frames: int, state: list[int]) -> bytes:
+        n = self.HALF_SAMPLES
+        frames = np.frombuffer(view, dtype=np.uint8).reshape(num_frames, self.frame_size)
+        if num_frames == 0:
+            return b''
+
+        headers = frames[:, 0]
+        scales = np.minimum(headers >> 4, self._max_scale).astype(np.int64)
+        predictors = np.repeat(headers & 0x0F, 2)
+        self._check_predictors(int(predictors.max()))
+
+        # Unpack and sign-extend every residual at once
+        body = frames[:, 1:]
+        codes = np.stack([(body >> shift) & self._mask for shift in self._shifts], axis=-1)
+        codes = codes.reshape(num_frames, self.FRAME_SAMPLES).astype(np.int64)
+        codes = (codes ^ self._sign) - self._sign
+        residuals = (codes << scales[:, None]).reshape(2 * num_frames, n)
+
+        # Residual term of every half frame, one matrix product per predictor
+        terms = np.empty_like(residuals)
+        for p in np.unique(predictors):
+            mask = predictors == p
+            terms[mask] = residuals[mask] @ self._np_residual[p].T
+
+        states = np.array(self._carry(terms[:, n - self.order:].tolist(), predictors.tolist(), state), dtype=np.int64)
+        terms += np.einsum('hk,hki->hi', states, self._np_state[predictors])
+        pcm = np.clip(terms >> self.SHIFT, -0x8000, 0x7FFF).astype(np.int16)
+        return pcm.tobytes()
+
+    def _decode_python(self, view: memoryview, num_frames: int, state: list[int]) -> bytes:
+        n = self.HALF_SAMPLES
+        size = self.frame_size
+        data = view.tobytes()
+
+        predictors = []
+        terms = []
+        for f in range(num_frames):
+            header = data[f * size]
+            scale = min(header >> 4, self._max_scale)
+            p = header & 0x0F
+            self._check_predictors(p)
+
+            residuals = [
+                ((((byte >> shift) & self._mask) ^ self._sign) - self._sign) << scale
+                for byte in data[f * size + 1:(f + 1) * size]
+                for shift in self._shifts
+            ]
+
+            matrix = self.residual_matrices[p]
+            for half in (residuals[:n], residuals[n:]):
+                predictors.append(p)
+                terms.append([sum(m * r for m, r in zip(row[:i + 1], half)) for i, row in enumerate(matrix)])
+
+        states = self._carry([term[n - self.order:] for term in terms], predictors, state)
+
+        pcm = array('h')
+        for term, p, prev in zip(terms, predictors, states):
+            rows = self.state_coefficients[p]
+            for i in range(n):
+                acc = term[i] + sum(rows[k][i] * prev[k] for k in range(self.order))
+                pcm.append(min(max(acc >> self.SHIFT, -0x8000), 0x7FFF))
+        return pcm.tobytes()
+    #endregion
+
+
+def _sample_view(sample: Sample, table_data: bytes | bytearray | memoryview) -> memoryview:
+    """ Returns a view of a sample's data in its sample bank, checked against the sample bank's bounds. """
+    start = int(sample.sample_addr)
+    end = start + sample.flags.size
+    if end > len(table_data):
+        raise ValueError(f"Sample data {start:#x}-{end:#x} is out of the sample bank's bounds ({len(table_data):#x} bytes)")
+    return memoryview(table_data)[start:end]
+
+
+def _loop_start(sample: Sample) -> int:
+    """ Returns the sample a sample's loop starts at. """
+    loop = sample.loop
+    if loop is None or loop.header.loop_count == VadpcmLoopCount.NO_LOOP:
+        raise ValueError("Sample does not loop")
+    return loop.header.loop_start
+
+
+def decode_vadpcm(sample: Sample, table_data: bytes | bytearray | memoryview, from_loop_start: bool = False) -> array:
+    """
+    Decodes an ADPCM or SMALL_ADPCM sample from its `Audiotable` sample bank.
+
+    Parameters
+    ----------
+    sample: Sample
+        The sample, its `sample_addr` and `size` locate its data in the sample bank.
+    table_data: bytes | bytearray | memoryview
+        Binary data of the sample bank the sample is stored in.
+    from_loop_start: bool
+        Decode from the start of the sample's loop with the loop's predictor state, as the
+        audio driver does when the loop repeats.
+
+    Returns
+    ----------
+    array
+        The decoded samples, as an `'h'` array.
+
+    Raises
+    ----------
+    ValueError
+        The sample is not an ADPCM sample, has no book, does not loop when `from_loop_start`
+        is set, or its data is out of the sample bank's bounds.
+    """
+    codec = sample.flags.codec
+    if codec not in VadpcmDecoder.CODEC_BITS:
+        raise ValueError(f"Sample codec is {AudioSampleCodec(codec).name}, not ADPCM or SMALL_ADPCM")
+    if sample.book is None:
+        raise ValueError("ADPCM sample has no book")
+
+    view = _sample_view(sample, table_data)
+    decoder = VadpcmDecoder(sample.book, VadpcmDecoder.CODEC_BITS[codec])
+    if not from_loop_start:
+        return decoder.decode(view)
+
+    # The loop restarts at the frame containing the loop start, loops starting at the
+    # first sample have no predictor state and restart from silence
+    frame, skip = divmod(_loop_start(sample), decoder.FRAME_SAMPLES)
+    pcm = decoder.decode(view[frame * decoder.frame_size:], state=list(sample.loop.predictors) or None)
+    return pcm[skip:]
+
+
+__all__ = [
+    'VadpcmDecoder',
+    'decode_vadpcm',
+]
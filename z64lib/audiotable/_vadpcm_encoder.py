@@ -0,0 +1,412 @@
+import math
+from concurrent.futures import ProcessPoolExecutor
+from z64lib.audiobank.structs import VadpcmBook, VadpcmBookHeader
+from z64lib.audiobank.structs import VadpcmLoop, VadpcmLoopHeader
+from z64lib.audiotable import VadpcmDecoder
+from z64lib.core.enums import VadpcmLoopCount
+from z64lib.core.helpers import np
+from z64lib.types import *
+
+
+class VadpcmEncoder:
+    """
+    Encodes s16 PCM to VADPCM frames with the predictors of a `VadpcmBook`, and trains
+    books from PCM.
+
+    Encoding is done in two passes. The best predictor and the starting scale of every frame
+    are searched in bulk, by predicting every frame from the source samples with every
+    predictor at once. Residuals are then quantized frame by frame against the decoded
+    output, with the same arithmetic as `VadpcmDecoder`, raising the scale when residuals
+    clip. Long samples can be quantized in parallel, see `encode`.
+
+    Attributes
+    ----------
+    book: VadpcmBook
+        The book frames are encoded with.
+    decoder: VadpcmDecoder
+        Decoder of the book, which holds its expanded predictors.
+    """
+    FRAME_SAMPLES: int = VadpcmDecoder.FRAME_SAMPLES
+    HALF_SAMPLES: int = VadpcmDecoder.HALF_SAMPLES
+    SHIFT: int = VadpcmDecoder.SHIFT
+    MAX_SCALE: int = 12
+    MAX_PREDICTORS: int = 16
+
+    # Book training
+    MIN_FRAME_ENERGY: float = 10.0
+    SPLIT_DELTA: float = 0.01
+    REFINE_ITERATIONS: int = 2
+
+    # Frames per job when quantizing in parallel
+    MIN_PARALLEL_FRAMES: int = 0x1000
+
+    def __init__(self, book: VadpcmBook):
+        self.book: VadpcmBook = book
+        self.decoder: VadpcmDecoder = VadpcmDecoder(book)
+
+    @classmethod
+    def from_pcm(cls, pcm, order: int = 2, num_predictors: int = 4) -> 'VadpcmEncoder':
+        """ Instantiates an encoder with a book trained from the given samples, see `train_book`. """
+        return cls(cls.train_book(pcm, order, num_predictors))
+
+    #region Book Training
+    @classmethod
+    def train_book(cls, pcm, order: int = 2, num_predictors: int = 4, iterations: int = REFINE_ITERATIONS) -> VadpcmBook:
+        """
+        Trains a book from PCM samples.
+
+        The linear predictor of every frame with enough energy is computed from the frame's
+        autocorrelation. The predictors are then clustered by splitting and refining
+        centroids, each centroid being the predictor of the mean autocorrelation of its
+        frames, until there are `num_predictors` predictors.
+
+        Parameters
+        ----------
+        pcm: Sequence[int]
+            s16 PCM samples.
+        order: int
+            Number of previous outputs each prediction depends on, the game uses 2.
+        num_predictors: int
+            Number of predictors in the book, at most 16.
+        iterations: int
+            Number of refinement passes after each split.
+
+        Returns
+        ----------
+        VadpcmBook
+            The trained book.
+
+        Raises
+        ----------
+        ValueError
+            Invalid `order` or `num_predictors`.
+        """
+        if not 0 < order <= cls.HALF_SAMPLES:
+            raise ValueError(f"order must be between 1 and {cls.HALF_SAMPLES}, not {order}")
+        if not 0 < num_predictors <= cls.MAX_PREDICTORS:
+            raise ValueError(f"num_predictors must be between 1 and {cls.MAX_PREDICTORS}, not {num_predictors}")
+
+        stats = cls._frame_statistics(pcm, order)
+        predictors = [cls._centroid(stats, [0.0] * order)]
+
+        while len(predictors) < num_predictors:
+            for i in range(min(len(predictors), num_predictors - len(predictors))):
+                coefficients = predictors[i]
+                predictors[i] = coefficients[:-1] + [coefficients[-1] - cls.SPLIT_DELTA]
+                predictors.append(coefficients[:-1] + [coefficients[-1] + cls.SPLIT_DELTA])
+            for _ in range(iterations):
+                predictors = cls._refine(predictors, stats)
+
+        return cls._make_book(predictors, order)
+
+    @classmethod
+    def _frame_statistics(cls, pcm, order: int) -> list[list[float]]:
+        """
+        Returns the normalized autocorrelation of every frame with enough energy and a
+        stable predictor. Frames include the previous `order` samples as history.
+        """
+        samples = [0] * order + [int(v) for v in pcm]
+        num_frames = (len(samples) - order) // cls.FRAME_SAMPLES
+        n = cls.FRAME_SAMPLES
+
+        if np is not None:
+            x = np.array(samples, dtype=np.float64)
+            frames = x[order:order + num_frames * n].reshape(num_frames, n)
+            lags = np.stack([
+                (frames * x[order - lag:order - lag + num_frames * n].reshape(num_frames, n)).sum(axis=1)
+                for lag in range(order + 1)
+            ], axis=1)
+            rows = lags.tolist()
+        else:
+            rows = []
+            for f in range(num_frames):
+                start = order + f * n
+                rows.append([
+                    float(sum(samples[i] * samples[i - lag] for i in range(start, start + n)))
+                    for lag in range(order + 1)
+                ])
+
+        stats = []
+        for r in rows:
+            if r[0] <= cls.MIN_FRAME_ENERGY:
+                continue
+            normalized = [v / r[0] for v in r]
+            if cls._levinson(normalized) is not None:
+                stats.append(normalized)
+        return stats
+
+    @staticmethod
+    def _levinson(r: list[float]) -> list[float] | None:
+        """
+        Solves for the predictor of an autocorrelation, `x[n] ~ sum(a[j] * x[n - j - 1])`,
+        or returns `None` if the predictor is unstable.
+        """
+        a = []
+        error = r[0]
+        for i in range(len(r) - 1):
+            if error <= 0:
+                return None
+            k = (r[i + 1] - sum(a[j] * r[i - j] for j in range(i))) / error
+            if abs(k) >= 1:
+                return None
+            a = [a[j] - k * a[i - 1 - j] for j in range(i)] + [k]
+            error *= 1 - k * k
+        return a
+
+    @staticmethod
+    def _distance(a: list[float], r: list[float]) -> float:
+        """ Returns the prediction error of a predictor over a frame, from the frame's autocorrelation. """
+        order = len(a)
+        error = r[0] - 2 * sum(a[j] * r[j + 1] for j in range(order))
+        for j in range(order):
+            for k in range(order):
+                error += a[j] * a[k] * r[abs(j - k)]
+        return error
+
+    @classmethod
+    def _centroid(cls, stats: list[list[float]], fallback: list[float]) -> list[float]:
+        if not stats:
+            return list(fallback)
+        mean = [sum(column) / len(stats) for column in zip(*stats)]
+        a = cls._levinson(mean)
+        return list(fallback) if a is None else a
+
+    @classmethod
+    def _refine(cls, predictors: list[list[float]], stats: list[list[float]]) -> list[list[float]]:
+        clusters = [[] for _ in predictors]
+        for r in stats:
+            best = min(range(len(predictors)), key=lambda p: cls._distance(predictors[p], r))
+            clusters[best].append(r)
+        return [cls._centroid(cluster, predictor) for cluster, predictor in zip(clusters, predictors)]
+
+    @classmethod
+    def _make_book(cls, predictors: list[list[float]], order: int) -> VadpcmBook:
+        """
+        Expands each predictor into the book format: the contribution of each previous
+        output to each output of a half frame, in fixed point.
+        """
+        coefficients = []
+        for a in predictors:
+            for k in range(order):
+                # The k-th previous output, starting from the oldest, set to 1
+                y = [0.0] * order
+                y[k] = 1.0
+                for _ in range(cls.HALF_SAMPLES):
+                    y.append(sum(a[j] * y[-j - 1] for j in range(order)))
+                coefficients.extend(
+                    min(max(round(v * (1 << cls.SHIFT)), -0x8000), 0x7FFF)
+                    for v in y[order:]
+                )
+
+        header = VadpcmBookHeader()
+        header.order = order
+        header.num_predictors = len(predictors)
+        return VadpcmBook(header, array[s16](coefficients))
+    #endregion
+
+    #region Encoding
+    def encode(self, pcm, max_workers: int = 1) -> bytes:
+        """
+        Encodes PCM samples to VADPCM frames.
+
+        Parameters
+        ----------
+        pcm: Sequence[int]
+            s16 PCM samples, padded with silence to a whole number of frames.
+        max_workers: int
+            Number of processes frames are quantized in. Samples of at least
+            `MIN_PARALLEL_FRAMES` frames per process are split into consecutive runs of
+            frames, each run starting from the source samples preceding it instead of the
+            decoded ones, so a run boundary adds at most one frame of quantization noise.
+
+        Returns
+        ----------
+        bytes
+            The encoded frames.
+        """
+        n = self.FRAME_SAMPLES
+        order = self.decoder.order
+        samples = [min(max(int(v), -0x8000), 0x7FFF) for v in pcm]
+        samples += [0] * (-len(samples) % n)
+        num_frames = len(samples) // n
+        if num_frames == 0:
+            return b''
+
+        predictors, scales = self._search(samples)
+
+        num_jobs = max(1, min(max_workers, num_frames // self.MIN_PARALLEL_FRAMES))
+        bounds = [num_frames * i // num_jobs for i in range(num_jobs + 1)]
+        jobs = [
+            (
+                samples[start * n:end * n],
+                predictors[start:end],
+                scales[start:end],
+                ([0] * order + samples[:start * n])[-order:],
+                self.decoder.state_coefficients,
+                self.decoder.residual_matrices,
+            )
+            for start, end in zip(bounds, bounds[1:])
+        ]
+
+        if num_jobs == 1:
+            return _quantize_frames(*jobs[0])
+
+        with ProcessPoolExecutor(max_workers=num_jobs) as pool:
+            return b''.join(pool.map(_quantize_frames, *zip(*jobs)))
+
+    def _search(self, samples: list[int]) -> tuple[list[int], list[int]]:
+        """
+        Returns the best predictor and the starting scale of every frame, by predicting every
+        sample from the preceding source samples with every predictor at once.
+        """
+        n = self.FRAME_SAMPLES
+        order = self.decoder.order
+        num_frames = len(samples) // n
+
+        # Direct form of each predictor, the contribution of each previous output to the first output
+        direct = [[rows[k][0] / (1 << self.SHIFT) for k in range(order)] for rows in self.decoder.state_coefficients]
+
+        if np is not None:
+            x = np.array([0] * order + samples, dtype=np.float64)
+            history = np.stack([x[k:k + len(samples)] for k in range(order)], axis=1)
+            errors = x[order:, None] - history @ np.array(direct).T
+            errors = errors.reshape(num_frames, n, len(direct))
+
+            predictors = np.argmin((errors ** 2).sum(axis=1), axis=1)
+            peaks = np.abs(errors[np.arange(num_frames), :, predictors]).max(axis=1)
+            scales = np.ceil(np.log2(np.maximum(peaks, 1) / 7.5))
+            return predictors.tolist(), np.clip(scales, 0, self.MAX_SCALE).astype(int).tolist()
+
+        x = [0] * order + samples
+        predictors, scales = [], []
+        for f in range(num_frames):
+            best, best_error, best_peak = 0, None, 0.0
+            for p, a in enumerate(direct):
+                errors = [
+                    x[order + i] - sum(a[k] * x[i + k] for k in range(order))
+                    for i in range(f * n, (f + 1) * n)
+                ]
+                error = sum(e * e for e in errors)
+                if best_error is None or error < best_error:
+                    best, best_error, best_peak = p, error, max(abs(e) for e in errors)
+            predictors.append(best)
+            scales.append(min(max(math.ceil(math.log2(max(best_peak, 1) / 7.5)), 0), self.MAX_SCALE))
+        return predictors, scales
+
+    def loop_state(self, data: bytes, loop_start: int) -> list[int]:
+        """
+        Returns the predictor state of a loop starting at the given sample, i.e. the decoded
+        frame preceding the frame containing the loop start.
+        """
+        frame = loop_start // self.FRAME_SAMPLES
+        if frame == 0:
+            return [0] * self.FRAME_SAMPLES
+        pcm = self.decoder.decode(data, num_frames=frame)
+        return pcm[-self.FRAME_SAMPLES:].tolist()
+    #endregion
+
+
+def _quantize_frames(samples: list[int], predictors: list[int], scales: list[int], state: list[int], state_coefficients: list, residual_matrices: list) -> bytes:
+    """
+    Quantizes consecutive frames against the decoded output, raising a frame's scale once if
+    its residuals clip by more than one step. Defined at module level so it can run in a
+    worker process.
+    """
+    n = VadpcmEncoder.HALF_SAMPLES
+    shift = VadpcmEncoder.SHIFT
+    order = len(state)
+    out = bytearray()
+
+    for f, (p, scale) in enumerate(zip(predictors, scales)):
+        x = samples[2 * n * f:2 * n * (f + 1)]
+        rows = state_coefficients[p]
+        matrix = residual_matrices[p]
+
+        while True:
+            codes = []
+            max_clip = 0
+            prev = state
+            for h in (0, n):
+                residuals = []
+                outputs = []
+                for i in range(n):
+                    acc = sum(rows[k][i] * prev[k] for k in range(order))
+                    acc += sum(matrix[i][j] * residuals[j] for j in range(i))
+                    prediction = acc >> shift
+
+                    code = (x[h + i] - prediction + ((1 << scale) >> 1)) >> scale
+                    clipped = min(max(code, -8), 7)
+                    max_clip = max(max_clip, abs(code - clipped))
+
+                    residual = clipped << scale
+                    residuals.append(residual)
+                    codes.append(clipped)
+                    outputs.append(min(max(prediction + residual, -0x8000), 0x7FFF))
+                prev = outputs[n - order:]
+
+            if max_clip < 2 or scale >= VadpcmEncoder.MAX_SCALE:
+                break
+            scale += 1
+
+        state = prev
+        out.append(scale << 4 | p)
+        for i in range(0, 2 * n, 2):
+            out.append((codes[i] & 0x0F) << 4 | (codes[i + 1] & 0x0F))
+
+    return bytes(out)
+
+
+def encode_vadpcm(pcm, loop_start: int | None = None, loop_end: int | None = None, loop_count: int = VadpcmLoopCount.INDEFINITE_LOOP, order: int = 2, num_predictors: int = 4, max_workers: int = 1) -> tuple[bytes, VadpcmBook, VadpcmLoop]:
+    """
+    Encodes PCM samples for import into an `Audiotable`, training a book for them.
+
+    Parameters
+    ----------
+    pcm: Sequence[int]
+        s16 PCM samples.
+    loop_start: int | None
+        Sample the loop starts at, or `None` if the sample does not loop.
+    loop_end: int | None
+        Sample the loop or the sample ends at, defaults to the number of samples.
+    loop_count: int
+        Number of times the loop repeats, if the sample loops.
+    order: int
+        Number of previous outputs each prediction depends on, the game uses 2.
+    num_predictors: int
+        Number of predictors in the book, at most 16.
+    max_workers: int
+        Number of processes frames are quantized in, see `VadpcmEncoder.encode`.
+
+    Returns
+    ----------
+    tuple[bytes, VadpcmBook, VadpcmLoop]
+        The encoded frames, the trained book, and the loop with its predictor state.
+
+    Raises
+    ----------
+    ValueError
+        The loop is out of the sample's bounds.
+    """
+    num_samples = len(pcm)
+    loop_end = num_samples if loop_end is None else loop_end
+    if loop_start is not None and not 0 <= loop_start < loop_end <= num_samples:
+        raise ValueError(f"Invalid loop {loop_start}-{loop_end} for a sample of {num_samples} samples")
+
+    encoder = VadpcmEncoder.from_pcm(pcm, order, num_predictors)
+    data = encoder.encode(pcm, max_workers)
+
+    header = VadpcmLoopHeader()
+    header.loop_start = 0 if loop_start is None else loop_start
+    header.loop_end = loop_end
+    header.loop_count = VadpcmLoopCount.NO_LOOP if loop_start is None else loop_count
+    header.num_samples = num_samples
+
+    # Loops starting at the first sample restart from silence and have no predictor state
+    state = [] if not loop_start else encoder.loop_state(data, loop_start)
+    return data, encoder.book, VadpcmLoop(header, array[s16](state))
+
+
+__all__ = [
+    'VadpcmEncoder',
+    'encode_vadpcm',
+]
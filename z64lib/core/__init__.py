@@ -8,6 +8,7 @@ from .constants import *
 from .enums import *
 from .exceptions import *
 from .helpers import *
+from .index_table import *
 
 
 __all__ = [
@@ -26,11 +27,24 @@ __all__ = [
     'AudioManagerDebugLevel',
     'AseqVersion',
     'AseqSection',
+    'AllocationStrategy',
     # Allocation
+    'fingerprint',
+    'has_pointers',
+    'pointer_depth',
+    'size_class',
+    'pointer_sites',
+    'DedupeRegistry',
+    'FragmentationReport',
+    'Relocation',
+    'RelocationTable',
     'MemoryAllocator',
     'MemoryStream',
+    # Index Tables
+    'IndexTable',
     # Helpers
     'bit_helpers',
     'safe_enum',
     'make_property',
+    'open_binary',
 ]
\ No newline at end of file
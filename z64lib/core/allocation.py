@@ -1,8 +1,396 @@
-import hashlib
+import bisect
+import struct
+import zlib
+from collections.abc import Callable
+from dataclasses import dataclass
+from functools import lru_cache
 from typing import overload
+from z64lib.core.enums import AllocationStrategy
 from z64lib.types import *
 
 
+def fingerprint(data: bytes | bytearray | memoryview) -> tuple[int, int]:
+    """
+    Returns a fast, non-cryptographic fingerprint of the given data.
+
+    Fingerprints are only used to find candidate duplicates; equal fingerprints
+    must always be confirmed with a byte comparison.
+
+    Parameters
+    ----------
+    data: bytes | bytearray | memoryview
+        The data to fingerprint.
+
+    Returns
+    ----------
+    tuple[int, int]
+        The length of the data and its CRC-32 checksum.
+    """
+    return (len(data), zlib.crc32(data))
+
+
+@lru_cache(maxsize=None)
+def has_pointers(T: type) -> bool:
+    """
+    Returns whether the given data type contains a pointer at any depth.
+
+    Objects of types without pointers serialize to the same bytes regardless of
+    where other objects are placed, so their serialized bytes can be reused.
+    """
+    if getattr(T, 'is_pointer', False):
+        return True
+    if getattr(T, 'is_array', False):
+        return T.data_type is not None and has_pointers(T.data_type)
+    if getattr(T, 'is_union', False) or getattr(T, 'is_struct', False):
+        return any(has_pointers(field[1]) for field in getattr(T, '_fields_', []))
+    return False
+
+
+@lru_cache(maxsize=None)
+def pointer_depth(T: type) -> int:
+    """
+    Returns the length of the longest pointer chain reachable from the given data type.
+
+    Types with a depth of 0 contain no pointers, and every pointer in a type of depth `n`
+    targets a type of depth `n - 1` or less.
+    """
+    if getattr(T, 'is_pointer', False):
+        return 1 + (pointer_depth(T.data_type) if T.data_type is not None else 0)
+    if getattr(T, 'is_array', False):
+        return pointer_depth(T.data_type) if T.data_type is not None else 0
+    if getattr(T, 'is_union', False) or getattr(T, 'is_struct', False):
+        return max((pointer_depth(field[1]) for field in getattr(T, '_fields_', [])), default=0)
+    return 0
+
+
+def size_class(size: int) -> int:
+    """ Returns the size class of an allocation, the next power of two of its size. """
+    return 1 << max(size - 1, 0).bit_length()
+
+
+@dataclass
+class FragmentationReport:
+    """
+    Summarizes the free space left between the blocks of a `MemoryAllocator`.
+
+    Attributes
+    ----------
+    extent: int
+        End address of the highest reserved block.
+    used: int
+        Total bytes reserved by blocks.
+    free: int
+        Total bytes in free holes below `extent`.
+    num_holes: int
+        Number of free holes.
+    largest_hole: int
+        Size of the largest free hole.
+    """
+    extent: int = 0
+    used: int = 0
+    free: int = 0
+    num_holes: int = 0
+    largest_hole: int = 0
+
+    @property
+    def utilization(self) -> float:
+        """ Fraction of the extent that is reserved by blocks. """
+        return self.used / self.extent if self.extent else 1.0
+
+    @property
+    def fragmentation(self) -> float:
+        """ External fragmentation, 0.0 when all free space is one hole. """
+        return 1.0 - (self.largest_hole / self.free) if self.free else 0.0
+
+
+def pointer_sites(obj, offset: int = 0):
+    """
+    Yields every non-null pointer stored inline in an object, at any depth.
+
+    Parameters
+    ----------
+    obj: Z64Struct | DynaStruct | array
+        The object to walk.
+    offset: int
+        Address of the object, added to every site.
+
+    Yields
+    ----------
+    tuple[int, DataType, int]
+        The site offset of the pointer, the object it targets, and its width in bytes.
+    """
+    if getattr(obj, 'is_array', False):
+        T = obj.data_type
+        if not has_pointers(T):
+            return
+        stride = T.size()
+        for i, item in enumerate(obj):
+            if getattr(T, 'is_pointer', False):
+                target = item.reference if isinstance(item, T) else item
+                if target is not None:
+                    yield offset + i * stride, target, stride
+            else:
+                yield from pointer_sites(item, offset + i * stride)
+        return
+
+    layout = obj._layout_ or obj._generate_layout()
+    for field in layout:
+        if not has_pointers(field.type):
+            continue
+
+        attr = getattr(obj, field.name, None)
+        if field.kind == 'pointer':
+            target = attr.reference if isinstance(attr, field.type) else attr
+            if target is not None:
+                yield offset + field.offset, target, field.type.size()
+        elif attr is not None:
+            yield from pointer_sites(attr, offset + field.offset)
+
+
+@dataclass
+class Relocation:
+    """
+    Represents a pointer written into the assembled output.
+
+    Attributes
+    ----------
+    site: int
+        Offset of the pointer in the assembled output.
+    target: DataType | int | None
+        The object the pointer targets, or an absolute offset. `None` when the table
+        was loaded from exported data and only the site is known.
+    width: int
+        Width of the pointer in bytes.
+    """
+    site: int
+    target: object = None
+    width: int = 4
+
+
+class RelocationTable:
+    """
+    Records every pointer site written by a `MemoryAllocator`, so that all pointers can
+    be resolved in a single pass and a compiled output can be moved to a new base address.
+
+    Attributes
+    ----------
+    entries: list[Relocation]
+        The recorded relocations.
+
+    Parameters
+    ----------
+    address_of: Callable[[DataType], int | None] | None
+        Returns the address of a target placed by the allocator that owns the table, so
+        targets resolve to that allocator's layout even after another allocator placed them.
+    """
+    _STRUCTS: dict[int, struct.Struct] = {
+        1: struct.Struct('>B'),
+        2: struct.Struct('>H'),
+        4: struct.Struct('>I'),
+        8: struct.Struct('>Q'),
+    }
+    _ENTRY = struct.Struct('>2I')
+
+    def __init__(self, address_of: Callable[[object], int | None] | None = None):
+        self.entries: list[Relocation] = []
+        self._sorted: bool = True
+        self._address_of = address_of
+
+    def __len__(self):
+        return len(self.entries)
+
+    def __iter__(self):
+        return iter(self.entries)
+
+    def add(self, site: int, target, width: int = 4):
+        """ Records a pointer at the given site that targets an object or absolute offset. """
+        if width not in self._STRUCTS:
+            raise ValueError(f"Unsupported relocation width: {width}")
+        if self.entries and site < self.entries[-1].site:
+            self._sorted = False
+        self.entries.append(Relocation(site, target, width))
+
+    def _sort(self):
+        if not self._sorted:
+            self.entries.sort(key=lambda r: r.site)
+            self._sorted = True
+
+    def target_address(self, target) -> int:
+        """ Returns the address of a relocation target. """
+        if isinstance(target, int):
+            return target
+        address = self._address_of(target) if self._address_of is not None else None
+        if address is None:
+            address = getattr(target, 'allocated_address', None)
+        if address is None:
+            address = getattr(target, 'original_address', None)
+        if address is None:
+            raise ValueError(f"Relocation target {type(target).__name__} not placed in memory")
+        return address
+
+    def resolve(self, buffer: bytearray | memoryview, base: int = 0, start: int = 0, end: int | None = None):
+        """
+        Writes the address of every relocation target into the buffer.
+
+        Parameters
+        ----------
+        buffer: bytearray | memoryview
+            The assembled output, or the window of it that begins at `start`.
+        base: int
+            Base address added to every target address.
+        start: int
+            Output offset of the first byte of `buffer`.
+        end: int | None
+            Output offset where the window ends, relocations past it are skipped.
+        """
+        self._sort()
+        end = start + len(buffer) if end is None else end
+        lo = bisect.bisect_left(self.entries, start, key=lambda r: r.site)
+
+        for entry in self.entries[lo:]:
+            if entry.site >= end:
+                break
+            self._STRUCTS[entry.width].pack_into(buffer, entry.site - start, base + self.target_address(entry.target))
+
+    def relocate(self, buffer: bytearray | memoryview, delta: int):
+        """
+        Moves already resolved output to a new base address by adding `delta` to every pointer.
+
+        Parameters
+        ----------
+        buffer: bytearray | memoryview
+            The assembled output.
+        delta: int
+            Difference between the new and the old base address.
+        """
+        for entry in self.entries:
+            s = self._STRUCTS[entry.width]
+            mask = (1 << (entry.width * 8)) - 1
+            value = s.unpack_from(buffer, entry.site)[0]
+            s.pack_into(buffer, entry.site, (value + delta) & mask)
+
+    def discard_range(self, start: int, end: int):
+        """ Removes every relocation whose site lies between `start` and `end`. """
+        self.entries = [entry for entry in self.entries if not (start <= entry.site < end)]
+
+    def sites(self) -> list[tuple[int, int]]:
+        """ Returns the sorted `(site, width)` pairs of every relocation. """
+        self._sort()
+        return [(entry.site, entry.width) for entry in self.entries]
+
+    def to_bytes(self) -> bytes:
+        """
+        Exports the relocation sites as a big-endian entry count followed by one
+        `(site, width)` pair of unsigned 32-bit integers per relocation.
+        """
+        sites = self.sites()
+        buffer = bytearray(4 + len(sites) * self._ENTRY.size)
+        struct.pack_into('>I', buffer, 0, len(sites))
+        for i, (site, width) in enumerate(sites):
+            self._ENTRY.pack_into(buffer, 4 + i * self._ENTRY.size, site, width)
+        return bytes(buffer)
+
+    @classmethod
+    def from_bytes(cls, buffer: bytes, offset: int = 0) -> 'RelocationTable':
+        """ Loads relocation sites exported with `to_bytes()`, for use with `relocate()`. """
+        obj = cls()
+        count = struct.unpack_from('>I', buffer, offset)[0]
+        for site, width in cls._ENTRY.iter_unpack(buffer[offset + 4:offset + 4 + count * cls._ENTRY.size]):
+            obj.add(site, None, width)
+        return obj
+
+
+class DedupeRegistry:
+    """
+    Tracks reserved blocks so that duplicate objects and data can share a single block.
+
+    Blocks are looked up in three ways:
+
+    - By identity: reserving the same Python object twice always returns its existing block.
+    - By structure: when `structural` is set, objects with an equal `get_hash()` share a
+      block without either object being serialized.
+    - By content: serialized bytes are fingerprinted with `fingerprint()`, and a byte
+      comparison is only performed when fingerprints collide.
+
+    Attributes
+    ----------
+    structural: bool
+        Whether objects are deduplicated by structural hash instead of by content.
+    hits: int
+        Number of lookups that resolved to an existing block.
+    collisions: int
+        Number of fingerprint matches whose bytes turned out to differ.
+
+    Parameters
+    ----------
+    structural: bool
+        Whether objects are deduplicated by structural hash instead of by content.
+    """
+    def __init__(self, structural: bool = False):
+        self.structural: bool = structural
+        self.hits: int = 0
+        self.collisions: int = 0
+        self._objects: dict[int, 'MemoryAllocator.Block'] = {}
+        self._structures: dict[int, 'MemoryAllocator.Block'] = {}
+        self._fingerprints: dict[tuple[int, int], list['MemoryAllocator.Block']] = {}
+
+    def find_object(self, obj) -> 'MemoryAllocator.Block | None':
+        """ Returns the block the given object was already reserved in. """
+        blk = self._objects.get(id(obj))
+        if blk is not None and blk.obj is obj:
+            self.hits += 1
+            return blk
+        return None
+
+    def block_of(self, obj) -> 'MemoryAllocator.Block | None':
+        """ Returns the block that owns the given object, without counting a lookup. """
+        blk = self._objects.get(id(obj))
+        return blk if blk is not None and blk.obj is obj else None
+
+    def find_structure(self, digest: int) -> 'MemoryAllocator.Block | None':
+        """ Returns the block of an object with the given structural hash. """
+        blk = self._structures.get(digest)
+        if blk is not None:
+            self.hits += 1
+        return blk
+
+    def find_bytes(self, data: bytes) -> 'MemoryAllocator.Block | None':
+        """ Returns a block whose serialized bytes are identical to the given data. """
+        for blk in self._fingerprints.get(fingerprint(data), ()):
+            if blk.get_bytes() == data:
+                self.hits += 1
+                return blk
+            self.collisions += 1
+        return None
+
+    def add(self, block: 'MemoryAllocator.Block', digest: int | None = None, data: bytes | None = None):
+        """ Registers a newly reserved block. """
+        if block.obj is not None:
+            self._objects[id(block.obj)] = block
+        if digest is not None:
+            self._structures[digest] = block
+        if data is not None:
+            block.hash = fingerprint(data)
+            self._fingerprints.setdefault(block.hash, []).append(block)
+
+    def remove(self, block: 'MemoryAllocator.Block'):
+        """ Removes every lookup that resolves to the given block. """
+        self.discard(block)
+        if block.obj is not None and self._objects.get(id(block.obj)) is block:
+            del self._objects[id(block.obj)]
+        for digest in [d for d, blk in self._structures.items() if blk is block]:
+            del self._structures[digest]
+
+    def discard(self, block: 'MemoryAllocator.Block'):
+        """ Removes a block from content lookups, e.g. after its data is overwritten. """
+        if block.hash is None:
+            return
+        candidates = self._fingerprints.get(block.hash, [])
+        if block in candidates:
+            candidates.remove(block)
+        block.hash = None
+
+
 class MemoryAllocator:
     """
     Reserves memory and assigns offsets from the given buffer.
@@ -13,14 +401,27 @@ class MemoryAllocator:
         ...
     entries: list[tuple[int, object]]
         ...
+    dedupe_registry: DedupeRegistry
+        Registry used to share blocks between duplicate objects and data.
+    strategy: AllocationStrategy
+        Strategy used to choose the address of each allocation.
+    free_list: list[tuple[int, int]]
+        Sorted `(start, end)` ranges of free holes left by alignment padding.
+    relocations: RelocationTable
+        Every pointer site recorded while objects were placed.
 
     Parameters
     ----------
     start: int
         ...
+    structural_dedupe: bool
+        Deduplicate objects by structural hash (`get_hash()`) instead of by their
+        serialized bytes.
+    strategy: AllocationStrategy | str
+        Strategy used to choose the address of each allocation.
     """
     class Block:
-        __slots__ = ('address', 'size', 'obj', 'data', 'hash')
+        __slots__ = ('address', 'size', 'obj', 'data', 'hash', 'cache')
 
         def __init__(self, address: int, size: int, obj=None, data=None):
             self.address = address
@@ -28,20 +429,49 @@ class MemoryAllocator:
             self.obj = obj
             self.data = data
             self.hash = None
+            self.cache = None
 
         def get_bytes(self):
-            if self.obj is not None:
-                return self.obj.to_bytes()
-            return self.data or b'\x00' * self.size
+            """ Returns the block's serialized bytes, serializing the object only once. """
+            if self.cache is None:
+                if self.obj is not None:
+                    self.cache = self.obj.to_bytes()
+                else:
+                    self.cache = self.data or b'\x00' * self.size
+            return self.cache
+
+        def pack_into(self, buffer: bytearray | memoryview, offset: int) -> int:
+            """
+            Writes the block into a zero-filled buffer at the given offset.
+
+            Cached bytes are copied as-is, otherwise the object serializes directly into the buffer.
+            """
+            obj = self.obj
+            if self.cache is None and (getattr(obj, 'is_struct', False) or getattr(obj, 'is_array', False)):
+                return obj.pack_into(buffer, offset)
+
+            data = self.get_bytes()
+            size = min(len(data), self.size)
+            buffer[offset:offset + size] = data[:size]
+            return size
+
+        def invalidate(self):
+            """ Discards the cached bytes so the next `get_bytes()` call serializes again. """
+            self.cache = None
 
         def compute_hash(self):
-            self.hash = hashlib.sha256(self.get_bytes()).hexdigest()
+            self.hash = fingerprint(self.get_bytes())
             return self.hash
 
-    def __init__(self, start: int = 0x10):
+    def __init__(self, start: int = 0x10, structural_dedupe: bool = False,
+                 strategy: AllocationStrategy | str = AllocationStrategy.BUMP):
         self.address: int = start
         self.blocks: list[MemoryAllocator.Block] = []
-        self.dedupe_registry = {}
+        self.dedupe_registry = DedupeRegistry(structural=structural_dedupe)
+        self.strategy: AllocationStrategy = AllocationStrategy(strategy)
+        self.free_list: list[tuple[int, int]] = [] # Sorted (start, end) holes below self.address
+        self.relocations: RelocationTable = RelocationTable(self.address_of)
+        self._addresses: dict[int, tuple[object, int]] = {} # Object id to (object, address)
 
     #region Allocation
     def _check_overlap(self, start: int, size: int):
@@ -51,39 +481,283 @@ class MemoryAllocator:
             if not (end <= blk.address or start >= blk_end):
                 raise ValueError(f"Memory overlap detected at {start:#x}-{end:#x} overlaps {blk.address:#x}-{blk_end:#x}")
 
-    def reserve_at(self, address: int, size: int, obj=None, data=None, deduplicate=True):
-        block_bytes = obj.to_bytes() if obj else data or b'\x00' * size
-        block_hash = hashlib.sha256(block_bytes).hexdigest() if deduplicate else None
-        if deduplicate and block_hash in self.dedupe_registry:
-            existing_block = self.dedupe_registry[block_hash]
-            if obj:
-                setattr(obj, 'allocated_address', existing_block.address)
-            return existing_block.address
+    def _find_duplicate(self, size: int, obj=None, data=None):
+        """ Returns the duplicate block, if any, with the bytes and digest computed for the lookup. """
+        registry = self.dedupe_registry
+        block_bytes = None
+        digest = None
+
+        existing_block = registry.find_object(obj) if obj is not None else None
+        if existing_block is None:
+            if obj is not None and registry.structural and hasattr(obj, 'get_hash'):
+                digest = obj.get_hash()
+                existing_block = registry.find_structure(digest)
+            else:
+                block_bytes = obj.to_bytes() if obj is not None else data or b'\x00' * size
+                existing_block = registry.find_bytes(block_bytes)
+
+        return existing_block, block_bytes, digest
 
+    def _place(self, address: int, size: int, obj=None, data=None, block_bytes=None, digest=None, deduplicate=True) -> int:
+        """ Creates a block at the given address and updates the free list. """
         self._check_overlap(address, size)
 
         block = MemoryAllocator.Block(address, size, obj=obj, data=data)
-        block.hash = block_hash
+        block.cache = block_bytes
         self.blocks.append(block)
-        if block_hash:
-            self.dedupe_registry[block_hash] = block
+        if deduplicate:
+            self.dedupe_registry.add(block, digest=digest, data=block_bytes)
 
         if obj is not None:
-            setattr(obj, 'allocated_address', address)
+            self._assign(obj, address)
+            if has_pointers(type(obj)):
+                self.record_pointers(obj, address)
 
+        self._claim(address, address + size)
         self.address = max(self.address, address + size)
         return address
 
+    def reserve_at(self, address: int, size: int, obj=None, data=None, deduplicate=True):
+        block_bytes = None
+        digest = None
+
+        if deduplicate:
+            existing_block, block_bytes, digest = self._find_duplicate(size, obj, data)
+            if existing_block is not None:
+                if obj is not None:
+                    self._assign(obj, existing_block.address)
+                return existing_block.address
+
+        return self._place(address, size, obj, data, block_bytes, digest, deduplicate)
+
     def reserve_mem(self, obj, size: int, alignment: int = 0x10, aligned: bool = False):
-        """"""
-        if not aligned:
-            self.address = self.align_to(self.address, alignment)
-        return self.reserve_at(self.address, size, obj=obj)
+        """
+        Reserves memory for an object at the address chosen by the allocation strategy.
+
+        Parameters
+        ----------
+        obj: DataType
+            The object to reserve memory for.
+        size: int
+            Size of the object in bytes.
+        alignment: int
+            Alignment boundary of the object's address.
+        aligned: bool
+            Skip aligning the object's address.
+
+        Returns
+        ----------
+        int
+            The address of the object, or of its duplicate.
+        """
+        existing_block, block_bytes, digest = self._find_duplicate(size, obj)
+        if existing_block is not None:
+            self._assign(obj, existing_block.address)
+            return existing_block.address
+
+        address = self.next_address(size, 1 if aligned else alignment)
+        return self._place(address, size, obj, None, block_bytes, digest)
+
+    def reserve_packed(self, objects: list, alignment: int = 0x10) -> list[int]:
+        """
+        Reserves memory for many objects, placing them by size class so that smaller
+        objects fill the holes left by larger ones.
+
+        Objects are placed in order of pointer depth first, so every pointer target is
+        placed before the objects that point to it, then from the largest size class
+        to the smallest.
+
+        Parameters
+        ----------
+        objects: list[DataType]
+            The objects to reserve memory for.
+        alignment: int
+            Minimum alignment boundary of every object. Objects that declare a larger
+            `_align_` are aligned to it instead.
 
-    def malloc(self, size: int, data: bytes = None, alignment: int = 0x10) -> int:
+        Returns
+        ----------
+        list[int]
+            The address of each object, in the order the objects were given.
+        """
+        sizes = [obj.size() if hasattr(obj, 'size') else 0x10 for obj in objects]
+        order = sorted(
+            range(len(objects)),
+            key=lambda i: (pointer_depth(type(objects[i])), -size_class(sizes[i]), i)
+        )
+
+        addresses = [0] * len(objects)
+        for i in order:
+            obj_alignment = max(alignment, getattr(objects[i], '_align_', 1))
+            addresses[i] = self.reserve_mem(objects[i], sizes[i], obj_alignment)
+        return addresses
+
+    def malloc(self, size: int, data: bytes = None, alignment: int = 0x10, deduplicate: bool = True) -> int:
         """"""
-        addr = self.align_to(self.address, alignment)
-        return self.reserve_at(addr, size, data=data)
+        addr = self.next_address(size, alignment)
+        return self.reserve_at(addr, size, data=data, deduplicate=deduplicate)
+
+    def add_relocation(self, site: int, target, width: int = 4):
+        """
+        Records a pointer at the given site to be resolved during assembly.
+
+        Parameters
+        ----------
+        site: int
+            Address of the pointer.
+        target: DataType | int
+            The object the pointer targets, or an absolute address.
+        width: int
+            Width of the pointer in bytes.
+        """
+        self.relocations.add(site, target, width)
+
+    def record_pointers(self, obj, address: int):
+        """ Records every non-null pointer stored in an object placed at the given address. """
+        for site, target, width in pointer_sites(obj, address):
+            self.relocations.add(site, target, width)
+
+    def move(self, obj, size: int, alignment: int = 0x10) -> 'MemoryAllocator.Block':
+        """
+        Places an already placed object in a new block chosen by the allocation strategy,
+        without deduplication. The object's previous block is left untouched.
+
+        Parameters
+        ----------
+        obj: DataType
+            The object to move.
+        size: int
+            New size of the object in bytes.
+        alignment: int
+            Alignment boundary of the object's new address.
+
+        Returns
+        ----------
+        MemoryAllocator.Block
+            The object's new block.
+        """
+        address = self.next_address(size, alignment)
+        self._place(address, size, obj)
+        return self.dedupe_registry.block_of(obj)
+
+    def release(self, block: 'MemoryAllocator.Block'):
+        """ Frees a block, returning its memory to the free list and dropping its relocations. """
+        self.blocks.remove(block)
+        self.dedupe_registry.remove(block)
+        self.relocations.discard_range(block.address, block.address + block.size)
+
+        end = block.address + block.size
+        if end >= self.address:
+            self.address = max((blk.address + blk.size for blk in self.blocks), default=block.address)
+            self.free_list = [(start, min(hole_end, self.address)) for start, hole_end in self.free_list if start < self.address]
+        else:
+            self._add_hole(block.address, end)
+            self._merge_holes()
+
+    def block_of(self, obj) -> 'MemoryAllocator.Block | None':
+        """ Returns the block that owns the given object. """
+        return self.dedupe_registry.block_of(obj)
+
+    def _assign(self, obj, address: int):
+        """ Records the address of an object placed in, or deduplicated into, a block. """
+        self._addresses[id(obj)] = (obj, address)
+        setattr(obj, 'allocated_address', address)
+
+    def address_of(self, obj) -> int | None:
+        """
+        Returns the address this allocator assigned to an object, or `None` if it was never placed.
+
+        Objects shared with other allocators, e.g. interned samples, keep a single
+        `allocated_address` attribute that the last allocator to place them overwrites, so
+        this is the address to use when patching a retained layout.
+        """
+        entry = self._addresses.get(id(obj))
+        return entry[1] if entry is not None and entry[0] is obj else None
+
+    def restore_addresses(self):
+        """ Writes every address assigned by this allocator back to its object's `allocated_address`. """
+        for obj, address in self._addresses.values():
+            setattr(obj, 'allocated_address', address)
+
+    def align(self, alignment: int):
+        """ Aligns the end of the reserved memory, recording the skipped bytes as a free hole. """
+        aligned = self.align_to(self.address, alignment)
+        self._add_hole(self.address, aligned)
+        self.address = aligned
+    #endregion
+
+    #region Free List
+    def next_address(self, size: int, alignment: int = 0x10) -> int:
+        """
+        Returns the address the allocation strategy would assign to an allocation.
+
+        Parameters
+        ----------
+        size: int
+            Size of the allocation in bytes.
+        alignment: int
+            Alignment boundary of the allocation's address.
+
+        Returns
+        ----------
+        int
+            An address inside a free hole, or the aligned end of the reserved memory.
+        """
+        if self.strategy is not AllocationStrategy.BUMP:
+            best = None
+            for start, end in self.free_list:
+                address = self.align_to(start, alignment)
+                if address + size > end:
+                    continue
+                if self.strategy is AllocationStrategy.FIRST_FIT:
+                    return address
+                waste = (end - start) - size
+                if best is None or waste < best[0]:
+                    best = (waste, address)
+            if best is not None:
+                return best[1]
+
+        return self.align_to(self.address, alignment)
+
+    def _add_hole(self, start: int, end: int):
+        if end > start:
+            bisect.insort(self.free_list, (start, end))
+
+    def _merge_holes(self):
+        merged = []
+        for start, end in self.free_list:
+            if merged and merged[-1][1] >= start:
+                merged[-1] = (merged[-1][0], max(merged[-1][1], end))
+            else:
+                merged.append((start, end))
+        self.free_list = merged
+
+    def _claim(self, start: int, end: int):
+        """ Removes the given range from the free list, recording any gap it skips as a hole. """
+        if start > self.address:
+            self._add_hole(self.address, start)
+
+        holes = []
+        for hole_start, hole_end in self.free_list:
+            if hole_end <= start or hole_start >= end:
+                holes.append((hole_start, hole_end))
+                continue
+            if hole_start < start:
+                holes.append((hole_start, start))
+            if end < hole_end:
+                holes.append((end, hole_end))
+        self.free_list = holes
+
+    def fragmentation(self) -> FragmentationReport:
+        """ Returns a summary of the free holes left between reserved blocks. """
+        sizes = [end - start for start, end in self.free_list]
+        return FragmentationReport(
+            extent=max((blk.address + blk.size for blk in self.blocks), default=0),
+            used=sum(blk.size for blk in self.blocks),
+            free=sum(sizes),
+            num_holes=len(sizes),
+            largest_hole=max(sizes, default=0),
+        )
     #endregion
 
     #region Read and Write
@@ -100,46 +774,146 @@ class MemoryAllocator:
             if blk.address == address:
                 if len(data) > blk.size:
                     raise ValueError("Write exceeds block size")
+                self.dedupe_registry.discard(blk)
                 blk.data = data
+                blk.invalidate()
                 return
         raise ValueError("Invalid address")
     #endregion
 
     #region Assembly
-    def assemble(self, pad_alignment: int = 0x10, auto_patch_pointer: bool = True) -> bytes:
-        """"""
+    def _prepare_blocks(self, auto_patch_pointer: bool = True):
+        """ Sorts blocks by address and, when pointers are not patched, invalidates objects with pointers. """
+        self.blocks.sort(key=lambda b: b.address)
+
+        # Pointers are patched from the relocation table after the blocks are written,
+        # so cached bytes can be reused as-is. Otherwise, objects with pointers must be
+        # serialized again to pick up their targets' addresses.
+        if auto_patch_pointer:
+            return
+
+        for blk in self.blocks:
+            if blk.obj is not None and has_pointers(type(blk.obj)):
+                blk.invalidate()
+
+    def extent(self, pad_alignment: int = 0x10) -> int:
+        """ Returns the size of the assembled output, the end of the highest block aligned to `pad_alignment`. """
         if not self.blocks:
-            return b''
+            return 0
+        return self.align_to(max(blk.address + blk.size for blk in self.blocks), pad_alignment)
 
-        self.blocks.sort(key=lambda b: b.address)
+    def assemble(self, pad_alignment: int = 0x10, auto_patch_pointer: bool = True) -> bytearray:
+        """
+        Assembles every reserved block into a single buffer.
+
+        The output is allocated once at its final size and every object serializes directly
+        into its own slot, the buffer is returned without a final copy.
+
+        Parameters
+        ----------
+        pad_alignment: int
+            Alignment of the end of the output.
+        auto_patch_pointer: bool
+            Write every pointer recorded in the relocation table after the blocks.
+
+        Returns
+        ----------
+        bytearray
+            The assembled data.
+        """
+        if not self.blocks:
+            return bytearray()
 
+        self._prepare_blocks(auto_patch_pointer)
+
+        buffer = bytearray(self.extent(pad_alignment))
+        view = memoryview(buffer)
+        for blk in self.blocks:
+            blk.pack_into(view, blk.address)
         if auto_patch_pointer:
-            for blk in self.blocks:
-                if blk.obj is None:
-                    continue
+            self.relocations.resolve(view)
+        view.release()
 
-                for field_name in getattr(blk.obj, '_fields_', []):
-                    attr = getattr(blk.obj, field_name[0], None)
-                    if getattr(attr, 'is_pointer', False):
-                        setattr(
-                            attr,
-                            'target_address',
-                            getattr(attr.reference, 'allocated_address', 0)
-                        )
+        return buffer
 
-                blk.data = blk.obj.to_bytes()
+    def assemble_into(self, buffer: bytearray | memoryview, offset: int = 0, pad_alignment: int = 0x10, auto_patch_pointer: bool = True) -> int:
+        """
+        Assembles every reserved block into an existing writable buffer.
+
+        Parameters
+        ----------
+        buffer: bytearray | memoryview
+            The writable buffer to assemble into, which must hold at least `extent()` bytes
+            after `offset`.
+        offset: int
+            Offset in the buffer where the assembled data begins.
+        pad_alignment: int
+            Alignment of the end of the output.
+        auto_patch_pointer: bool
+            Write every pointer recorded in the relocation table after the blocks.
+
+        Returns
+        ----------
+        int
+            The number of bytes written.
+        """
+        size = self.extent(pad_alignment)
+        if len(buffer) - offset < size:
+            raise ValueError(f"Buffer too small to assemble: need {size:#x} bytes, got {len(buffer) - offset:#x}")
 
-        end = self.align_to(self.blocks[-1].address + self.blocks[-1].size, pad_alignment)
-        buffer = bytearray(end)
+        self._prepare_blocks(auto_patch_pointer)
 
+        view = memoryview(buffer)[offset:offset + size]
+        view[:] = bytes(size)
         for blk in self.blocks:
-            data = blk.get_bytes()
-            if len(data) != blk.size:
-                data = data.ljust(blk.size, b'\x00')
+            blk.pack_into(view, blk.address)
+        if auto_patch_pointer:
+            self.relocations.resolve(view)
+        view.release()
 
-            buffer[blk.address:blk.address + blk.size] = data
+        return size
 
-        return bytes(buffer)
+    def write_to(self, file, pad_alignment: int = 0x10, auto_patch_pointer: bool = True) -> int:
+        """
+        Streams the assembled data to a writable binary file object, one block at a time,
+        without building the full output in memory.
+
+        Parameters
+        ----------
+        file: BinaryIO
+            A file object opened for binary writing.
+        pad_alignment: int
+            Alignment of the end of the output.
+        auto_patch_pointer: bool
+            Write every pointer recorded in the relocation table after the blocks.
+
+        Returns
+        ----------
+        int
+            The number of bytes written.
+        """
+        if not self.blocks:
+            return 0
+
+        self._prepare_blocks(auto_patch_pointer)
+
+        size = self.extent(pad_alignment)
+        cursor = 0
+        for blk in self.blocks:
+            if blk.address > cursor:
+                file.write(bytes(blk.address - cursor))
+
+            slot = bytearray(blk.size)
+            blk.pack_into(slot, 0)
+            if auto_patch_pointer:
+                self.relocations.resolve(slot, start=blk.address)
+            file.write(slot)
+            cursor = blk.address + blk.size
+
+        if size > cursor:
+            file.write(bytes(size - cursor))
+
+        return size
     #endregion
 
     #region Helpers
@@ -601,6 +1375,15 @@ class MemoryStream:
 
 
 __all__ = [
+    'fingerprint',
+    'has_pointers',
+    'pointer_depth',
+    'size_class',
+    'pointer_sites',
+    'FragmentationReport',
+    'Relocation',
+    'RelocationTable',
+    'DedupeRegistry',
     'MemoryAllocator',
     'MemoryStream',
 ]
\ No newline at end of file
@@ -10,11 +10,19 @@ from ._structs import (
     TempoData,
     AudioHeapInitSizes
 )
+from ._envelope_decoder import (
+    MAX_ENVELOPE_POINTS,
+    ENVELOPE_POINT_SIZE,
+    decode_envelope
+)
 
 __all__ = [
     'EnvelopePoint',
     'ReverbSettings',
     'AudioSpec',
     'TempoData',
-    'AudioHeapInitSizes'
+    'AudioHeapInitSizes',
+    'MAX_ENVELOPE_POINTS',
+    'ENVELOPE_POINT_SIZE',
+    'decode_envelope'
 ]
\ No newline at end of file
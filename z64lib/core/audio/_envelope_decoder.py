@@ -0,0 +1,65 @@
+import sys
+from array import array
+
+
+MAX_ENVELOPE_POINTS: int = 0x100
+ENVELOPE_POINT_SIZE: int = 0x04
+
+
+def decode_envelope(buffer: bytes | bytearray | memoryview, offset: int = 0, max_points: int = MAX_ENVELOPE_POINTS) -> array:
+    """
+    Decodes an envelope, an array of `EnvelopePoint` structs terminated by the first point
+    whose time is an opcode (zero or negative), as the audio driver reads it.
+
+    The region is cast to big-endian s16 values in one pass and the terminator is found by
+    scanning the time values in place, so no struct is instantiated per point. The region is
+    bounded by both the end of the buffer and `max_points`.
+
+    Used by instrument bank envelopes and sequence envelopes.
+
+    Parameters
+    ----------
+    buffer: bytes | bytearray | memoryview
+        Binary data containing the envelope.
+    offset: int
+        Address of the envelope in the buffer.
+    max_points: int
+        Maximum number of points, including the terminating point.
+
+    Returns
+    ----------
+    array
+        Flat `'h'` array of `(time_or_opcode, amp_or_index)` pairs, including the terminating point.
+
+    Raises
+    ----------
+    ValueError
+        The envelope is not terminated before the end of the buffer or within `max_points` points.
+    """
+    view = memoryview(buffer)
+    available = max(0, (len(view) - offset) // ENVELOPE_POINT_SIZE)
+    num_points = min(available, max_points)
+
+    values = array('h')
+    values.frombytes(view[offset:offset + num_points * ENVELOPE_POINT_SIZE])
+    if sys.byteorder == 'little':
+        values.byteswap()
+
+    # Time values are every other value, scanned in place rather than sliced out
+    for end in range(0, 2 * num_points, 2):
+        if values[end] <= 0:
+            break
+    else:
+        if num_points < max_points:
+            raise ValueError(f"Envelope at {offset:#x} is not terminated before the end of the buffer ({len(view):#x} bytes)")
+        raise ValueError(f"Envelope at {offset:#x} is not terminated within {max_points} points")
+
+    del values[end + 2:]
+    return values
+
+
+__all__ = [
+    'MAX_ENVELOPE_POINTS',
+    'ENVELOPE_POINT_SIZE',
+    'decode_envelope',
+]
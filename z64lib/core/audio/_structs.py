@@ -20,6 +20,8 @@ class EnvelopePoint(Z64Struct):
     time_or_opcode: int | AdsrOpcode
         If positive, represents time.
         If zero or negative, represents an ADSR opcode (see `AdsrOpcode`).
+    raw_time_or_opcode: int
+        `time_or_opcode` as stored, including opcodes unknown to `AdsrOpcode`.
     amp_or_index: int
         If `time_or_opcode` is time, this value represents the amplitude change
         for the current point.
@@ -42,6 +44,11 @@ class EnvelopePoint(Z64Struct):
         else:
             return val
 
+    @property
+    def raw_time_or_opcode(self) -> int:
+        """ The time or opcode as stored, opcodes are not converted to `AdsrOpcode` and may be unknown. """
+        return int(self._time_or_opcode)
+
     @property
     def is_opcode(self):
         return self._time_or_opcode <= 0
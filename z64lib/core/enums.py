@@ -77,6 +77,20 @@ class AdsrStatus(IntEnum):
 #endregion
 
 
+#region AllocationStrategy
+class AllocationStrategy(Enum):
+    """ Represents the placement strategies available to the `MemoryAllocator`. """
+    BUMP = 'bump'
+    """ Always allocates at the end of the reserved memory, alignment holes are never reused. """
+
+    FIRST_FIT = 'first_fit'
+    """ Allocates in the lowest free alignment hole that fits, otherwise at the end. """
+
+    BEST_FIT = 'best_fit'
+    """ Allocates in the free alignment hole that leaves the least space, otherwise at the end. """
+#endregion
+
+
 #region AseqSection
 class AseqSection(Enum):
     META = 'metadata'
@@ -407,5 +421,6 @@ __all__ = [
     'AudioManagerDebugLevel',
     'AseqVersion',
     'AseqSection',
+    'AllocationStrategy',
 ]
 #endregion
\ No newline at end of file
@@ -1,2 +1,10 @@
 class NullPointerException(BaseException): ...
-class FlexibleArrayMemberException(BaseException): ...
\ No newline at end of file
+class FlexibleArrayMemberException(BaseException): ...
+
+
+class BankValidationError(ValueError):
+    """ Raised when binary instrument bank data fails validation, `issues` holds every problem found. """
+    def __init__(self, issues: list):
+        self.issues = issues
+        details = '\n'.join(f'  {issue}' for issue in issues)
+        super().__init__(f"Instrument bank failed validation with {len(issues)} problem(s):\n{details}")
@@ -7,10 +7,15 @@ z64lib.core.helpers
 from . import bit_helpers
 from ._enum_helpers import safe_enum
 from ._class_helpers import make_property
+from ._file_helpers import open_binary
+from ._optional_helpers import np, require_numpy
 
 
 __all__ = [
     'safe_enum',
     'make_property',
+    'open_binary',
+    'np',
+    'require_numpy',
     'bit_helpers',
 ]
\ No newline at end of file
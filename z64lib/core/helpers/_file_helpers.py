@@ -0,0 +1,28 @@
+"""
+File Helpers
+=====
+"""
+from contextlib import nullcontext
+from pathlib import Path
+
+
+def open_binary(target, mode: str = 'wb'):
+    """
+    Opens the given path as a binary file, or passes an already open file object through.
+
+    Parameters
+    ----------
+    target: str | Path | BinaryIO
+        A path to open, or a binary file object.
+    mode: str
+        Mode used to open paths.
+
+    Returns
+    ----------
+    ContextManager[BinaryIO]
+        A context manager yielding the file object. Files opened from a path are closed on
+        exit, file objects passed in are left open.
+    """
+    if isinstance(target, (str, Path)):
+        return open(target, mode)
+    return nullcontext(target)
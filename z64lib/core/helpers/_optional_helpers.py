@@ -0,0 +1,27 @@
+"""
+Optional Dependency Helpers
+=====
+"""
+
+try:
+    import numpy as np
+except ImportError: # Optional, installed with the 'audio' extra
+    np = None
+
+
+def require_numpy(feature: str):
+    """
+    Raises an `ImportError` naming the 'audio' extra when NumPy is not installed.
+
+    Parameters
+    ----------
+    feature: str
+        What requires NumPy, e.g. `'Rendering'`.
+
+    Raises
+    ----------
+    ImportError
+        NumPy is not installed.
+    """
+    if np is None:
+        raise ImportError(f"{feature} requires NumPy, install z64lib with the 'audio' extra")
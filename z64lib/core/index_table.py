@@ -0,0 +1,271 @@
+import struct
+from enum import Enum
+from z64lib.types import *
+
+
+class IndexTable:
+    """
+    A table of fixed-size index entries, such as the audiobank, audiotable, and audioseq
+    indices stored in the `code` file.
+
+    Entries are decoded in a single pass and stored column-wise, one list of raw values per
+    field, so reading or rewriting a table never instantiates an entry struct. Entries are
+    only instantiated when accessed by index.
+
+    Tables are parameterized by their entry struct, e.g. `IndexTable[AudiobankIndexEntry]`.
+    Entry structs must only contain primitive fields.
+
+    Attributes
+    ----------
+    entry_type: type[Z64Struct]
+        The struct of each entry.
+    header: bytes
+        The table header following the entry count.
+    columns: dict[str, list[int | float]]
+        Raw values of each field, by field name.
+    truncated: bool
+        Whether the table was decoded from truncated entries, whose address and size are unknown.
+    """
+    HEADER_SIZE: int = 0x10
+    TRUNCATED_SIZE: int = 0x08
+
+    entry_type: type = None
+    _row: struct.Struct = None
+    _truncated_row: struct.Struct = None
+
+    def __class_getitem__(cls, entry_type):
+        if not isinstance(entry_type, type) or not issubclass(entry_type, Z64Struct) or entry_type.is_dyna:
+            raise TypeError(f"IndexTable entry type must be a static Z64Struct subclass, not {entry_type!r}")
+
+        return type(
+            f'IndexTable_{entry_type.__name__}',
+            (cls,),
+            {
+                'entry_type': entry_type,
+                '_row': cls._row_struct(entry_type, 0),
+                '_truncated_row': cls._row_struct(entry_type, entry_type.size() - cls.TRUNCATED_SIZE),
+            },
+        )
+
+    @staticmethod
+    def _row_struct(entry_type: type, start: int) -> struct.Struct:
+        """ Builds the format of the fields located at or after `start`, padding is skipped. """
+        fmt = '>'
+        cursor = start
+        for field in entry_type._layout_:
+            if field.offset < start:
+                continue
+            if not getattr(field.type, 'is_primitive', False):
+                raise TypeError(f"Index entry field '{field.name}' is not a primitive")
+            fmt += 'x' * (field.offset - cursor) + field.type.format.lstrip('>')
+            cursor = field.offset + field.size
+        fmt += 'x' * (entry_type.size() - cursor)
+        return struct.Struct(fmt)
+
+    def __init__(self):
+        if self.entry_type is None:
+            raise TypeError("IndexTable must be parameterized with an entry type, e.g. IndexTable[AudiobankIndexEntry]")
+        self.header: bytes = b'\x00' * (self.HEADER_SIZE - 2)
+        self.truncated: bool = False
+        self.columns: dict[str, list[int | float]] = {field.name: [] for field in self.entry_type._layout_}
+
+    @classmethod
+    def field_names(cls, truncated: bool = False) -> list[str]:
+        """ Returns the name of each field, or only of the fields stored in truncated entries. """
+        start = cls.entry_type.size() - cls.TRUNCATED_SIZE if truncated else 0
+        return [field.name for field in cls.entry_type._layout_ if field.offset >= start]
+
+    #region Decoding
+    @classmethod
+    def from_bytes(cls, buffer: bytes | bytearray | memoryview, offset: int = 0) -> 'IndexTable':
+        """
+        Instantiates an index table from binary data.
+
+        Parameters
+        ----------
+        buffer: bytes | bytearray | memoryview
+            Binary index table data, starting with the header.
+        offset: int
+            Address of the table in the buffer.
+
+        Returns
+        ----------
+        IndexTable
+            The decoded index table.
+        """
+        view = memoryview(buffer)[offset:]
+        num_entries = struct.unpack_from('>H', view, 0)[0]
+
+        obj = cls()
+        obj.header = bytes(view[2:cls.HEADER_SIZE])
+
+        start = cls.HEADER_SIZE
+        end = start + num_entries * cls._row.size
+        obj._set_rows(cls._row.iter_unpack(view[start:end]), truncated=False, num_rows=num_entries)
+        return obj
+
+    @classmethod
+    def from_entries(cls, buffer: bytes | bytearray | memoryview, truncated: bool = False) -> 'IndexTable':
+        """
+        Instantiates an index table from consecutive entries without a table header.
+
+        Parameters
+        ----------
+        buffer: bytes | bytearray | memoryview
+            Binary entry data, e.g. the contents of a `.bankmeta` file.
+        truncated: bool
+            Entries are truncated to their last 0x08 bytes, as used by randomizers for
+            custom music files. The address and size of truncated entries are zero.
+
+        Returns
+        ----------
+        IndexTable
+            The decoded index table.
+
+        Raises
+        ----------
+        ValueError
+            The buffer is not a whole number of entries.
+        """
+        row = cls._truncated_row if truncated else cls._row
+        view = memoryview(buffer)
+        if len(view) % row.size:
+            raise ValueError(f"Index entry data size {len(view):#x} is not a multiple of {row.size:#x}")
+
+        obj = cls()
+        obj.truncated = truncated
+        obj._set_rows(row.iter_unpack(view), truncated=truncated, num_rows=len(view) // row.size)
+        return obj
+
+    def _set_rows(self, rows, truncated: bool, num_rows: int):
+        names = self.field_names(truncated)
+        values = list(zip(*rows)) or [()] * len(names)
+
+        for name in self.columns:
+            self.columns[name] = [0] * num_rows
+        for name, column in zip(names, values):
+            self.columns[name] = list(column)
+    #endregion
+
+    #region Encoding
+    def to_bytes(self) -> bytes:
+        """
+        Compiles the index table from memory to binary.
+
+        Returns
+        ----------
+        bytes
+            The table header followed by every entry.
+        """
+        buffer = bytearray(self.HEADER_SIZE + len(self) * self._row.size)
+        struct.pack_into('>H', buffer, 0, len(self))
+        buffer[2:self.HEADER_SIZE] = self.header
+        self._pack_rows(buffer, self.HEADER_SIZE, truncated=False)
+        return bytes(buffer)
+
+    def entries_to_bytes(self, truncated: bool = False) -> bytes:
+        """
+        Compiles every entry from memory to binary, without the table header.
+
+        Parameters
+        ----------
+        truncated: bool
+            Output the truncated 0x08 byte entries used by randomizers.
+
+        Returns
+        ----------
+        bytes
+            The entry data, e.g. the contents of a `.bankmeta` file.
+        """
+        row = self._truncated_row if truncated else self._row
+        buffer = bytearray(len(self) * row.size)
+        self._pack_rows(buffer, 0, truncated)
+        return bytes(buffer)
+
+    def _pack_rows(self, buffer: bytearray, offset: int, truncated: bool):
+        row = self._truncated_row if truncated else self._row
+        columns = [self.columns[name] for name in self.field_names(truncated)]
+        for values in zip(*columns):
+            row.pack_into(buffer, offset, *values)
+            offset += row.size
+
+    def entry_bytes(self, i: int, truncated: bool = False) -> bytes:
+        """
+        Compiles a single entry from memory to binary.
+
+        Parameters
+        ----------
+        i: int
+            Index of the entry.
+        truncated: bool
+            Output the truncated 0x08 byte entry used by randomizers.
+
+        Returns
+        ----------
+        bytes
+            The entry data.
+        """
+        row = self._truncated_row if truncated else self._row
+        return row.pack(*(self.columns[name][i] for name in self.field_names(truncated)))
+    #endregion
+
+    #region Access
+    def __len__(self):
+        return len(next(iter(self.columns.values())))
+
+    def __getitem__(self, i: int):
+        """ Instantiates the entry at the given index, or returns `None` for null entries. """
+        if self.is_null(i):
+            return None
+
+        # Built from the raw values, rather than packing the row and parsing it back
+        entry_type = self.entry_type
+        obj = entry_type.__new__(entry_type)
+        for field in entry_type._layout_:
+            attr = entry_type._normalize_in(field.type(self.columns[field.name][i]), field)
+            object.__setattr__(obj, field.name, attr)
+        return obj
+
+    def __setitem__(self, i: int, entry):
+        for name, value in self._row_values(entry).items():
+            self.columns[name][i] = value
+
+    def __iter__(self):
+        return (self[i] for i in range(len(self)))
+
+    def _row_values(self, entry) -> dict[str, int | float]:
+        """ Returns the raw value of each field of an entry, null entries are zero. """
+        if entry is None:
+            return {name: 0 for name in self.columns}
+
+        values = {}
+        for name in self.columns:
+            value = getattr(entry, name)
+            values[name] = value.value if isinstance(value, Enum) else value
+        return values
+
+    def append(self, entry):
+        """ Appends an entry, or a null entry if `entry` is `None`. """
+        for name, value in self._row_values(entry).items():
+            self.columns[name].append(value)
+
+    def get(self, i: int, name: str) -> int | float:
+        """ Returns the raw value of a single field of an entry. """
+        return self.columns[name][i]
+
+    def set(self, i: int, name: str, value: int | float):
+        """ Sets the raw value of a single field of an entry. """
+        self.columns[name][i] = value
+
+    def is_null(self, i: int) -> bool:
+        """ Returns whether the entry at the given index is null, i.e. both its address and size are zero. """
+        if self.truncated:
+            return False
+        address, size = (column[i] for column in list(self.columns.values())[:2])
+        return address == 0 and size == 0
+    #endregion
+
+
+__all__ = [
+    'IndexTable',
+]
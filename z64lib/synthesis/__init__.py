@@ -0,0 +1,34 @@
+"""
+z64lib.synthesis
+=====
+"""
+
+# Order matters, import non-dependents first, then dependents
+from ._voice import (
+    GAME_SAMPLE_RATE,
+    UPDATES_PER_SECOND,
+    BASE_NOTE,
+    DEFAULT_ENVELOPE,
+    pitch_scale,
+    release_rate,
+    SampleSource,
+    EnvelopeTimeline,
+    Voice,
+)
+from ._instrument_renderer import InstrumentRenderer, to_pcm16
+from ._sequence_renderer import SequenceRenderer
+
+__all__ = [
+    'GAME_SAMPLE_RATE',
+    'UPDATES_PER_SECOND',
+    'BASE_NOTE',
+    'DEFAULT_ENVELOPE',
+    'pitch_scale',
+    'release_rate',
+    'SampleSource',
+    'EnvelopeTimeline',
+    'Voice',
+    'InstrumentRenderer',
+    'to_pcm16',
+    'SequenceRenderer',
+]
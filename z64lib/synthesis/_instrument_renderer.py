@@ -0,0 +1,181 @@
+import math
+from collections.abc import Sequence
+from z64lib.audiobank import AudiobankIndexEntry
+from z64lib.audiobank.structs import Drum, Instrument, Sample, SoundEffect, TunedSample
+from z64lib.audiotable import Audiotable, PcmCache
+from z64lib.core.enums import VadpcmLoopCount
+from z64lib.core.helpers import np, require_numpy
+from z64lib.synthesis import (
+    GAME_SAMPLE_RATE,
+    DEFAULT_ENVELOPE,
+    EnvelopeTimeline,
+    SampleSource,
+    Voice,
+    pitch_scale,
+    release_rate,
+)
+
+
+class InstrumentRenderer:
+    """
+    Renders single notes of the instruments, drums, and sound effects of an instrument bank
+    offline, from the samples of an audiotable.
+
+    Instruments select one of their three tuned samples by the note's key region and play it
+    at its tuning, scaled by the note's pitch relative to C4. Drums and sound effects always
+    play their tuned sample at its tuning. Samples are resampled with linear interpolation,
+    follow their `VadpcmLoop`, and are shaped by the entry's envelope and, once released, by
+    its decay rate.
+
+    Decoded samples are kept per sample object, and read through a `PcmCache` when one is given.
+    Rendering requires NumPy, installed with the 'audio' extra.
+
+    Attributes
+    ----------
+    audiotable: Audiotable
+        The audiotable the bank's samples are stored in.
+    index_entry: AudiobankIndexEntry
+        Index entry of the instrument bank, which selects its sample banks.
+    sample_rate: int
+        Output sample rate in Hz.
+    cache: PcmCache | None
+        Cache decoded samples are read through.
+    """
+    DEFAULT_DECAY_INDEX: int = 0x80
+    MAX_RELEASE_SECONDS: float = 10.0
+
+    def __init__(self, audiotable: Audiotable, index_entry: AudiobankIndexEntry, sample_rate: int = GAME_SAMPLE_RATE, cache: PcmCache | None = None):
+        require_numpy('Rendering')
+        if sample_rate <= 0:
+            raise ValueError(f"sample_rate must be positive, not {sample_rate}")
+
+        self.audiotable: Audiotable = audiotable
+        self.index_entry: AudiobankIndexEntry = index_entry
+        self.sample_rate: int = sample_rate
+        self.cache: PcmCache | None = cache
+        self._sources: dict[int, tuple[Sample, SampleSource]] = {}
+
+    @staticmethod
+    def tuned_sample(entry: Instrument | Drum | SoundEffect, note: int) -> TunedSample:
+        """ Returns the tuned sample an entry plays a note with, instruments select it by key region. """
+        if isinstance(entry, Instrument):
+            if note < entry.low_key_region:
+                return entry.low_region_sample
+            if note <= entry.high_key_region:
+                return entry.prim_region_sample
+            return entry.high_region_sample
+        return entry.tuned_sample
+
+    def sample_source(self, sample: Sample) -> SampleSource:
+        """ Returns the decoded data of a sample laid out for playback, decoding it on first use. """
+        cached = self._sources.get(id(sample))
+        if cached is not None:
+            return cached[1]
+
+        decode = self.audiotable.decode if self.cache is None else (
+            lambda s, e, from_loop_start=False: self.cache.decode(self.audiotable, s, e, from_loop_start)
+        )
+        pcm = decode(sample, self.index_entry)
+
+        loop = sample.loop
+        if loop is None or loop.header.loop_count == VadpcmLoopCount.NO_LOOP:
+            source = SampleSource.from_pcm(pcm)
+        else:
+            header = loop.header
+            count = math.inf if header.loop_count == VadpcmLoopCount.INDEFINITE_LOOP else int(header.loop_count)
+            loop_pcm = decode(sample, self.index_entry, True)
+            source = SampleSource.from_pcm(pcm, loop_pcm, header.loop_start, header.loop_end, count)
+
+        self._sources[id(sample)] = (sample, source) # The sample is kept so its id is not reused
+        return source
+
+    def voice(self, entry: Instrument | Drum | SoundEffect, note: int, gain: float = 1.0,
+              envelope: Sequence[tuple[int, int]] | None = None, decay_index: int | None = None) -> Voice:
+        """
+        Starts a note of an instrument, drum, or sound effect.
+
+        Parameters
+        ----------
+        entry: Instrument | Drum | SoundEffect
+            The entry to play.
+        note: int
+            A Zelda64 note value (MIDI - 21), which selects an instrument's key region and
+            pitch. Drums and sound effects ignore it.
+        gain: float
+            Linear gain applied on top of the envelope.
+        envelope: Sequence[tuple[int, int]] | None
+            `(time_or_opcode, amp_or_index)` points overriding the entry's envelope, e.g. an
+            envelope set by a sequence.
+        decay_index: int | None
+            Decay index overriding the entry's.
+
+        Returns
+        ----------
+        Voice
+            The note, ready to render.
+
+        Raises
+        ----------
+        ValueError
+            The selected tuned sample has no sample, or it cannot be decoded.
+        """
+        tuned_sample = self.tuned_sample(entry, note)
+        if tuned_sample is None or tuned_sample.sample is None:
+            raise ValueError(f"{type(entry).__name__} has no sample for note {note}")
+
+        scale = float(tuned_sample.tuning)
+        if isinstance(entry, Instrument):
+            scale *= pitch_scale(note)
+        step = scale * GAME_SAMPLE_RATE / self.sample_rate
+
+        if envelope is None:
+            entry_envelope = getattr(entry, 'envelope', None)
+            envelope = DEFAULT_ENVELOPE if entry_envelope is None else [(p.raw_time_or_opcode, p.amp_or_index) for p in entry_envelope.points]
+        timeline = EnvelopeTimeline(envelope, self.sample_rate)
+
+        if decay_index is None:
+            decay_index = getattr(entry, 'decay_index', self.DEFAULT_DECAY_INDEX)
+        rate = release_rate(decay_index) / timeline.samples_per_update
+        pan = entry.pan / 127 if isinstance(entry, Drum) else 0.5
+
+        return Voice(self.sample_source(tuned_sample.sample), step, timeline, rate, gain, pan)
+
+    def render_note(self, entry: Instrument | Drum | SoundEffect, note: int, duration: float, gain: float = 1.0) -> 'np.ndarray':
+        """
+        Renders a note held for a duration, followed by its release.
+
+        Parameters
+        ----------
+        entry: Instrument | Drum | SoundEffect
+            The entry to play.
+        note: int
+            A Zelda64 note value (MIDI - 21).
+        duration: float
+            Time in seconds the note is held before it is released.
+        gain: float
+            Linear gain applied on top of the envelope.
+
+        Returns
+        ----------
+        np.ndarray
+            Mono float32 samples in [-1, 1], ending when the note has faded out, its sample
+            has ended, or `MAX_RELEASE_SECONDS` after the release.
+        """
+        voice = self.voice(entry, note, gain)
+        held = max(round(duration * self.sample_rate), 0)
+        voice.release(held)
+
+        tail = min(voice.release_samples(), math.ceil(self.MAX_RELEASE_SECONDS * self.sample_rate))
+        length = min(held + tail, voice.source.length / voice.step if voice.step > 0 else 0)
+        return voice.render(max(math.ceil(length), 0))
+
+
+def to_pcm16(samples: 'np.ndarray') -> 'np.ndarray':
+    """ Converts float samples in [-1, 1] to s16 PCM, clipping samples out of range. """
+    return np.clip(np.round(np.asarray(samples) * 32768), -0x8000, 0x7FFF).astype(np.int16)
+
+
+__all__ = [
+    'InstrumentRenderer',
+    'to_pcm16',
+]
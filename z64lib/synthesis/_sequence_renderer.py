@@ -0,0 +1,631 @@
+import heapq
+import math
+import random
+import wave
+from collections.abc import Iterator, Sequence
+from dataclasses import dataclass, field
+from pathlib import Path
+from z64lib.audiobank import InstrumentBank
+from z64lib.audioseq import AseqParser
+from z64lib.audioseq.messages import *
+from z64lib.audioseq.sequence import AudioSequence
+from z64lib.audiotable import Audiotable, PcmCache
+from z64lib.core.audio import decode_envelope
+from z64lib.core.enums import AseqSection, AseqVersion
+from z64lib.core.helpers import np, require_numpy
+from z64lib.synthesis import GAME_SAMPLE_RATE, InstrumentRenderer, Voice, to_pcm16
+
+
+def _s8(value: int) -> int:
+    return (value & 0xFF) - 0x100 if value & 0x80 else value & 0xFF
+
+
+def _s16(value: int) -> int:
+    return (value & 0xFFFF) - 0x10000 if value & 0x8000 else value & 0xFFFF
+
+
+#region Script State
+@dataclass
+class _Script:
+    """ Execution state of a sequence script. """
+    pc: int
+    wait: int = 0
+    calls: list[int] = field(default_factory=list)
+    loops: list[list[int]] = field(default_factory=list) # [loop start, remaining iterations]
+    value: int = 0
+    finished: bool = False
+    is_legato: bool = False
+
+
+@dataclass
+class _Channel(_Script):
+    """ Execution state of a sequence channel. """
+    index: int = 0
+    bank: int = 0
+    instrument: int | None = None
+    volume: float = 1.0
+    expression: float = 1.0
+    pan: int = 64
+    transpose: int = 0
+    envelope: list[tuple[int, int]] | None = None
+    decay_index: int | None = None
+    io: list[int] = field(default_factory=lambda: [-1] * 8)
+    layers: list['_Layer | None'] = field(default_factory=lambda: [None] * 4)
+
+
+@dataclass
+class _Layer(_Script):
+    """ Execution state of a note layer. """
+    channel: _Channel | None = field(default=None, repr=False)
+    instrument: int | None = None
+    pan: int | None = None
+    transpose: int = 0
+    envelope: list[tuple[int, int]] | None = None
+    decay_index: int | None = None
+    last_delay: int = 0
+    short_velocity: int = 127
+    short_gate: int = 0
+    voice: Voice | None = None
+#endregion
+
+
+class SequenceRenderer:
+    """
+    Renders an audio sequence offline, with the instrument banks and audiotable it plays.
+
+    The sequence's metadata, channel, and note layer scripts are stepped one tick at a time,
+    as the audio driver does: tempo, delays, calls, loops, branches, notes, volume, pan,
+    transposition, envelopes, and instrument and bank changes are followed. Every note starts
+    a `Voice`, which is released after the note's gate time. Voices are mixed to stereo in
+    fixed-size blocks, each voice being rendered for a whole block at once.
+
+    Messages are taken from the parsed sequence, indexed by address. Addresses the parser did
+    not reach, e.g. jump targets, are decoded from the sequence's raw data when it is set.
+    Effects the renderer does not model, such as vibrato, portamento, reverb, and filters,
+    are ignored. Rendering requires NumPy, installed with the 'audio' extra.
+
+    Attributes
+    ----------
+    sequence: AudioSequence
+        The parsed sequence.
+    banks: Sequence[InstrumentBank | None]
+        Instrument banks by id, e.g. `Audiobank.banks`.
+    audiotable: Audiotable
+        The audiotable the banks' samples are stored in.
+    fonts: list[int]
+        Ids of the instrument banks the sequence uses, in the order of the sequence's entry
+        in the sequence font table. The last one is the default bank.
+    sample_rate: int
+        Output sample rate in Hz.
+    block_size: int
+        Number of output samples mixed at once.
+    cache: PcmCache | None
+        Cache decoded samples are read through.
+    seed: int
+        Seed of the sequence's random number generator, so renders are reproducible.
+    """
+    TATUMS_PER_BEAT: int = 48
+    DEFAULT_TEMPO: int = 120
+    MAX_CALL_DEPTH: int = 4
+    MAX_STEPS: int = 0x400 # Messages a script may run in one tick before it is forced to wait
+    MAX_RELEASE_SECONDS: float = 10.0
+    SOUND_EFFECTS: int = 0x7E
+    DRUMS: int = 0x7F
+
+    # The audio driver's default short note tables
+    SHORT_VELOCITIES: tuple[int, ...] = (12, 25, 38, 51, 57, 64, 71, 76, 83, 89, 96, 102, 109, 115, 121, 127)
+    SHORT_GATES: tuple[int, ...] = (229, 203, 177, 151, 139, 126, 113, 100, 87, 74, 61, 48, 36, 23, 10, 0)
+
+    def __init__(self, sequence: AudioSequence, banks: Sequence[InstrumentBank | None], audiotable: Audiotable,
+                 fonts: Sequence[int], sample_rate: int = GAME_SAMPLE_RATE, block_size: int = 1024,
+                 cache: PcmCache | None = None, seed: int = 0):
+        require_numpy('Rendering')
+        if not fonts:
+            raise ValueError("The sequence must use at least one instrument bank")
+        if block_size <= 0:
+            raise ValueError(f"block_size must be positive, not {block_size}")
+
+        self.sequence: AudioSequence = sequence
+        self.banks: Sequence[InstrumentBank | None] = banks
+        self.audiotable: Audiotable = audiotable
+        self.fonts: list[int] = list(fonts)
+        self.sample_rate: int = sample_rate
+        self.block_size: int = block_size
+        self.cache: PcmCache | None = cache
+        self.seed: int = seed
+
+        self._messages: dict[tuple[AseqSection, int], AseqMessage] = self._index_messages(sequence)
+        self._decoded: dict[tuple[AseqSection, int, bool], AseqMessage | None] = {}
+        self._renderers: dict[int, InstrumentRenderer] = {}
+        self._reset()
+
+    @classmethod
+    def from_bytes(cls, data: bytes | bytearray, aseq_version: AseqVersion, banks: Sequence[InstrumentBank | None],
+                   audiotable: Audiotable, fonts: Sequence[int], **kwargs) -> 'SequenceRenderer':
+        """ Parses binary sequence data and instantiates a renderer for it, see `SequenceRenderer`. """
+        sequence = AseqParser(bytes(data), aseq_version).parse()
+        sequence.data = bytes(data)
+        return cls(sequence, banks, audiotable, fonts, **kwargs)
+
+    #region Rendering
+    def blocks(self, max_seconds: float = 300.0) -> Iterator['np.ndarray']:
+        """
+        Renders the sequence from its start, one block at a time.
+
+        Rendering stops once the sequence has ended and every voice has faded out, or after
+        `max_seconds`, since most sequences loop forever.
+
+        Yields
+        ----------
+        np.ndarray
+            Stereo float32 blocks of shape `(block_size, 2)`, the last block may be shorter.
+        """
+        self._reset()
+        total = round(max_seconds * self.sample_rate)
+        tail_end = None
+        start = 0
+
+        while start < total:
+            n = min(self.block_size, total - start)
+            end = start + n
+
+            # Step every tick that starts within the block
+            while not self._finished and self._position < end:
+                self._tick(round(self._position))
+                self._position += self.sample_rate * 60 / (self._tempo * self.TATUMS_PER_BEAT)
+                self._ticks += 1
+
+            if self._finished:
+                # Notes still held when the sequence ends are released right away
+                while self._releases:
+                    _, _, voice_start, voice = heapq.heappop(self._releases)
+                    self._release(voice, voice_start, max(round(self._position), start))
+                if not self._voices:
+                    return
+                if tail_end is None:
+                    tail_end = start + round(self.MAX_RELEASE_SECONDS * self.sample_rate)
+                elif start >= tail_end:
+                    return
+
+            out = np.zeros((n, 2), dtype=np.float32)
+            for entry in self._voices:
+                voice, voice_start = entry
+                offset = max(voice_start - start, 0)
+                if offset >= n:
+                    continue
+                mono = voice.render(n - offset)
+                angle = voice.pan * (math.pi / 2)
+                out[offset:] += mono[:, None] * np.array((math.cos(angle), math.sin(angle)), dtype=np.float32)
+
+            self._voices = [entry for entry in self._voices if not entry[0].finished]
+            yield out
+            start = end
+
+    def render(self, max_seconds: float = 300.0) -> 'np.ndarray':
+        """ Renders the sequence from its start, see `blocks()`, and returns stereo float32 samples of shape `(n, 2)`. """
+        blocks = list(self.blocks(max_seconds))
+        if not blocks:
+            return np.zeros((0, 2), dtype=np.float32)
+        return np.concatenate(blocks)
+
+    def write_wav(self, file_path: str | Path, max_seconds: float = 300.0) -> int:
+        """
+        Renders the sequence from its start to a 16-bit stereo WAV file, see `blocks()`.
+
+        Returns
+        ----------
+        int
+            Number of sample frames written.
+        """
+        frames = 0
+        with wave.open(str(file_path), 'wb') as f:
+            f.setnchannels(2)
+            f.setsampwidth(2)
+            f.setframerate(self.sample_rate)
+            for block in self.blocks(max_seconds):
+                f.writeframes(to_pcm16(block).astype('<i2').tobytes())
+                frames += len(block)
+        return frames
+    #endregion
+
+    #region Sequencer
+    def _reset(self):
+        self._meta: _Script = _Script(self.sequence.sections[0].addr if self.sequence.sections else 0)
+        self._channels: list[_Channel | None] = [None] * 16
+        self._io: list[int] = [-1] * 8
+        self._tempo: int = self.DEFAULT_TEMPO
+        self._volume: float = 1.0
+        self._transpose: int = 0
+        self._stopped: bool = False
+        self._random: random.Random = random.Random(self.seed)
+        self._position: float = 0.0
+        self._ticks: int = 0
+        self._releases: list[tuple[int, int, int, Voice]] = [] # (tick, order, voice start, voice)
+        self._voices: list[list] = [] # [voice, start]
+        self._voice_starts: dict[int, int] = {}
+
+    @property
+    def _finished(self) -> bool:
+        if self._stopped:
+            return True
+        return self._meta.finished and all(ch is None or ch.finished for ch in self._channels)
+
+    def _tick(self, now: int):
+        """ Steps every script by one tick, `now` is the output sample the tick starts at. """
+        while self._releases and self._releases[0][0] <= self._ticks:
+            _, _, voice_start, voice = heapq.heappop(self._releases)
+            self._release(voice, voice_start, now)
+
+        self._run(self._meta, AseqSection.META, self._meta_message, now)
+        for channel in self._channels:
+            if channel is None or channel.finished:
+                continue
+            self._run(channel, AseqSection.CHAN, self._channel_message, now)
+            for layer in channel.layers:
+                if layer is not None and not layer.finished and not channel.finished:
+                    self._run(layer, AseqSection.LAYER, self._layer_message, now)
+
+    def _run(self, script: _Script, section: AseqSection, handler, now: int):
+        """ Runs a script's messages until it waits or ends. """
+        if script.finished:
+            return
+        if script.wait > 0:
+            script.wait -= 1
+            if script.wait > 0:
+                return
+
+        for _ in range(self.MAX_STEPS):
+            msg = self._message(section, script)
+            if msg is None:
+                # Unknown opcodes are skipped, as the parser does
+                if self.sequence.data is None or script.pc >= len(self.sequence.data):
+                    script.finished = True
+                    return
+                script.pc += 1
+                continue
+
+            script.pc += msg.size
+            if not self._flow_message(script, msg):
+                handler(script, msg, now)
+            if script.finished or script.wait > 0 or self._stopped:
+                return
+        script.wait = 1
+
+    @staticmethod
+    def _index_messages(sequence: AudioSequence) -> dict[tuple[AseqSection, int], AseqMessage]:
+        """ Indexes the messages of every parsed fragment by address. """
+        index = {}
+
+        def add(frag, section):
+            addr = frag.addr
+            for msg in frag.messages:
+                index.setdefault((section, addr), msg)
+                addr += msg.size
+
+        for meta in sequence.sections:
+            if meta is None:
+                continue
+            add(meta, AseqSection.META)
+            for channel in meta.channels:
+                if channel is None:
+                    continue
+                add(channel, AseqSection.CHAN)
+                for layer in channel.note_layers:
+                    if layer is not None:
+                        add(layer, AseqSection.LAYER)
+        for call in sequence.calls.values():
+            add(call, call.parent_section or AseqSection.META)
+        return index
+
+    def _message(self, section: AseqSection, script: _Script) -> AseqMessage | None:
+        """ Returns the message at a script's position, decoding it when it was not parsed. """
+        msg = self._messages.get((section, script.pc))
+        # Notes are read differently by legato and staccato layers
+        if msg is not None and getattr(msg, 'is_legato_type', script.is_legato) == script.is_legato:
+            return msg
+
+        data = self.sequence.data
+        if data is None or script.pc >= len(data):
+            return msg
+
+        key = (section, script.pc, script.is_legato)
+        if key not in self._decoded:
+            msg_cls = AseqMessageSpec.get_message_class(section, data[script.pc], self.sequence.version, script)
+            self._decoded[key] = None if msg_cls is None else msg_cls.from_bytes(data, script.pc)
+        return self._decoded[key]
+
+    def _flow_message(self, script: _Script, msg: AseqMessage) -> bool:
+        """ Runs a control flow message, returns whether the message was one. """
+        if isinstance(msg, AseqFlow_End):
+            if script.calls:
+                script.pc = script.calls.pop()
+            else:
+                script.finished = True
+        elif isinstance(msg, AseqFlow_Delay1):
+            script.wait = 1
+        elif isinstance(msg, AseqFlow_Delay):
+            script.wait = msg.args[0].value
+        elif isinstance(msg, AseqFlow_Call):
+            if len(script.calls) < self.MAX_CALL_DEPTH:
+                script.calls.append(script.pc)
+                script.pc = msg.args[0].value
+        elif isinstance(msg, AseqFlow_Jump):
+            script.pc = msg.args[0].value
+        elif isinstance(msg, AseqFlow_BranchEqual):
+            if script.value == 0:
+                script.pc = msg.args[0].value
+        elif isinstance(msg, AseqFlow_BranchLessThan):
+            if script.value < 0:
+                script.pc = msg.args[0].value
+        elif isinstance(msg, AseqFlow_BranchGreaterEqual):
+            if script.value >= 0:
+                script.pc = msg.args[0].value
+        elif isinstance(msg, AseqFlow_JumpRelative):
+            script.pc += _s8(msg.args[0].value)
+        elif isinstance(msg, AseqFlow_JumpRelativeEqual):
+            if script.value == 0:
+                script.pc += _s8(msg.args[0].value)
+        elif isinstance(msg, AseqFlow_JumpRelativeLessThan):
+            if script.value < 0:
+                script.pc += _s8(msg.args[0].value)
+        elif isinstance(msg, AseqFlow_Loop):
+            script.loops.append([script.pc, msg.args[0].value or 0x100])
+        elif isinstance(msg, AseqFlow_LoopEnd):
+            if script.loops:
+                script.loops[-1][1] -= 1
+                if script.loops[-1][1] > 0:
+                    script.pc = script.loops[-1][0]
+                else:
+                    script.loops.pop()
+        elif isinstance(msg, AseqFlow_Break):
+            if script.loops:
+                script.loops.pop()
+        else:
+            return False
+        return True
+
+    def _value_message(self, script: _Script, msg: AseqMessage, io: list[int]) -> bool:
+        """ Runs a message on a script's value register, returns whether the message was one. """
+        if isinstance(msg, (AseqMeta_LoadImmediate, AseqChannel_LoadImmediate)):
+            script.value = _s8(msg.args[0].value)
+        elif isinstance(msg, (AseqMeta_Subtract, AseqChannel_Subtract)):
+            script.value = _s8(script.value - msg.args[0].value)
+        elif isinstance(msg, (AseqMeta_BitwiseAnd, AseqChannel_BitwiseAnd)):
+            script.value = _s8(script.value & msg.args[0].value)
+        elif isinstance(msg, (AseqMeta_Random, AseqChannel_Random)):
+            script.value = _s8(self._random.randrange(msg.args[0].value or 0x100))
+        elif isinstance(msg, (AseqMeta_LoadIO, AseqChannel_LoadIO)):
+            script.value = io[msg.arg_bits]
+        elif isinstance(msg, (AseqMeta_StoreIO, AseqChannel_WriteIO)):
+            io[msg.arg_bits] = script.value
+        elif isinstance(msg, (AseqMeta_SubIO, AseqChannel_SubIO)):
+            script.value = _s8(script.value - io[msg.arg_bits])
+        else:
+            return False
+        return True
+
+    def _meta_message(self, script: _Script, msg: AseqMessage, now: int):
+        if self._value_message(script, msg, self._io):
+            return
+        if isinstance(msg, AseqMeta_Tempo):
+            self._tempo = max(msg.args[0].value, 1)
+        elif isinstance(msg, AseqMeta_TempoChange):
+            self._tempo = max(self._tempo + _s8(msg.args[0].value), 1)
+        elif isinstance(msg, AseqMeta_MasterVolume):
+            self._volume = msg.args[0].value / 127
+        elif isinstance(msg, AseqMeta_Transpose):
+            self._transpose = _s8(msg.args[0].value)
+        elif isinstance(msg, AseqMeta_TransposeRelative):
+            self._transpose += _s8(msg.args[0].value)
+        elif isinstance(msg, AseqMeta_LoadChannel):
+            self._start_channel(msg.arg_bits, msg.args[0].value, now)
+        elif isinstance(msg, AseqMeta_LoadChannelRelative):
+            self._start_channel(msg.arg_bits, script.pc + _s16(msg.args[0].value), now)
+        elif isinstance(msg, AseqMeta_StopChannel):
+            self._stop_channel(msg.arg_bits, now)
+        elif isinstance(msg, AseqMeta_FreeChannels):
+            for i in range(16):
+                if msg.args[0].value & (1 << i):
+                    self._stop_channel(i, now)
+        elif isinstance(msg, AseqMeta_TestChannel):
+            channel = self._channels[msg.arg_bits]
+            script.value = int(channel is None or channel.finished)
+        elif isinstance(msg, AseqMeta_Stop):
+            self._stopped = True
+
+    def _channel_message(self, channel: _Channel, msg: AseqMessage, now: int):
+        if self._value_message(channel, msg, channel.io):
+            return
+        if isinstance(msg, AseqChannel_ChannelDelay):
+            channel.wait = msg.arg_bits
+        elif isinstance(msg, AseqChannel_Instrument):
+            channel.instrument = msg.args[0].value
+        elif isinstance(msg, AseqChannel_Bank):
+            channel.bank = self._font(msg.args[0].value, channel.bank)
+        elif isinstance(msg, AseqChannel_BankInstrument):
+            channel.bank = self._font(msg.args[0].value, channel.bank)
+            channel.instrument = msg.args[1].value
+        elif isinstance(msg, AseqChannel_Volume):
+            channel.volume = msg.args[0].value / 127
+        elif isinstance(msg, AseqChannel_Expression):
+            channel.expression = msg.args[0].value / 127
+        elif isinstance(msg, AseqChannel_Pan):
+            channel.pan = msg.args[0].value
+        elif isinstance(msg, AseqChannel_Transpose):
+            channel.transpose = _s8(msg.args[0].value)
+        elif isinstance(msg, AseqChannel_Envelope):
+            channel.envelope = self._envelope(msg.args[0].value)
+        elif isinstance(msg, AseqChannel_DecayIndex):
+            channel.decay_index = msg.args[0].value
+        elif isinstance(msg, AseqChannel_ResetParams):
+            channel.volume = channel.expression = 1.0
+            channel.pan = 64
+            channel.transpose = 0
+            channel.envelope = channel.decay_index = None
+        elif isinstance(msg, AseqChannel_Legato):
+            channel.is_legato = True
+        elif isinstance(msg, AseqChannel_Staccato):
+            channel.is_legato = False
+        elif isinstance(msg, AseqChannel_LoadLayer):
+            self._start_layer(channel, msg.arg_bits, msg.args[0].value, now)
+        elif isinstance(msg, AseqChannel_LoadLayerRelative):
+            self._start_layer(channel, msg.arg_bits, channel.pc + _s16(msg.args[0].value), now)
+        elif isinstance(msg, AseqChannel_DeleteLayer):
+            self._stop_layer(channel, msg.arg_bits, now)
+        elif isinstance(msg, AseqChannel_TestLayer):
+            layer = channel.layers[msg.arg_bits] if msg.arg_bits < len(channel.layers) else None
+            channel.value = int(layer is None or layer.finished)
+        elif isinstance(msg, AseqChannel_LoadChannel):
+            self._start_channel(msg.arg_bits, msg.args[0].value, now)
+        elif isinstance(msg, AseqChannel_StopChannel):
+            self._stop_channel(msg.args[0].value & 0x0F, now)
+        elif isinstance(msg, AseqChannel_Stop):
+            self._stop_channel(channel.index, now)
+
+    def _layer_message(self, layer: _Layer, msg: AseqMessage, now: int):
+        if isinstance(msg, (AseqLayer_NoteDVG, AseqLayer_NoteDV, AseqLayer_NoteVG, AseqLayer_ShortDVG, AseqLayer_ShortDV, AseqLayer_ShortVG)):
+            self._note(layer, msg, now)
+        elif isinstance(msg, AseqLayer_Delay):
+            layer.wait = msg.args[0].value
+        elif isinstance(msg, AseqLayer_ShortDelay):
+            layer.last_delay = msg.args[0].value
+        elif isinstance(msg, AseqLayer_ShortVelocity):
+            layer.short_velocity = msg.args[0].value
+        elif isinstance(msg, AseqLayer_ShortGate):
+            layer.short_gate = msg.args[0].value
+        elif isinstance(msg, AseqLayer_LoadShortVel):
+            layer.short_velocity = self.SHORT_VELOCITIES[msg.arg_bits]
+        elif isinstance(msg, AseqLayer_LoadShortGate):
+            layer.short_gate = self.SHORT_GATES[msg.arg_bits]
+        elif isinstance(msg, AseqLayer_Transpose):
+            layer.transpose = _s8(msg.args[0].value)
+        elif isinstance(msg, AseqLayer_Instrument):
+            layer.instrument = msg.args[0].value
+        elif isinstance(msg, AseqLayer_NotePan):
+            layer.pan = msg.args[0].value
+        elif isinstance(msg, AseqLayer_Envelope):
+            layer.envelope = self._envelope(msg.args[0].value)
+            layer.decay_index = msg.args[1].value
+        elif isinstance(msg, AseqLayer_DecayIndex):
+            layer.decay_index = msg.args[0].value
+        elif isinstance(msg, AseqLayer_Legato):
+            layer.is_legato = True
+        elif isinstance(msg, AseqLayer_Staccato):
+            layer.is_legato = False
+
+    def _font(self, index: int, default: int) -> int:
+        """ Returns the id of the instrument bank a sequence's bank index selects, counted from the last bank. """
+        if 0 <= index < len(self.fonts):
+            return self.fonts[len(self.fonts) - 1 - index]
+        return default
+
+    def _envelope(self, addr: int) -> list[tuple[int, int]] | None:
+        """ Returns the points of an envelope stored in the sequence, `None` if the sequence's data is not set. """
+        if self.sequence.data is None:
+            return None
+        values = decode_envelope(self.sequence.data, addr)
+        return list(zip(values[0::2], values[1::2]))
+
+    def _start_channel(self, index: int, addr: int, now: int):
+        self._stop_channel(index, now)
+        self._channels[index] = _Channel(addr, index=index, bank=self.fonts[-1])
+
+    def _stop_channel(self, index: int, now: int):
+        channel = self._channels[index]
+        if channel is None:
+            return
+        channel.finished = True
+        for i in range(len(channel.layers)):
+            self._stop_layer(channel, i, now)
+
+    def _start_layer(self, channel: _Channel, index: int, addr: int, now: int):
+        if index >= len(channel.layers):
+            return
+        self._stop_layer(channel, index, now)
+        channel.layers[index] = _Layer(addr, is_legato=channel.is_legato, channel=channel)
+
+    def _stop_layer(self, channel: _Channel, index: int, now: int):
+        layer = channel.layers[index] if index < len(channel.layers) else None
+        if layer is None:
+            return
+        layer.finished = True
+        if layer.voice is not None:
+            self._release(layer.voice, self._voice_starts.get(id(layer.voice), now), now)
+            layer.voice = None
+    #endregion
+
+    #region Voices
+    def _note(self, layer: _Layer, msg: AseqMessage, now: int):
+        """ Starts the voice of a note, and schedules its release after the note's gate time. """
+        if isinstance(msg, AseqLayer_NoteDVG):
+            delay, velocity, gate = msg.delay, msg.velocity, msg.gate
+        elif isinstance(msg, AseqLayer_NoteDV):
+            delay, velocity, gate = msg.delay, msg.velocity, 0
+        elif isinstance(msg, AseqLayer_NoteVG):
+            delay, velocity, gate = layer.last_delay, msg.velocity, msg.gate
+        elif isinstance(msg, AseqLayer_ShortDVG):
+            delay, velocity, gate = msg.delay, layer.short_velocity, layer.short_gate
+        else:
+            delay, velocity, gate = layer.last_delay, layer.short_velocity, layer.short_gate
+        layer.last_delay = delay
+        layer.wait = delay
+
+        if layer.voice is not None:
+            self._release(layer.voice, self._voice_starts.get(id(layer.voice), now), now)
+            layer.voice = None
+
+        channel = layer.channel
+        note = msg.note + self._transpose + channel.transpose + layer.transpose
+        voice = self._voice(channel, layer, note, velocity)
+        if voice is None:
+            return
+
+        layer.voice = voice
+        self._voices.append([voice, now])
+        self._voice_starts[id(voice)] = now
+        held = max(delay - (delay * gate >> 8), 1)
+        heapq.heappush(self._releases, (self._ticks + held, id(voice), now, voice))
+
+    def _voice(self, channel: _Channel, layer: _Layer, note: int, velocity: int) -> Voice | None:
+        """ Returns the voice of a note, `None` if the note selects no entry or sample. """
+        bank = self.banks[channel.bank] if 0 <= channel.bank < len(self.banks) else None
+        instrument = layer.instrument if layer.instrument is not None else channel.instrument
+        if bank is None or instrument is None:
+            return None
+
+        if instrument == self.DRUMS:
+            entries, index = bank.drums, note
+        elif instrument == self.SOUND_EFFECTS:
+            entries, index = bank.effects, note
+        else:
+            entries, index = bank.instruments, instrument
+        entry = entries[index] if 0 <= index < len(entries) else None
+        if entry is None:
+            return None
+
+        renderer = self._renderers.get(channel.bank)
+        if renderer is None:
+            renderer = InstrumentRenderer(self.audiotable, bank.index_entry, self.sample_rate, self.cache)
+            self._renderers[channel.bank] = renderer
+        tuned_sample = renderer.tuned_sample(entry, note)
+        if tuned_sample is None or tuned_sample.sample is None:
+            return None
+
+        gain = (velocity / 127) ** 2 * channel.volume * channel.expression * self._volume
+        envelope = layer.envelope if layer.envelope is not None else channel.envelope
+        decay_index = layer.decay_index if layer.decay_index is not None else channel.decay_index
+        voice = renderer.voice(entry, note, gain, envelope, decay_index)
+        if instrument != self.DRUMS:
+            voice.pan = (layer.pan if layer.pan is not None else channel.pan) / 127
+        return voice
+
+    def _release(self, voice: Voice, voice_start: int, now: int):
+        """ Releases a voice at an output sample. """
+        voice.release(max(now - voice_start - voice.time, 0))
+        self._voice_starts.pop(id(voice), None)
+    #endregion
+
+
+__all__ = [
+    'SequenceRenderer',
+]
@@ -0,0 +1,298 @@
+import math
+from collections.abc import Sequence
+from dataclasses import dataclass
+from z64lib.core.enums import AdsrOpcode
+from z64lib.core.helpers import np
+
+
+GAME_SAMPLE_RATE: int = 32000
+""" Output rate of the audio driver, which sample tunings are relative to. """
+
+UPDATES_PER_SECOND: int = 240
+""" Envelope updates per second, the audio driver updates envelopes 4 times per frame at 60 Hz. """
+
+BASE_NOTE: int = 39
+""" Note that plays samples at their tuning, C4. """
+
+DEFAULT_ENVELOPE: tuple[tuple[int, int], ...] = ((1, 32000), (AdsrOpcode.HANG, 0))
+""" Envelope of entries without one, e.g. sound effects. """
+
+
+def pitch_scale(note: int) -> float:
+    """ Returns the playback rate of a note relative to `BASE_NOTE`, in equal temperament. """
+    return 2.0 ** ((note - BASE_NOTE) / 12)
+
+
+def release_rate(decay_index: int) -> float:
+    """
+    Returns the fraction of full volume a released note loses every envelope update.
+
+    The rates are modelled on the audio driver's ADSR decay table: low indices release over
+    several seconds, high indices within a few updates, and index 0 never releases.
+    """
+    if not 0 <= decay_index <= 0xFF:
+        raise ValueError(f"decay_index must be between 0 and 255, not {decay_index}")
+    if decay_index == 0:
+        return 0.0
+    if decay_index < 16:
+        return 0.25 / (60 * (23 - decay_index))
+    if decay_index < 128:
+        return 0.25 / (4 * (143 - decay_index))
+    if decay_index < 250:
+        return 0.25 / ((255 - decay_index) // 2 + 1)
+    return 1.0 / (256 - decay_index)
+
+
+@dataclass
+class SampleSource:
+    """
+    Decoded sample data laid out for random access by playback position.
+
+    `data` holds the sample up to its loop end, then one pass of the loop decoded from its
+    loop start with the loop's predictor state, then the rest of the sample, then a single
+    silent sample that positions past the end of the sample read. Playback positions past
+    the loop end are folded into the loop pass until the loop has repeated `loop_count`
+    times, then continue into the rest of the sample.
+
+    Attributes
+    ----------
+    data: np.ndarray
+        Float32 samples, normalized to [-1, 1).
+    loop_end: int
+        Sample the loop ends at, or the length of the sample if it does not loop.
+    loop_length: int
+        Length of the loop in samples, 0 if the sample does not loop.
+    loop_count: float
+        Number of times the loop repeats, `math.inf` for indefinite loops.
+    """
+    data: 'np.ndarray'
+    loop_end: int
+    loop_length: int = 0
+    loop_count: float = 0
+
+    @classmethod
+    def from_pcm(cls, pcm: Sequence[int], loop_pcm: Sequence[int] | None = None, loop_start: int = 0, loop_end: int = 0, loop_count: float = 0) -> 'SampleSource':
+        """
+        Instantiates a sample source from decoded s16 samples.
+
+        Parameters
+        ----------
+        pcm: Sequence[int]
+            The sample decoded from its start.
+        loop_pcm: Sequence[int] | None
+            The sample decoded from its loop start, `None` if it does not loop.
+        loop_start: int
+            Sample the loop starts at.
+        loop_end: int
+            Sample the loop ends at.
+        loop_count: float
+            Number of times the loop repeats, `math.inf` for indefinite loops.
+
+        Returns
+        ----------
+        SampleSource
+            The sample source.
+        """
+        pcm = np.asarray(pcm, dtype=np.float32) / 32768
+        if loop_pcm is None or loop_count == 0:
+            return cls(np.append(pcm, np.float32(0)), len(pcm))
+
+        loop_end = min(loop_end, len(pcm))
+        loop = np.asarray(loop_pcm, dtype=np.float32)[:max(loop_end - loop_start, 0)] / 32768
+        data = np.concatenate((pcm[:loop_end], loop, pcm[loop_end:], np.zeros(1, dtype=np.float32)))
+        return cls(data, loop_end, len(loop), loop_count if len(loop) else 0)
+
+    @property
+    def length(self) -> float:
+        """ Number of samples played before the sample ends, `math.inf` for indefinite loops. """
+        if self.loop_count == math.inf:
+            return math.inf
+        return len(self.data) - 1 - self.loop_length + self.loop_count * self.loop_length
+
+    def _indices(self, positions: 'np.ndarray') -> 'np.ndarray':
+        """ Maps integer playback positions to indices of `data`. """
+        if self.loop_length:
+            past = positions - self.loop_end
+            looped = self.loop_count * self.loop_length
+            indices = np.where(past < 0, positions, self.loop_end + past % self.loop_length)
+            if looped != math.inf:
+                indices = np.where(past >= looped, positions - looped + self.loop_length, indices)
+        else:
+            indices = positions
+        return np.minimum(indices, len(self.data) - 1)
+
+    def read(self, positions: 'np.ndarray') -> 'np.ndarray':
+        """ Returns the samples at fractional playback positions, linearly interpolated. """
+        whole = np.floor(positions)
+        frac = (positions - whole).astype(np.float32)
+        whole = whole.astype(np.int64)
+        a = self.data[self._indices(whole)]
+        b = self.data[self._indices(whole + 1)]
+        return a + (b - a) * frac
+
+
+class EnvelopeTimeline:
+    """
+    Expands envelope points into the breakpoints of a piecewise linear gain curve.
+
+    Points are stepped through as the audio driver does: every time point ramps linearly
+    from the current level to its amplitude over its time in updates, `HANG` holds the
+    current level, `DISABLE` ends the note, and `GOTO` and `RESTART` jump to another point.
+    Looping envelopes are expanded lazily, only as far as gains are requested.
+
+    Attributes
+    ----------
+    times: list[float]
+        Breakpoint times in samples.
+    levels: list[float]
+        Breakpoint levels, in [0, 1].
+    end: float | None
+        Time in samples the envelope disables the note at, `None` if it does not.
+    """
+    def __init__(self, points: Sequence[tuple[int, int]], sample_rate: int):
+        self.points: list[tuple[int, int]] = [(int(t), int(a)) for t, a in points]
+        self.samples_per_update: float = sample_rate / UPDATES_PER_SECOND
+        self.times: list[float] = [0.0]
+        self.levels: list[float] = [0.0]
+        self.end: float | None = None
+        self._index: int = 0
+        self._done: bool = False
+
+    def _extend(self, until: float):
+        """ Steps through the envelope points until the breakpoints reach a time. """
+        jumps = 0
+        while not self._done and self.times[-1] <= until:
+            if not 0 <= self._index < len(self.points) or jumps > len(self.points):
+                # Ran off the points, or jumps between opcodes without time passing
+                self._done = True
+                break
+
+            time_or_opcode, amp_or_index = self.points[self._index]
+            if time_or_opcode > 0:
+                self.times.append(self.times[-1] + time_or_opcode * self.samples_per_update)
+                self.levels.append(max(amp_or_index, 0) / 32767)
+                self._index += 1
+                jumps = 0
+            elif time_or_opcode == AdsrOpcode.GOTO:
+                self._index = amp_or_index
+                jumps += 1
+            elif time_or_opcode == AdsrOpcode.RESTART:
+                self._index = 0
+                jumps += 1
+            else:
+                if time_or_opcode == AdsrOpcode.DISABLE:
+                    self.end = self.times[-1]
+                self._done = True
+
+    def gain(self, times: 'np.ndarray') -> 'np.ndarray':
+        """ Returns the envelope level at sample times. """
+        if len(times) == 0:
+            return np.zeros(0, dtype=np.float32)
+        self._extend(float(times[-1]))
+        gains = np.interp(times, self.times, self.levels).astype(np.float32)
+        if self.end is not None:
+            gains[times >= self.end] = 0
+        return gains
+
+
+class Voice:
+    """
+    A note playing a sample source at a fixed rate, shaped by an envelope.
+
+    Voices are rendered in blocks: each call to `render()` returns the next samples of the
+    voice, computed for the whole block at once.
+
+    Attributes
+    ----------
+    source: SampleSource
+        The sample data being played.
+    step: float
+        Samples of the source advanced per output sample.
+    envelope: EnvelopeTimeline
+        The voice's envelope.
+    release_rate: float
+        Fraction of full volume lost per output sample once released.
+    gain: float
+        Linear gain applied on top of the envelope.
+    pan: float
+        Stereo position, from 0 (left) to 1 (right).
+    position: float
+        Playback position in the source.
+    time: int
+        Output samples rendered so far.
+    released_at: int | None
+        Time in output samples the voice is released at.
+    finished: bool
+        Whether the voice has nothing left to play.
+    """
+    def __init__(self, source: SampleSource, step: float, envelope: EnvelopeTimeline, release_rate: float, gain: float = 1.0, pan: float = 0.5):
+        self.source: SampleSource = source
+        self.step: float = step
+        self.envelope: EnvelopeTimeline = envelope
+        self.release_rate: float = release_rate
+        self.gain: float = gain
+        self.pan: float = pan
+        self.position: float = 0.0
+        self.time: int = 0
+        self.released_at: int | None = None
+        self.finished: bool = False
+        self._release_level: float = 0.0
+
+    def release(self, delay: int = 0):
+        """ Releases the voice `delay` output samples from now, its level then fades out at `release_rate`. """
+        if self.released_at is not None:
+            return
+        self.released_at = self.time + delay
+        self._release_level = float(self.envelope.gain(np.array([self.released_at], dtype=np.float64))[0])
+
+    def release_samples(self) -> float:
+        """ Returns the number of output samples the release lasts, `math.inf` if it never ends. """
+        if self.released_at is None:
+            return math.inf
+        if self._release_level <= 0:
+            return 0
+        if self.release_rate <= 0:
+            return math.inf
+        return math.ceil(self._release_level / self.release_rate)
+
+    def render(self, n: int) -> 'np.ndarray':
+        """ Renders the next `n` output samples of the voice as float32. """
+        if self.finished:
+            self.time += n
+            return np.zeros(n, dtype=np.float32)
+
+        offsets = np.arange(n, dtype=np.float64)
+        times = self.time + offsets
+        gains = self.envelope.gain(times)
+        if self.released_at is not None:
+            fade = np.maximum(self._release_level - self.release_rate * (times - self.released_at), 0).astype(np.float32)
+            gains = np.where(times >= self.released_at, fade, gains)
+
+        out = self.source.read(self.position + self.step * offsets)
+        out *= gains
+        if self.gain != 1.0:
+            out *= np.float32(self.gain)
+
+        self.position += self.step * n
+        self.time += n
+        end = self.envelope.end
+        if (
+            self.position >= self.source.length
+            or (end is not None and self.time >= end)
+            or (self.released_at is not None and self.time >= self.released_at + self.release_samples())
+        ):
+            self.finished = True
+        return out
+
+
+__all__ = [
+    'GAME_SAMPLE_RATE',
+    'UPDATES_PER_SECOND',
+    'BASE_NOTE',
+    'DEFAULT_ENVELOPE',
+    'pitch_scale',
+    'release_rate',
+    'SampleSource',
+    'EnvelopeTimeline',
+    'Voice',
+]
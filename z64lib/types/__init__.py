@@ -23,8 +23,13 @@ __all__ = [
     'bitfield_to_bytes',
     'composite_to_bytes',
     'pointer_to_bytes',
+    'primitive_pack_into',
+    'bitfield_pack_into',
+    'composite_pack_into',
+    'pointer_pack_into',
     'FROM_BYTES_HANDLERS',
     'TO_BYTES_HANDLERS',
+    'PACK_INTO_HANDLERS',
     # Type Markers
     'PointerType',
     'ArrayType',
@@ -1,4 +1,5 @@
 import inspect
+import operator
 import struct
 
 
@@ -25,6 +26,15 @@ class DataType:
     is_static: bool = True
     is_dyna: bool = False
 
+    # Dirty Tracking
+    _dirty: bool = True
+    _version: int = 0
+    _mutations: int = 0 # Shared by every data type, counts modifications of any object
+
+    # Parametrized Types
+    _params_: object = None
+    _PARAMETRIZED: dict = {} # Shared by every data type, parametrized types by origin and params
+
     @classmethod
     def size(cls) -> int:
         """ Returns the size of the data type in bytes. """
@@ -67,6 +77,28 @@ class DataType:
         # Non-standard types
         return int(value).to_bytes(cls.size(), 'big', signed=cls.signed)
 
+    @classmethod
+    def pack_into(cls, buffer: bytearray | memoryview, offset: int, value) -> int:
+        """ Writes the value directly into a writable buffer and returns the number of bytes written. """
+        if value < cls.MIN or value > cls.MAX:
+            raise OverflowError(f"Value {value} out of range for {cls.__name__} [{cls.MIN}, {cls.MAX}]")
+
+        # Standard types
+        s = cls._get_struct()
+        if s is not None:
+            if issubclass(cls, int):
+                s.pack_into(buffer, offset, int(value))
+            elif issubclass(cls, float):
+                s.pack_into(buffer, offset, float(value))
+            else:
+                raise TypeError(f"Unsupported type {cls.__name__}")
+            return s.size
+
+        # Non-standard types
+        size = cls.size()
+        buffer[offset:offset + size] = int(value).to_bytes(size, 'big', signed=cls.signed)
+        return size
+
     @classmethod
     def _wrap(cls, value: int) -> int:
         """ Wrap the value to fit the bit width of the given data type. """
@@ -84,6 +116,68 @@ class DataType:
             cls._struct = struct.Struct(cls.format)
         return cls._struct
 
+    #region Dirty Tracking
+    def is_dirty(self) -> bool:
+        """ Returns whether the object was modified since it was last marked clean. """
+        return self._dirty
+
+    def mark_dirty(self):
+        """ Flags the object as modified, for edits that cannot be detected automatically. """
+        self._touch()
+
+    def _touch(self):
+        """ Records a modification of the object, flagging it dirty and invalidating cached digests. """
+        object.__setattr__(self, '_dirty', True)
+        object.__setattr__(self, '_version', self._version + 1)
+        DataType._mutations += 1
+
+    def _stamp(self):
+        """ Returns a value that changes whenever the object, or any object stored inline in it, is modified. """
+        return self._version
+
+    def mark_clean(self):
+        """ Flags the object as unmodified, e.g. after it was compiled. """
+        object.__setattr__(self, '_dirty', False)
+    #endregion
+
+    #region Parametrized Types
+    @classmethod
+    def _parametrize(cls, name: str, params, attrs: dict) -> type:
+        """
+        Returns the subclass created by `cls[params]`, e.g. `array[T]`.
+
+        Each distinct `params` creates a single type, so identical declarations share it and
+        instances can be pickled by their origin and params, then restored as an instance of
+        that same type, e.g. by worker processes.
+        """
+        try:
+            key = (cls, _freeze(params))
+            hash(key)
+        except TypeError: # Unhashable params, e.g. a dict, are not shared
+            return type(name, (cls,), {**attrs, '_params_': params})
+
+        T = DataType._PARAMETRIZED.get(key)
+        if T is None:
+            T = DataType._PARAMETRIZED.setdefault(key, type(name, (cls,), {**attrs, '_params_': params}))
+        return T
+
+    def __reduce_ex__(self, protocol):
+        cls = type(self)
+        if self.is_primitive and isinstance(self, (int, float)):
+            # Values are already wrapped to the type's width, so they are restored without `__new__`
+            base = int if isinstance(self, int) else float
+            return (base.__new__, (cls, base(self)), self.__dict__ or None)
+        if '_params_' not in cls.__dict__:
+            return super().__reduce_ex__(protocol)
+
+        # A single reference per type, so pickling resolves each type once rather than per instance
+        ref = cls.__dict__.get('_type_ref_')
+        if ref is None:
+            ref = _TypeRef(cls.__bases__[0], cls._params_)
+            setattr(cls, '_type_ref_', ref)
+        return (_restore_parametrized, (ref, self.__dict__))
+    #endregion
+
     #region Alignment Helpers
     @staticmethod
     def align_to(value: int, alignment: int) -> int:
@@ -133,6 +227,32 @@ class DataType:
     #endregion
 
 
+def _freeze(params):
+    """ Returns the params of a parametrized type with every list converted to a tuple, so they can be hashed. """
+    if isinstance(params, (list, tuple)):
+        return tuple(_freeze(param) for param in params)
+    return params
+
+
+class _TypeRef:
+    """ Pickles as a parametrized type, which is unpickled as `origin[params]`. """
+    __slots__ = ('origin', 'params')
+
+    def __init__(self, origin: type, params):
+        self.origin = origin
+        self.params = params
+
+    def __reduce__(self):
+        return (operator.getitem, (self.origin, self.params))
+
+
+def _restore_parametrized(cls: type, state: dict):
+    """ Restores a pickled instance of a parametrized type, without calling its `__init__` or `__setattr__`. """
+    obj = cls.__new__(cls)
+    obj.__dict__.update(state)
+    return obj
+
+
 class Field:
     __slots__ = (
         'name',
@@ -226,6 +346,49 @@ TO_BYTES_HANDLERS = {
 #endregion
 
 
+#region pack_into() Handlers
+def primitive_pack_into(O: 'DataType', attr: 'DataType', field: 'Field', buffer: bytearray | memoryview, offset: int, *args, **kwargs):
+    """"""
+    return field.type.pack_into(buffer, offset, attr)
+
+
+def bitfield_pack_into(O: 'DataType', attr: 'DataType', field: 'Field', buffer: bytearray | memoryview, offset: int, *args, **kwargs):
+    """"""
+    return attr.pack_into(buffer, offset, O._bools_, O._enums_)
+
+
+def composite_pack_into(O: 'DataType', attr: 'DataType', field: 'Field', buffer: bytearray | memoryview, offset: int, *args, **kwargs):
+    """"""
+    return attr.pack_into(buffer, offset)
+
+
+def pointer_pack_into(O: 'DataType', attr: 'DataType', field: 'Field', buffer: bytearray | memoryview, offset: int, *args, **kwargs):
+    """"""
+    if isinstance(attr, field.type):
+        address = attr.address
+        if address is None:
+            raise ValueError(f"Pointer {attr} cannot be null")
+    elif attr is not None:
+        address = field.type(reference=attr).address
+    else:
+        address = 0x00000000
+
+    s = field.type._get_struct()
+    s.pack_into(buffer, offset, address)
+    return s.size
+
+
+PACK_INTO_HANDLERS = {
+    'primitive': primitive_pack_into,
+    'bitfield': bitfield_pack_into,
+    'union': composite_pack_into,
+    'array': composite_pack_into,
+    'struct': composite_pack_into,
+    'pointer': pointer_pack_into,
+}
+#endregion
+
+
 __all__ = [
     'DataType',
     'Field',
@@ -237,6 +400,11 @@ __all__ = [
     'bitfield_to_bytes',
     'composite_to_bytes',
     'pointer_to_bytes',
+    'primitive_pack_into',
+    'bitfield_pack_into',
+    'composite_pack_into',
+    'pointer_pack_into',
     'FROM_BYTES_HANDLERS',
     'TO_BYTES_HANDLERS',
+    'PACK_INTO_HANDLERS',
 ]
\ No newline at end of file
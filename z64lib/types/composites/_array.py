@@ -1,3 +1,4 @@
+import struct
 from z64lib.types.base import DataType, FROM_BYTES_HANDLERS
 from z64lib.types.markers import ArrayType
 
@@ -30,9 +31,9 @@ class array(DataType, ArrayType):
         is_static = length not in (None, 0)
         is_dyna = length in (None, 0)
 
-        return type(
+        return cls._parametrize(
             f'array_{data_type.__name__}_{length}',
-            (cls,),
+            params,
             {
                 'data_type': data_type,
                 'length': length,
@@ -42,50 +43,33 @@ class array(DataType, ArrayType):
         )
 
     def __init__(self, items=[], original_address: int = 0, allocated_address: int = 0):
-        self.items = []
-
-        for item in items:
-            if isinstance(item, self.data_type):
-                self.items.append(item)
-            elif getattr(self.data_type, 'is_primitive', False):
-                self.items.append(self.data_type(item))
-            elif getattr(self.data_type, 'is_array', False):
-                if isinstance(item, self.data_type):
-                    self.items.append(item)
-                else:
-                    raise TypeError(f"Cannot initialize nested array from {item}")
-            elif getattr(self.data_type, 'is_struct', False):
-                if isinstance(item, self.data_type):
-                    self.items.append(item)
-                else:
-                    raise TypeError(f"Cannot initialize struct array from {item}")
-            elif getattr(self.data_type, 'is_pointer', False):
-                if isinstance(item, self.data_type):
-                    self.items.append(item)
-                else:
-                    raise TypeError(f"Cannot initialize pointer array from {item}")
-            elif getattr(self.data_type, 'is_bitfield', False):
-                if isinstance(item, self.data_type):
-                    self.items.append(item)
-                else:
-                    raise TypeError(f"Cannot initialize bitfield array from {item}")
-            elif getattr(self.data_type, 'is_union', False):
-                if isinstance(item, self.data_type):
-                    self.items.append(item)
-                else:
-                    raise TypeError(f"Cannot initialize union array from {item}")
-            else:
-                raise TypeError(f"Cannot wrap {item} in {self.data_type}")
+        self.items = [self._wrap(item) for item in items]
 
         self.original_address = original_address
         self.allocated_address = allocated_address
 
+    def _wrap(self, item):
+        """ Returns an item as the array's data type, primitives are converted and other types must already match. """
+        if isinstance(item, self.data_type):
+            return item
+        if getattr(self.data_type, 'is_primitive', False):
+            return self.data_type(item)
+        for flag, kind in (('is_array', 'nested array'), ('is_struct', 'struct array'), ('is_pointer', 'pointer array'),
+                           ('is_bitfield', 'bitfield array'), ('is_union', 'union array')):
+            if getattr(self.data_type, flag, False):
+                raise TypeError(f"Cannot initialize {kind} from {item}")
+        raise TypeError(f"Cannot wrap {item} in {self.data_type}")
+
     def __iter__(self):
         return iter(self.items)
 
     def __getitem__(self, i):
         return self.items[i]
 
+    def __setitem__(self, i, value):
+        self.items[i] = [self._wrap(item) for item in value] if isinstance(i, slice) else self._wrap(value)
+        self._touch()
+
     def __len__(self):
         return len(self.items)
 
@@ -95,6 +79,28 @@ class array(DataType, ArrayType):
     def __str__(self):
         return str(self.items)
 
+    def is_dirty(self) -> bool:
+        """ Returns whether the array, or any composite item in it, was modified since it was last marked clean. """
+        if self._dirty:
+            return True
+        if getattr(self.data_type, 'is_primitive', False) or getattr(self.data_type, 'is_pointer', False):
+            return False
+        return any(item.is_dirty() for item in self.items)
+
+    def _stamp(self):
+        """ Returns a value that changes whenever the array, its length, or a composite item in it is modified. """
+        if getattr(self.data_type, 'is_primitive', False) or getattr(self.data_type, 'is_pointer', False):
+            return (self._version, len(self.items))
+        return (self._version, tuple(item._stamp() for item in self.items))
+
+    def mark_clean(self):
+        """ Flags the array and every composite item in it as unmodified. """
+        self._dirty = False
+        if getattr(self.data_type, 'is_primitive', False) or getattr(self.data_type, 'is_pointer', False):
+            return
+        for item in self.items:
+            item.mark_clean()
+
     @property
     def signed(self):
         return getattr(self.data_type, 'signed', False)
@@ -162,3 +168,22 @@ class array(DataType, ArrayType):
             offset += len(b)
 
         return bytes(data)
+
+    def pack_into(self, buffer: bytearray | memoryview, offset: int) -> int:
+        """"""
+        T = self.data_type
+        fmt = getattr(T, 'format', None) if getattr(T, 'is_primitive', False) else None
+
+        # Primitive arrays are packed with a single struct call
+        if fmt is not None:
+            struct.pack_into(f'{fmt[0]}{len(self.items)}{fmt[1:]}', buffer, offset, *self.items)
+            return self.dyna_size()
+
+        cursor = offset
+        for v in self.items:
+            if getattr(T, 'is_primitive', False):
+                cursor += T.pack_into(buffer, cursor, v)
+            else:
+                cursor += v.pack_into(buffer, cursor)
+
+        return cursor - offset
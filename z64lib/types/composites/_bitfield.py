@@ -30,9 +30,9 @@ class bitfield(DataType, BitfieldType):
             if fields is not None and not isinstance(fields, list):
                 raise TypeError()
 
-        return type(
+        return cls._parametrize(
             f'bitfield_{data_type.__name__}',
-            (cls,),
+            params,
             {
                 'data_type': data_type,
                 'fields': fields,
@@ -42,6 +42,10 @@ class bitfield(DataType, BitfieldType):
     def __init__(self, **attrs):
         self.__dict__.update(attrs)
 
+    def __setattr__(self, name, value):
+        self.__dict__[name] = value
+        self._touch()
+
     @property
     def signed(self):
         return getattr(self.data_type, 'signed', False)
@@ -115,6 +119,12 @@ class bitfield(DataType, BitfieldType):
 
         return struct.pack(fmt, bits)
 
+    def pack_into(self, buffer: bytearray | memoryview, offset: int, bools: set[str] = None, enums: dict[str, type] = None) -> int:
+        """"""
+        b = self.to_bytes(bools, enums)
+        buffer[offset:offset + len(b)] = b
+        return len(b)
+
     def normalize_in(self, bools: set[str] = None, enums: dict[str, type] = None):
         """"""
         bools = bools or set()
@@ -125,9 +135,9 @@ class bitfield(DataType, BitfieldType):
             enum_cls = enums.get(name)
 
             if name in bools:
-                setattr(self, name, bool(attr))
+                self.__dict__[name] = bool(attr)
             if enum_cls and not isinstance(attr, enum_cls):
-                setattr(self, name, enum_cls(attr))
+                self.__dict__[name] = enum_cls(attr)
 
         return self
 
@@ -141,9 +151,9 @@ class bitfield(DataType, BitfieldType):
             enum_cls = enums.get(name)
 
             if name in bools:
-                setattr(self, name, 1 if attr else 0)
+                self.__dict__[name] = 1 if attr else 0
             if enum_cls and isinstance(attr, enum_cls):
-                setattr(self, name, attr.value)
+                self.__dict__[name] = attr.value
 
         return self
 
@@ -22,9 +22,9 @@ class union(DataType, UnionType):
         if not isinstance(fields, list):
             raise TypeError()
 
-        return type(
+        return cls._parametrize(
             f'union_{max_size}',
-            (cls,),
+            params,
             {
                 'max_size': max_size,
                 'fields': fields,
@@ -54,6 +54,7 @@ class union(DataType, UnionType):
         if name in self._attrs:
             self._attrs[name] = value
             self._active = name
+            self._touch()
         else:
             raise AttributeError(f"Invalid union field '{name}'")
 
@@ -91,6 +92,12 @@ class union(DataType, UnionType):
             return buffer[:size]
         return buffer
 
+    def pack_into(self, buffer: bytearray | memoryview, offset: int) -> int:
+        """"""
+        b = self.to_bytes()
+        buffer[offset:offset + len(b)] = b
+        return len(b)
+
     @property
     def active_field(self) -> str:
         return self._active
@@ -1,6 +1,6 @@
 import hashlib
 import warnings
-from z64lib.types.base import DataType, Field, FROM_BYTES_HANDLERS, TO_BYTES_HANDLERS
+from z64lib.types.base import DataType, Field, FROM_BYTES_HANDLERS, TO_BYTES_HANDLERS, PACK_INTO_HANDLERS
 from z64lib.types.markers import *
 
 
@@ -16,10 +16,14 @@ class Z64Struct(DataType, StructType):
     _align_: int = 1
     _layout_: list = None
     _size_: int = 0
+    _field_names_: frozenset[str] = frozenset()
+    DIGEST_SIZE: int = 16
 
     def __init_subclass__(cls, **kwargs):
         super().__init_subclass__(**kwargs)
 
+        cls._field_names_ = frozenset(name for name, _ in cls._fields_)
+
         if cls.is_dyna:
             return
 
@@ -90,6 +94,43 @@ class Z64Struct(DataType, StructType):
 
         return field, offset + size
 
+    def __setattr__(self, name, value):
+        object.__setattr__(self, name, value)
+        if name in self._field_names_:
+            self._touch()
+
+    def __getstate__(self):
+        # Cached digests are only valid against this process' mutation counter
+        state = dict(self.__dict__)
+        state.pop('_digest_cache', None)
+        return state
+
+    #region Dirty Tracking
+    def _inline_members(self):
+        """ Yields every composite member stored inline in the struct, pointer targets are excluded. """
+        for name, data_type in self._fields_:
+            if getattr(data_type, 'is_pointer', False) or getattr(data_type, 'is_primitive', False):
+                continue
+            attr = getattr(self, name, None)
+            if isinstance(attr, DataType):
+                yield attr
+
+    def is_dirty(self) -> bool:
+        """
+        Returns whether the struct, or any struct, array, bitfield or union stored inline in it,
+        was modified since it was last marked clean. Pointer targets are tracked separately.
+        """
+        if self._dirty:
+            return True
+        return any(attr.is_dirty() for attr in self._inline_members())
+
+    def mark_clean(self):
+        """ Flags the struct and every composite member stored inline in it as unmodified. """
+        object.__setattr__(self, '_dirty', False)
+        for attr in self._inline_members():
+            attr.mark_clean()
+    #endregion
+
     @classmethod
     def size(cls) -> int:
         """ Returns the total size of the structure in bytes. """
@@ -124,6 +165,27 @@ class Z64Struct(DataType, StructType):
     def to_bytes(self) -> bytes:
         """"""
         buffer = bytearray(self.size())
+        self.pack_into(buffer, 0)
+        return bytes(buffer)
+
+    def pack_into(self, buffer: bytearray | memoryview, offset: int = 0) -> int:
+        """
+        Serializes the struct directly into a writable buffer.
+
+        Padding between fields is not written, so the destination should be zero-filled.
+
+        Parameters
+        ----------
+        buffer: bytearray | memoryview
+            The writable buffer to serialize into.
+        offset: int
+            Address of the struct in the buffer.
+
+        Returns
+        ----------
+        int
+            The size of the struct in bytes.
+        """
         layout = self._layout_ or self._generate_layout()
 
         for field in layout:
@@ -132,10 +194,9 @@ class Z64Struct(DataType, StructType):
 
             attr = getattr(self, field.name)
             attr = self._normalize_out(attr, field)
-            b = TO_BYTES_HANDLERS[field.kind](self, attr, field)
-            buffer[field.offset:field.offset + len(b)] = b
+            PACK_INTO_HANDLERS[field.kind](self, attr, field, buffer, offset + field.offset)
 
-        return bytes(buffer)
+        return self.size()
 
     @classmethod
     def _normalize_in(cls, attr, field: Field):
@@ -184,6 +245,68 @@ class Z64Struct(DataType, StructType):
         """ Return a stable SHA-256 hash as an integer. """
         return int(hashlib.sha256(self._stable_bytes()).hexdigest(), 16)
 
+    #region Merkle Hashing
+    def _stamp(self):
+        """
+        Returns a value that changes whenever the struct, an object stored inline in it, or
+        the digest of an object it points to changes.
+        """
+        stamps = [self._version]
+        for field in self._layout_ or self._generate_layout():
+            attr = getattr(self, field.name, None)
+            if field.kind == 'pointer':
+                stamps.append(attr.digest() if isinstance(attr, Z64Struct) else attr)
+            elif isinstance(attr, DataType) and not getattr(attr, 'is_primitive', False):
+                stamps.append(attr._stamp())
+        return tuple(stamps)
+
+    def _merkle_bytes(self) -> bytes:
+        """ Returns the struct's stable bytes, with every pointed-to struct replaced by its digest. """
+        buffer = bytearray()
+        layout = self._layout_ or self._generate_layout()
+
+        for field in layout:
+            attr = getattr(self, field.name)
+
+            if field.kind == 'pointer':
+                b = attr.digest() if isinstance(attr, Z64Struct) else b'\x00' * self.DIGEST_SIZE
+            elif isinstance(attr, Z64Struct):
+                b = attr._merkle_bytes()
+            else:
+                b = TO_BYTES_HANDLERS[field.kind](self, self._normalize_out(attr, field), field)
+
+            buffer.extend(b)
+
+        return bytes(buffer)
+
+    def digest(self) -> bytes:
+        """
+        Returns a Merkle digest of the struct's contents, and of every struct it points to.
+
+        Digests are cached. A cached digest is reused as-is while no object has been modified,
+        otherwise it is reused as long as the struct, the objects stored inline in it, and the
+        digests of the structs it points to are unchanged, so only modified subtrees are hashed
+        again.
+
+        Returns
+        ----------
+        bytes
+            A 16-byte BLAKE2b digest.
+        """
+        cache = self.__dict__.get('_digest_cache')
+        if cache is not None and cache[0] == DataType._mutations:
+            return cache[2]
+
+        stamp = self._stamp()
+        if cache is not None and cache[1] == stamp:
+            digest = cache[2]
+        else:
+            digest = hashlib.blake2b(self._merkle_bytes(), digest_size=self.DIGEST_SIZE).digest()
+
+        object.__setattr__(self, '_digest_cache', (DataType._mutations, stamp, digest))
+        return digest
+    #endregion
+
     def __repr__(self):
         lines = [f'{type(self).__name__}(']
 
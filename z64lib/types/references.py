@@ -40,9 +40,9 @@ class pointer(DataType, PointerType):
         if not isinstance(depth, int) or depth < 1:
             raise TypeError("Pointer depth must be a positive integer")
 
-        return type(
+        return cls._parametrize(
             f'pointer_to_{data_type.__name__}_d{depth}',
-            (cls,),
+            params,
             {
                 'data_type': data_type,
                 'pointer_depth': depth,
@@ -93,6 +93,15 @@ class pointer(DataType, PointerType):
             raise ValueError(f"Pointer {self} cannot be null")
         return self._get_struct().pack(self.address)
 
+    def pack_into(self, buffer: bytearray | memoryview, offset: int) -> int:
+        """"""
+        addr = self.address
+        if addr is None:
+            raise ValueError(f"Pointer {self} cannot be null")
+        s = self._get_struct()
+        s.pack_into(buffer, offset, addr)
+        return s.size
+
     @property
     def address(self):
         if self.reference is None: